@@ -0,0 +1,27 @@
+"""Add the composite index behind the task dedupe lookup."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_01"
+down_revision = "20241108_01"
+branch_labels = None
+depends_on = None
+
+_INDEX = "ix_tasks_dedupe"
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    if _INDEX not in existing:
+        op.create_index(
+            _INDEX, "tasks", ["name", "payload_hash", "scheduled_window_start"], unique=False
+        )
+
+
+def downgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    if _INDEX in existing:
+        op.drop_index(_INDEX, table_name="tasks")
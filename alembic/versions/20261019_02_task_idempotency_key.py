@@ -0,0 +1,29 @@
+"""Add client-supplied idempotency keys to tasks."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_02"
+down_revision = "20261019_01"
+branch_labels = None
+depends_on = None
+
+_INDEX = "uq_tasks_idempotency_key"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "idempotency_key" not in {column["name"] for column in inspector.get_columns("tasks")}:
+        op.add_column("tasks", sa.Column("idempotency_key", sa.String(length=100), nullable=True))
+    if _INDEX not in {index["name"] for index in inspector.get_indexes("tasks")}:
+        op.create_index(_INDEX, "tasks", ["name", "idempotency_key"], unique=True)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if _INDEX in {index["name"] for index in inspector.get_indexes("tasks")}:
+        op.drop_index(_INDEX, table_name="tasks")
+    if "idempotency_key" in {column["name"] for column in inspector.get_columns("tasks")}:
+        op.drop_column("tasks", "idempotency_key")
@@ -0,0 +1,31 @@
+"""Add composite indexes behind keyset task listing filters."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_03"
+down_revision = "20261019_02"
+branch_labels = None
+depends_on = None
+
+_INDEXES = {
+    "ix_tasks_name_status_id": ["name", "status", "id"],
+    "ix_tasks_created_at_id": ["created_at", "id"],
+    "ix_tasks_attempts_id": ["attempts", "id"],
+}
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    for name, columns in _INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "tasks", columns, unique=False)
+
+
+def downgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    for name in _INDEXES:
+        if name in existing:
+            op.drop_index(name, table_name="tasks")
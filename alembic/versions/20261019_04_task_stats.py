@@ -0,0 +1,31 @@
+"""Add the task_stats rollup table and backfill it from tasks."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_04"
+down_revision = "20261019_03"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("task_stats"):
+        return
+    op.create_table(
+        "task_stats",
+        sa.Column("name", sa.String(length=128), primary_key=True),
+        sa.Column("status", sa.String(length=32), primary_key=True),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        "INSERT INTO task_stats (name, status, count) "
+        "SELECT name, status, COUNT(*) FROM tasks GROUP BY name, status"
+    )
+
+
+def downgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("task_stats"):
+        op.drop_table("task_stats")
@@ -0,0 +1,25 @@
+"""Index unsent outbox rows by due time for relay sweeps."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_06"
+down_revision = "20261019_05"
+branch_labels = None
+depends_on = None
+
+_INDEX = "ix_task_outbox_pending"
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("task_outbox")}
+    if _INDEX not in existing:
+        op.create_index(_INDEX, "task_outbox", ["sent_at", "available_at"], unique=False)
+
+
+def downgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("task_outbox")}
+    if _INDEX in existing:
+        op.drop_index(_INDEX, table_name="task_outbox")
@@ -0,0 +1,36 @@
+"""Add misfire policy and catch-up rate to task_schedules."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_07"
+down_revision = "20261019_06"
+branch_labels = None
+depends_on = None
+
+
+def _columns() -> set[str]:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("task_schedules")}
+
+
+def upgrade() -> None:
+    existing = _columns()
+    if "misfire_policy" not in existing:
+        op.add_column(
+            "task_schedules",
+            sa.Column(
+                "misfire_policy", sa.String(length=16), nullable=False, server_default="coalesce"
+            ),
+        )
+    if "catchup_rate_per_s" not in existing:
+        op.add_column("task_schedules", sa.Column("catchup_rate_per_s", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    existing = _columns()
+    if "catchup_rate_per_s" in existing:
+        op.drop_column("task_schedules", "catchup_rate_per_s")
+    if "misfire_policy" in existing:
+        op.drop_column("task_schedules", "misfire_policy")
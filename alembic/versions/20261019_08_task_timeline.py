@@ -0,0 +1,25 @@
+"""Add tasks.timeline for per-stage delivery timestamps."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_08"
+down_revision = "20261019_07"
+branch_labels = None
+depends_on = None
+
+
+def _columns() -> set[str]:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("tasks")}
+
+
+def upgrade() -> None:
+    if "timeline" not in _columns():
+        op.add_column("tasks", sa.Column("timeline", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    if "timeline" in _columns():
+        op.drop_column("tasks", "timeline")
@@ -0,0 +1,25 @@
+"""Add tasks.traceparent so every delivery of a task continues its trace."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_09"
+down_revision = "20261019_08"
+branch_labels = None
+depends_on = None
+
+
+def _columns() -> set[str]:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns("tasks")}
+
+
+def upgrade() -> None:
+    if "traceparent" not in _columns():
+        op.add_column("tasks", sa.Column("traceparent", sa.String(length=55), nullable=True))
+
+
+def downgrade() -> None:
+    if "traceparent" in _columns():
+        op.drop_column("tasks", "traceparent")
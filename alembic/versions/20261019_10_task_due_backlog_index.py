@@ -0,0 +1,25 @@
+"""Index tasks by status and due time so admission control counts only due work."""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_10"
+down_revision = "20261019_09"
+branch_labels = None
+depends_on = None
+
+_INDEX = "ix_tasks_status_scheduled_at_name"
+
+
+def upgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    if _INDEX not in existing:
+        op.create_index(_INDEX, "tasks", ["status", "scheduled_at", "name"], unique=False)
+
+
+def downgrade() -> None:
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("tasks")}
+    if _INDEX in existing:
+        op.drop_index(_INDEX, table_name="tasks")
@@ -0,0 +1 @@
+"""End-to-end benchmarks run against local stand-ins for MySQL and Redis."""
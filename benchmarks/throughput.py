@@ -0,0 +1,430 @@
+"""Throughput of submit, outbox relay and worker consumption, end to end.
+
+Each phase drives the real code path against a local database and Redis and reports tasks
+per second, latency percentiles and database / Redis round trips per task:
+
+- ``submit``: the ``POST /api/tasks`` handler (without HTTP parsing): insert, then XADD;
+- ``flush_due``: tasks committed as due, published by ``Queue.flush_due`` (latency per call);
+- ``worker``: per-stream XREADGROUP polls handled by ``handle_message`` with a no-op handler.
+
+The database defaults to a fresh SQLite file (``--db-url`` takes any SQLAlchemy URL, such as
+a MySQL container) and Redis to fakeredis (``--redis-url`` for a real server; the benchmark
+only touches its own ``bench.*`` keys). An ``executemany`` counts as one statement.
+``--json`` writes the results for ``--compare``::
+
+    python -m benchmarks.throughput --tasks 2000 --json before.json
+    python -m benchmarks.throughput --tasks 2000 --json after.json
+    python -m benchmarks.throughput --compare before.json after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+import json
+import logging
+import os
+from pathlib import Path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from taskrunnerx.app.api import routes
+from taskrunnerx.app.config import get_settings
+from taskrunnerx.app.db import Base
+from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.lifecycle import STAGE_METRIC
+from taskrunnerx.app.services.queue import Queue
+from taskrunnerx.metrics import Histogram, metrics, split_series_key
+from taskrunnerx.worker import worker as worker_module
+
+TASK_NAME = "bench.noop"
+KEY_PREFIX = "bench"
+
+
+@dataclass(slots=True)
+class RoundTrips:
+    """Statements and commits sent to the database, and requests sent to Redis."""
+
+    db_statements: int = 0
+    db_commits: int = 0
+    redis: int = 0
+
+    def since(self, start: RoundTrips) -> RoundTrips:
+        return RoundTrips(
+            self.db_statements - start.db_statements,
+            self.db_commits - start.db_commits,
+            self.redis - start.redis,
+        )
+
+    def copy(self) -> RoundTrips:
+        return RoundTrips(self.db_statements, self.db_commits, self.redis)
+
+
+@dataclass(slots=True)
+class PhaseResult:
+    tasks: int
+    seconds: float
+    tasks_per_s: float
+    latency_ms: dict[str, float]
+    db_statements_per_task: float
+    db_commits_per_task: float
+    redis_round_trips_per_task: float
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+def count_db_round_trips(engine: Engine, counts: RoundTrips) -> None:
+    def on_statement(*_: Any) -> None:
+        counts.db_statements += 1
+
+    def on_commit(*_: Any) -> None:
+        counts.db_commits += 1
+
+    event.listen(engine, "before_cursor_execute", on_statement)
+    event.listen(engine, "commit", on_commit)
+
+
+def count_redis_round_trips(client: Any, counts: RoundTrips) -> Any:
+    """Count each command sent on its own and each pipeline flush as one round trip."""
+
+    execute_command = client.execute_command
+    make_pipeline = client.pipeline
+
+    async def counted_command(*args: Any, **kwargs: Any) -> Any:
+        counts.redis += 1
+        return await execute_command(*args, **kwargs)
+
+    def counted_pipeline(*args: Any, **kwargs: Any) -> Any:
+        pipe = make_pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        async def counted_execute(*exec_args: Any, **exec_kwargs: Any) -> Any:
+            counts.redis += 1
+            return await execute(*exec_args, **exec_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    client.execute_command = counted_command
+    client.pipeline = counted_pipeline
+    return client
+
+
+def connect_redis(url: str | None) -> Any:
+    if url:
+        from redis import asyncio as aioredis
+
+        redis_factory: Any = aioredis.from_url
+        return redis_factory(url, decode_responses=True)
+    try:
+        from fakeredis import aioredis as fake_aioredis
+    except ImportError:
+        sys.exit("fakeredis is not installed: pip install fakeredis, or pass --redis-url")
+    return fake_aioredis.FakeRedis(decode_responses=True)
+
+
+def _percentiles(histogram: Histogram) -> dict[str, float]:
+    stats = histogram.snapshot()
+    return {label: round(float(stats[label]) * 1000, 3) for label in ("p50", "p90", "p99", "max")}
+
+
+async def _timed(counts: RoundTrips, run: Callable[[Histogram], Awaitable[int]]) -> PhaseResult:
+    """Time ``run``, which records its latencies and returns how many tasks it handled."""
+
+    latencies = Histogram(window_s=86_400, slices=1)
+    start_counts = counts.copy()
+    started = time.perf_counter()
+    tasks = await run(latencies)
+    seconds = time.perf_counter() - started
+    spent = counts.since(start_counts)
+    per_task = max(tasks, 1)
+    return PhaseResult(
+        tasks=tasks,
+        seconds=round(seconds, 4),
+        tasks_per_s=round(tasks / seconds, 1) if seconds else 0.0,
+        latency_ms=_percentiles(latencies),
+        db_statements_per_task=round(spent.db_statements / per_task, 3),
+        db_commits_per_task=round(spent.db_commits / per_task, 3),
+        redis_round_trips_per_task=round(spent.redis / per_task, 3),
+    )
+
+
+async def bench_submit(counts: RoundTrips, tasks: int, concurrency: int) -> PhaseResult:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(latencies: Histogram) -> int:
+        async def submit(n: int) -> None:
+            async with slots:
+                began = time.perf_counter()
+                await routes.submit_task(
+                    TaskCreate(name=TASK_NAME, payload={"phase": "submit", "n": n}),
+                    traceparent=None,
+                )
+                latencies.record(time.perf_counter() - began)
+
+        await asyncio.gather(*(submit(n) for n in range(tasks)))
+        return tasks
+
+    return await _timed(counts, run)
+
+
+async def bench_flush_due(
+    counts: RoundTrips, queue: Queue, session_factory: sessionmaker[Session], tasks: int, limit: int
+) -> PhaseResult:
+    with session_factory() as session:
+        tasks_service.create_tasks(
+            session,
+            [TaskCreate(name=TASK_NAME, payload={"phase": "flush", "n": n}) for n in range(tasks)],
+        )
+        session.commit()
+
+    sweeps = 0
+
+    async def run(latencies: Histogram) -> int:
+        nonlocal sweeps
+        published = 0
+        while True:
+            began = time.perf_counter()
+            sent = await queue.flush_due(limit=limit)
+            if not sent:
+                return published
+            sweeps += 1
+            published += len(sent)
+            latencies.record(time.perf_counter() - began)
+
+    result = await _timed(counts, run)
+    result.extra["sweeps"] = sweeps
+    return result
+
+
+async def bench_worker(counts: RoundTrips, client: Any, streams: list[str]) -> PhaseResult:
+    # * Only polls, so the worker's low-priority lane is never read.
+    reader = worker_module.StreamReader(
+        client, streams, worker_module.WCFG.low_priority_stream, consumer="bench"
+    )
+
+    async def run(latencies: Histogram) -> int:
+        handled = 0
+        while True:
+            response = await reader.poll()
+            if not response:
+                return handled
+            for stream, entries in response:
+                for entry_id, fields in entries:
+                    began = time.perf_counter()
+                    await worker_module.handle_message(client, entry_id, fields, stream=stream)
+                    latencies.record(time.perf_counter() - began)
+                    handled += 1
+
+    return await _timed(counts, run)
+
+
+def stage_percentiles() -> dict[str, dict[str, float]]:
+    """``task_stage`` percentiles per stage, over every task name."""
+
+    stages: dict[str, dict[str, float]] = {}
+    for key, histogram in metrics.timers.items():
+        name, labels = split_series_key(key)
+        if name == STAGE_METRIC:
+            stage = labels.split('stage="', 1)[1].split('"', 1)[0]
+            stages[stage] = _percentiles(histogram)
+    return stages
+
+
+@contextmanager
+def patched(module: Any, **values: Any) -> Iterator[None]:
+    original = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in original.items():
+            setattr(module, name, value)
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run_benchmark(
+    *,
+    tasks: int,
+    concurrency: int,
+    flush_limit: int,
+    db_url: str | None,
+    redis_url: str | None,
+) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        engine = create_engine(db_url or f"sqlite:///{Path(scratch) / 'bench.sqlite'}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine, autoflush=False, future=True)
+        counts = RoundTrips()
+        count_db_round_trips(engine, counts)
+        client = count_redis_round_trips(connect_redis(redis_url), counts)
+
+        # * Own keys, so a real Redis server's task streams and listeners are left alone.
+        prefix = f"{KEY_PREFIX}.{os.getpid()}"
+        settings = get_settings()
+        original_stream = settings.redis_stream
+        settings.redis_stream = f"{prefix}.tasks"
+        queue = Queue(session_factory=session_factory)
+        queue.events_channel = f"{prefix}.events"
+        queue._redis = client
+        streams = queue.streams
+        for stream in streams:
+            await client.xgroup_create(stream, worker_module.WCFG.group, id="0", mkstream=True)
+
+        @contextmanager
+        def db_session() -> Iterator[Session]:
+            session = session_factory()
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+        async def noop(_: dict[str, Any]) -> None:
+            return None
+
+        metrics.counters.clear()
+        metrics.timers.clear()
+        metrics.gauges.clear()
+        worker_module.HANDLERS[TASK_NAME] = noop
+        # * A log line per task would measure stdout rather than the code under test.
+        log_level = worker_module.log.level
+        worker_module.log.setLevel(logging.WARNING)
+        try:
+            with (
+                patched(routes, db_session=db_session, queue=queue),
+                patched(worker_module, db_session=db_session, queue=queue),
+            ):
+                phases = {
+                    "submit": await bench_submit(counts, tasks, concurrency),
+                    "flush_due": await bench_flush_due(
+                        counts, queue, session_factory, tasks, flush_limit
+                    ),
+                    "worker": await bench_worker(counts, client, streams),
+                }
+        finally:
+            settings.redis_stream = original_stream
+            worker_module.log.setLevel(log_level)
+            worker_module.HANDLERS.pop(TASK_NAME, None)
+            if redis_url:
+                await client.delete(*streams)
+            await client.aclose()
+            engine.dispose()
+
+    return {
+        "meta": {
+            "revision": _git_revision(),
+            "at": datetime.now(tz=UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "redis": "redis-server" if redis_url else "fakeredis",
+            "tasks": tasks,
+            "concurrency": concurrency,
+        },
+        "phases": {name: asdict(result) for name, result in phases.items()},
+        "stages_ms": stage_percentiles(),
+    }
+
+
+def compare(before: dict[str, Any], after: dict[str, Any]) -> str:
+    """Side-by-side table of two result files, with the change in percent."""
+
+    rows = [f"{'':40}{'before':>12}{'after':>12}{'change':>9}"]
+    for phase, old in before["phases"].items():
+        new = after["phases"].get(phase)
+        if new is None:
+            continue
+        for metric in ("tasks_per_s", "db_statements_per_task", "redis_round_trips_per_task"):
+            rows.append(_compare_row(f"{phase}.{metric}", old[metric], new[metric]))
+        for label in ("p50", "p99"):
+            old_ms, new_ms = old["latency_ms"][label], new["latency_ms"][label]
+            rows.append(_compare_row(f"{phase}.{label}_ms", old_ms, new_ms))
+    return "\n".join(rows)
+
+
+def _compare_row(label: str, old: float, new: float) -> str:
+    change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+    return f"{label:40}{old:>12.3f}{new:>12.3f}{change:>9}"
+
+
+def report(results: dict[str, Any]) -> str:
+    meta = results["meta"]
+    lines = [
+        f"{meta['tasks']} tasks, {meta['database']} + {meta['redis']}, revision {meta['revision']}",
+        f"{'phase':10}{'tasks/s':>10}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+        f"{'db stmt/task':>14}{'db commit/task':>16}{'redis rt/task':>15}",
+    ]
+    for phase, result in results["phases"].items():
+        latency = result["latency_ms"]
+        lines.append(
+            f"{phase:10}{result['tasks_per_s']:>10.1f}{latency['p50']:>9.3f}{latency['p90']:>9.3f}"
+            f"{latency['p99']:>9.3f}{result['db_statements_per_task']:>14.2f}"
+            f"{result['db_commits_per_task']:>16.2f}{result['redis_round_trips_per_task']:>15.2f}"
+        )
+    lines.append("task_stage percentiles (ms):")
+    for stage, latency in results["stages_ms"].items():
+        percentiles = " ".join(f"{label}={latency[label]:.3f}" for label in ("p50", "p90", "p99"))
+        lines.append(f"  {stage:12}{percentiles}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=2000, help="tasks per phase")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent submissions")
+    parser.add_argument("--flush-limit", type=int, default=100, help="rows per flush_due sweep")
+    parser.add_argument("--db-url", help="SQLAlchemy URL; a temporary SQLite file by default")
+    parser.add_argument("--redis-url", help="real Redis server; fakeredis by default")
+    parser.add_argument("--json", type=Path, help="also write the results to this file")
+    parser.add_argument(
+        "--compare", nargs=2, type=Path, metavar=("BEFORE", "AFTER"), help="compare two results"
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        before, after = (json.loads(path.read_text()) for path in args.compare)
+        print(compare(before, after))
+        return
+    results = asyncio.run(
+        run_benchmark(
+            tasks=args.tasks,
+            concurrency=args.concurrency,
+            flush_limit=args.flush_limit,
+            db_url=args.db_url,
+            redis_url=args.redis_url,
+        )
+    )
+    print(report(results))
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
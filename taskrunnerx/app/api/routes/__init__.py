@@ -1,15 +1,78 @@
-from typing import Any
+import asyncio
+from collections.abc import AsyncIterator, Callable
+from datetime import datetime
+import json
+import time
+from typing import Annotated, Any, TypeVar
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
+from ....metrics import Metrics, metrics, series_key
+from ...config import get_settings
 from ...deps import db_session
-from ...metrics import metrics
-from ...schemas import EnqueueResult, TaskCreate, TaskRead
+from ...schemas import (
+    PENDING_STREAM_ID,
+    BatchEnqueueResult,
+    BatchItemResult,
+    DeadLetterFilter,
+    DeadLetterRedrive,
+    EnqueueResult,
+    RedriveJobRead,
+    ScheduleCreate,
+    ScheduleRead,
+    ScheduleUpdate,
+    TaskBatchCreate,
+    TaskCreate,
+    TaskFilter,
+    TaskRead,
+    TaskStatsRead,
+)
+from ...services.admission import DIVERT, REJECT, admission
+from ...services.cache import task_cache
+from ...services.cluster_metrics import cluster_metrics
+from ...services.events import TERMINAL_STATUSES, events
+from ...services.export import (
+    DEAD_LETTER_COLUMNS,
+    dead_letter_export_query,
+    iter_ndjson,
+    task_export_query,
+)
+from ...services.lifecycle import record_stage
+from ...services.publisher import publisher
 from ...services.queue import queue
-from ...services.tasks import create_task, get_task, list_tasks
+from ...services.redrive import redriver
+from ...services.schedules import (
+    create_schedule,
+    delete_schedule,
+    get_schedule,
+    list_schedules,
+    update_schedule,
+)
+from ...services.serialization import FastJSONResponse, dumps
+from ...services.stats import read_task_stats
+from ...services.tasks import (
+    TASK_COLUMNS,
+    create_task,
+    create_tasks,
+    decode_cursor,
+    encode_cursor,
+    get_task,
+    get_task_row,
+    keyset_column,
+    list_task_rows,
+    select_columns,
+)
+from ...services.tracing import SPAN_KIND_SERVER, parse_traceparent, tracer
 
+settings = get_settings()
 router = APIRouter()
 
+T = TypeVar("T")
+
 
 @router.get("/health")
 async def health() -> dict[str, str]:
@@ -18,20 +81,115 @@ async def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+def _admit(names: set[str]) -> str | None:
+    """Apply admission control to a submission; returns the stream to divert it to, if any."""
+
+    if not settings.admission_enabled:
+        return None
+    decisions = {admission.decide(name) for name in names}
+    if REJECT in decisions:
+        raise HTTPException(
+            status_code=429,
+            detail="Task backlog is over its limit; retry later",
+            headers={"Retry-After": str(settings.admission_retry_after_s)},
+        )
+    return settings.redis_low_priority_stream if DIVERT in decisions else None
+
+
+def _persist(create: Callable[[Session], T]) -> T:
+    """Run ``create`` in a transaction, once more if a concurrent duplicate won its key.
+
+    Submissions that claimed their dedupe keys in Redis insert without looking for
+    duplicates, so the unique execution (or idempotency) key rejects the loser of a race;
+    the retry finds the winner's task instead.
+    """
+
+    try:
+        with db_session() as db:
+            return create(db)
+    except IntegrityError:
+        with db_session() as db:
+            return create(db)
+
+
 @router.post("/tasks", response_model=EnqueueResult, status_code=201)
-async def submit_task(payload: TaskCreate) -> EnqueueResult:
-    """Persist a task and enqueue it for workers."""
+async def submit_task(
+    payload: TaskCreate, traceparent: str | None = Header(default=None)
+) -> EnqueueResult:
+    """Persist a task and enqueue it for workers.
 
-    with db_session() as db:
-        task, _ = create_task(db, payload)
-    stream_id = await queue.dispatch_task(task.id)
-    return EnqueueResult(task_id=task.id, stream_id=stream_id)
+    A W3C ``traceparent`` header makes the task's spans part of the caller's trace.
+    """
+
+    stream = _admit({payload.name})
+    with tracer.span(
+        "submit_task",
+        parse_traceparent(traceparent),
+        kind=SPAN_KIND_SERVER,
+        attributes={"task.name": payload.name},
+    ) as span:
+        submitted = time.perf_counter()
+        task_id = _persist(
+            lambda db: create_task(
+                db, payload, stream=stream, traceparent=span.context.traceparent
+            )[0].id
+        )
+        record_stage("submit", time.perf_counter() - submitted, payload.name)
+        span.attributes["task.id"] = task_id
+        if settings.fast_ack_enabled:
+            publisher.submit([task_id])
+            return EnqueueResult(task_id=task_id, stream_id=PENDING_STREAM_ID)
+        stream_id = await queue.dispatch_task(task_id)
+    return EnqueueResult(task_id=task_id, stream_id=stream_id)
 
 
-@router.get("/tasks/{task_id}", response_model=TaskRead)
-def read_task(task_id: int) -> TaskRead:
-    """Fetch a task by primary key."""
+@router.post("/tasks:batch", response_model=BatchEnqueueResult, status_code=201)
+async def submit_tasks(
+    payload: TaskBatchCreate, traceparent: str | None = Header(default=None)
+) -> BatchEnqueueResult:
+    """Persist many tasks in one transaction and enqueue them through a single pipeline.
 
+    Every task of the batch continues the same ``submit_tasks`` span.
+    """
+
+    stream = _admit({item.name for item in payload.items})
+    with tracer.span(
+        "submit_tasks",
+        parse_traceparent(traceparent),
+        kind=SPAN_KIND_SERVER,
+        attributes={"batch.size": len(payload.items)},
+    ) as span:
+        submitted = time.perf_counter()
+        created = _persist(
+            lambda db: [
+                (task.id, is_new)
+                for task, is_new in create_tasks(
+                    db, payload.items, stream=stream, traceparent=span.context.traceparent
+                )
+            ]
+        )
+        elapsed = time.perf_counter() - submitted
+        for item in payload.items:
+            record_stage("submit", elapsed, item.name)
+        task_ids = [task_id for task_id, _ in created]
+        if settings.fast_ack_enabled:
+            publisher.submit(dict.fromkeys(task_ids))
+            stream_ids = dict.fromkeys(task_ids, PENDING_STREAM_ID)
+        else:
+            stream_ids = await queue.dispatch_tasks(task_ids)
+    return BatchEnqueueResult(
+        items=[
+            BatchItemResult(
+                task_id=task_id,
+                stream_id=stream_ids.get(task_id, ""),
+                deduplicated=not is_new,
+            )
+            for task_id, is_new in created
+        ]
+    )
+
+
+def _load_task(task_id: int) -> TaskRead:
     with db_session() as db:
         t = get_task(db, task_id)
         if not t:
@@ -39,17 +197,328 @@ def read_task(task_id: int) -> TaskRead:
         return TaskRead.model_validate(t)
 
 
-@router.get("/tasks", response_model=list[TaskRead])
-def read_tasks(limit: int = 50, offset: int = 0) -> list[TaskRead]:
-    """List tasks with pagination controls."""
+def _fields(fields: str | None) -> list[str]:
+    try:
+        return select_columns(TASK_COLUMNS, fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _task_filter(
+    status: str | None = None,
+    name: str | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None,
+    min_attempts: int | None = Query(None, ge=0),
+) -> TaskFilter:
+    return TaskFilter(
+        status=status,
+        name=name,
+        created_after=created_after,
+        created_before=created_before,
+        min_attempts=min_attempts,
+    )
+
+
+def _dead_letter_filter(
+    name: str | None = None,
+    error: str | None = Query(None, description="Substring of the recorded error"),
+    failed_after: datetime | None = None,
+    failed_before: datetime | None = None,
+) -> DeadLetterFilter:
+    return DeadLetterFilter(
+        name=name, error=error, failed_after=failed_after, failed_before=failed_before
+    )
+
+
+def _load_task_json(task_id: int, columns: list[str]) -> bytes | None:
+    with db_session() as db:
+        row = get_task_row(db, task_id, columns)
+    return dumps(row) if row is not None else None
+
+
+@router.get(
+    "/tasks/{task_id}",
+    response_class=Response,
+    # * Pre-encoded bytes, so no response_model; ``fields`` may return a subset of TaskRead.
+    responses={200: {"model": TaskRead, "description": "The task, or only its `fields`."}},
+)
+def read_task(task_id: int, fields: str | None = None) -> Response:
+    """Fetch a task by primary key; ``fields=id,status`` loads and returns only those columns.
+
+    Full reads go through the read cache when it is enabled.
+    """
+
+    columns = _fields(fields)
+    if settings.task_cache_enabled and fields is None:
+        body = task_cache.get_or_load(task_id, lambda: _load_task_json(task_id, columns))
+    else:
+        body = _load_task_json(task_id, columns)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/tasks/{task_id}/wait", response_model=TaskRead)
+async def wait_for_task(
+    task_id: int, wait_seconds: float = Query(30.0, alias="timeout", gt=0, le=120)
+) -> TaskRead:
+    """Long-poll until the task reaches a terminal state or ``timeout`` seconds pass.
+
+    Returns the task as it stands when the wait ends, terminal or not.
+    """
+
+    with events.subscribe(task_id) as updates:
+        task = await run_in_threadpool(_load_task, task_id)
+        if task.status in TERMINAL_STATUSES:
+            return task
+        try:
+            async with asyncio.timeout(wait_seconds):
+                while (await updates.get()).get("status") not in TERMINAL_STATUSES:
+                    pass
+        except TimeoutError:
+            pass
+    return await run_in_threadpool(_load_task, task_id)
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(
+    task_id: int, keepalive: float = Query(15.0, gt=0, le=60)
+) -> StreamingResponse:
+    """Server-sent events: the current state, then every transition until a terminal one."""
+
+    # Resolve the task up front so a missing one is a 404 rather than an empty stream.
+    await run_in_threadpool(_load_task, task_id)
+
+    async def stream() -> AsyncIterator[str]:
+        with events.subscribe(task_id) as updates:
+            current = await run_in_threadpool(_load_task, task_id)
+            yield _sse("task", current.model_dump_json())
+            if current.status in TERMINAL_STATUSES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(updates.get(), keepalive)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse("status", json.dumps(event))
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
+@router.get(
+    "/tasks",
+    response_class=FastJSONResponse,
+    responses={200: {"model": list[TaskRead], "description": "Tasks, or only their `fields`."}},
+)
+def read_tasks(
+    filters: Annotated[TaskFilter, Depends(_task_filter)],
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0, deprecated=True),
+    cursor: str | None = None,
+    fields: str | None = None,
+) -> FastJSONResponse:
+    """List tasks newest first; follow ``X-Next-Cursor`` for the next page.
+
+    ``created_after``/``created_before`` order by ``created_at`` and ``min_attempts`` by
+    attempts, most first, so every page is an index range scan (see ``keyset_column``).
+    ``fields=id,status`` projects only those columns in SQL, so dashboards never load payloads.
+    """
 
+    columns = _fields(fields)
+    try:
+        position = decode_cursor(cursor) if cursor else None
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    keyset = keyset_column(filters)
+    # The cursor needs these even when the caller did not ask for them.
+    hidden = [column for column in ("id", keyset) if column and column not in columns]
+    try:
+        with db_session() as db:
+            rows = list_task_rows(
+                db,
+                [*hidden, *columns],
+                limit=limit + 1,
+                offset=0 if cursor else offset,
+                cursor=position,
+                filters=filters,
+            )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1], keyset)
+    for row in rows:
+        for column in hidden:
+            del row[column]
+    return FastJSONResponse(rows, headers=headers)
+
+
+def _ndjson_response(body: Any, filename: str, gzip: bool) -> StreamingResponse:
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type="application/x-ndjson", headers=headers)
+
+
+@router.get("/tasks:export")
+def export_tasks(
+    filters: Annotated[TaskFilter, Depends(_task_filter)],
+    columns: str | None = None,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream matching tasks as NDJSON, one object per line, in id order."""
+
+    try:
+        selected = select_columns(TASK_COLUMNS, columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    stmt = task_export_query(selected, filters)
+    return _ndjson_response(iter_ndjson(stmt, selected, gzip=gzip), "tasks", gzip)
+
+
+@router.get("/dead-letters:export")
+def export_dead_letters(
+    filters: Annotated[DeadLetterFilter, Depends(_dead_letter_filter)],
+    columns: str | None = None,
+    gzip: bool = False,
+) -> StreamingResponse:
+    """Stream dead-lettered task records as NDJSON in id order."""
+
+    try:
+        selected = select_columns(DEAD_LETTER_COLUMNS, columns)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    stmt = dead_letter_export_query(selected, filters)
+    return _ndjson_response(iter_ndjson(stmt, selected, gzip=gzip), "dead-letters", gzip)
+
+
+@router.post("/dead-letters:redrive", response_model=RedriveJobRead, status_code=202)
+async def redrive_dead_letters(payload: DeadLetterRedrive) -> RedriveJobRead:
+    """Start replaying matching dead-lettered tasks at ``rate_per_s``; poll the job for progress."""
+
+    filters = payload.model_dump(exclude={"rate_per_s"}, exclude_none=True)
+    job = redriver.start(filters, rate_per_s=payload.rate_per_s)
+    return RedriveJobRead.model_validate(job)
+
+
+@router.get("/dead-letters:redrive/{job_id}", response_model=RedriveJobRead)
+async def read_redrive_job(job_id: str) -> RedriveJobRead:
+    job = redriver.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Redrive job not found")
+    return RedriveJobRead.model_validate(job)
+
+
+@router.post("/schedules", response_model=ScheduleRead, status_code=201)
+def create_schedule_route(payload: ScheduleCreate) -> ScheduleRead:
+    """Register a recurring schedule; the scheduler leader picks it up on its next poll."""
+
+    try:
+        with db_session() as db:
+            return ScheduleRead.model_validate(create_schedule(db, payload))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except IntegrityError as exc:
+        raise HTTPException(status_code=409, detail="Schedule name already exists") from exc
+
+
+@router.get("/schedules", response_model=list[ScheduleRead])
+def read_schedules() -> list[ScheduleRead]:
+    with db_session() as db:
+        return [ScheduleRead.model_validate(schedule) for schedule in list_schedules(db)]
+
+
+@router.get("/schedules/{schedule_id}", response_model=ScheduleRead)
+def read_schedule(schedule_id: int) -> ScheduleRead:
+    with db_session() as db:
+        schedule = get_schedule(db, schedule_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        return ScheduleRead.model_validate(schedule)
+
+
+@router.patch("/schedules/{schedule_id}", response_model=ScheduleRead)
+def update_schedule_route(schedule_id: int, payload: ScheduleUpdate) -> ScheduleRead:
+    try:
+        with db_session() as db:
+            schedule = get_schedule(db, schedule_id)
+            if schedule is None:
+                raise HTTPException(status_code=404, detail="Schedule not found")
+            update_schedule(db, schedule, payload)
+            db.flush()
+            return ScheduleRead.model_validate(schedule)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.delete("/schedules/{schedule_id}", status_code=204)
+def delete_schedule_route(schedule_id: int) -> Response:
     with db_session() as db:
-        tasks = list_tasks(db, limit=limit, offset=offset)
-    return [TaskRead.model_validate(task) for task in tasks]
+        schedule = get_schedule(db, schedule_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Schedule not found")
+        delete_schedule(db, schedule)
+    return Response(status_code=204)
+
+
+@router.get("/stats", response_model=TaskStatsRead)
+def read_stats() -> TaskStatsRead:
+    """Task counts per name and status, read from the rollup table rather than counted."""
+
+    with db_session() as db:
+        counts = read_task_stats(db)
+    totals: dict[str, int] = {}
+    for by_status in counts.values():
+        for status, count in by_status.items():
+            totals[status] = totals.get(status, 0) + count
+    return TaskStatsRead(counts=counts, totals=totals)
+
+
+async def _metrics_view(scope: str) -> Metrics:
+    if scope == "cluster" and settings.metrics_redis_enabled:
+        return await cluster_metrics.read()
+    return metrics
+
+
+def _task_counts() -> dict[str, dict[str, int]]:
+    with db_session() as db:
+        return read_task_stats(db)
 
 
 @router.get("/metrics")
-def read_metrics() -> dict[str, Any]:
-    """Expose in-memory task execution metrics."""
+async def read_metrics(
+    scope: str = Query(default="cluster", pattern="^(cluster|local)$"),
+) -> dict[str, Any]:
+    """Expose task execution metrics, merged across processes when METRICS_REDIS is on."""
+
+    return (await _metrics_view(scope)).get_stats()
+
+
+@router.get("/metrics/prometheus")
+async def read_prometheus_metrics(
+    scope: str = Query(default="cluster", pattern="^(cluster|local)$"),
+) -> Response:
+    """Prometheus text exposition, plus task counts by name and status from ``task_stats``."""
 
-    return metrics.get_stats()
+    view = await _metrics_view(scope)
+    counts = await run_in_threadpool(_task_counts)
+    task_gauges = {
+        series_key("tasks", {"task": name, "status": status}): float(count)
+        for name, by_status in counts.items()
+        for status, count in by_status.items()
+    }
+    return Response(
+        content=view.render_prometheus(task_gauges),
+        media_type="text/plain; version=0.0.4",
+    )
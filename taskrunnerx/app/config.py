@@ -22,25 +22,153 @@ class Settings(BaseModel):
     redis_stream: str = Field(default=os.getenv("REDIS_STREAM", "trx.tasks"))
     redis_group: str = Field(default=os.getenv("REDIS_GROUP", "trx.workers"))
     redis_dlq_stream: str = Field(default=os.getenv("REDIS_DLQ_STREAM", "trx.tasks.dlq"))
+    redis_events_channel: str = Field(
+        default=os.getenv("REDIS_EVENTS_CHANNEL", "trx.task_events")
+    )
+    redis_stream_shards: int = Field(default=int(os.getenv("REDIS_STREAM_SHARDS", "1")), ge=1)
+    redis_cluster: bool = Field(default=os.getenv("REDIS_CLUSTER", "false").casefold() == "true")
 
     # * Scheduler
     scheduler_enabled: bool = Field(
         default=os.getenv("SCHEDULER_ENABLED", "true").casefold() == "true"
     )
+    scheduler_leader_key: str = Field(
+        default=os.getenv("SCHEDULER_LEADER_KEY", "trx.scheduler.leader")
+    )
+    scheduler_lease_ms: int = Field(default=int(os.getenv("SCHEDULER_LEASE_MS", "15000")), ge=1)
+    scheduler_poll_ms: int = Field(default=int(os.getenv("SCHEDULER_POLL_MS", "1000")), ge=1)
+    scheduler_fire_batch: int = Field(default=int(os.getenv("SCHEDULER_FIRE_BATCH", "500")), ge=1)
+    # * A fire time later than this is a misfire and handled by the schedule's misfire policy
+    scheduler_misfire_grace_ms: int = Field(
+        default=int(os.getenv("SCHEDULER_MISFIRE_GRACE_MS", "60000")), ge=0
+    )
+    scheduler_catchup_rate_per_s: float = Field(
+        default=float(os.getenv("SCHEDULER_CATCHUP_RATE_PER_S", "10")), gt=0
+    )
+    # * Timing-wheel relay for delayed tasks: how far ahead to load and how finely to fire
+    relay_horizon_ms: int = Field(default=int(os.getenv("RELAY_HORIZON_MS", "60000")), ge=1)
+    relay_tick_ms: int = Field(default=int(os.getenv("RELAY_TICK_MS", "100")), ge=1)
+    relay_load_ms: int = Field(default=int(os.getenv("RELAY_LOAD_MS", "1000")), ge=1)
+    relay_max_entries: int = Field(default=int(os.getenv("RELAY_MAX_ENTRIES", "200000")), ge=1)
 
     # * Task execution safety
     dedupe_window_ms: int = Field(
         default=int(os.getenv("TASK_DEDUPE_WINDOW_MS", "60000")), ge=1
     )
     clock_skew_ms: int = Field(default=int(os.getenv("TASK_CLOCK_SKEW_MS", "500")), ge=0)
+    dedupe_cache_enabled: bool = Field(
+        default=os.getenv("TASK_DEDUPE_CACHE", "false").casefold() == "true"
+    )
+    dedupe_cache_timeout_ms: int = Field(
+        default=int(os.getenv("TASK_DEDUPE_CACHE_TIMEOUT_MS", "50")), ge=1
+    )
+    dedupe_cache_cooldown_ms: int = Field(
+        default=int(os.getenv("TASK_DEDUPE_CACHE_COOLDOWN_MS", "5000")), ge=0
+    )
+    idempotency_retention_s: int = Field(
+        default=int(os.getenv("TASK_IDEMPOTENCY_RETENTION_S", "86400")), ge=1
+    )
     max_task_attempts: int = Field(default=int(os.getenv("TASK_MAX_ATTEMPTS", "5")), ge=1)
     retry_backoff_ms: int = Field(default=int(os.getenv("TASK_RETRY_BACKOFF_MS", "500")), ge=0)
     retry_backoff_multiplier: float = Field(
         default=float(os.getenv("TASK_RETRY_BACKOFF_MULTIPLIER", "2.0")), ge=1.0
     )
 
+    # * Fast-ack submission: respond after commit and let a background publisher dispatch
+    fast_ack_enabled: bool = Field(
+        default=os.getenv("TASK_FAST_ACK", "false").casefold() == "true"
+    )
+    publisher_batch_size: int = Field(
+        default=int(os.getenv("PUBLISHER_BATCH_SIZE", "500")), ge=1
+    )
+    publisher_linger_ms: int = Field(default=int(os.getenv("PUBLISHER_LINGER_MS", "5")), ge=0)
+    publisher_max_pending: int = Field(
+        default=int(os.getenv("PUBLISHER_MAX_PENDING", "100000")), ge=1
+    )
+
+    # * Read-through cache for GET /api/tasks/{id}
+    task_cache_enabled: bool = Field(
+        default=os.getenv("TASK_READ_CACHE", "false").casefold() == "true"
+    )
+    task_cache_max_entries: int = Field(
+        default=int(os.getenv("TASK_READ_CACHE_MAX_ENTRIES", "10000")), ge=1
+    )
+    task_cache_ttl_ms: int = Field(default=int(os.getenv("TASK_READ_CACHE_TTL_MS", "30000")), ge=1)
+    task_cache_redis_enabled: bool = Field(
+        default=os.getenv("TASK_READ_CACHE_REDIS", "false").casefold() == "true"
+    )
+    task_cache_redis_ttl_ms: int = Field(
+        default=int(os.getenv("TASK_READ_CACHE_REDIS_TTL_MS", "60000")), ge=1
+    )
+
+    # * Admission control on submission, from signals refreshed in the background
+    admission_enabled: bool = Field(
+        default=os.getenv("TASK_ADMISSION", "false").casefold() == "true"
+    )
+    # * "reject" answers 429; "divert" routes to the low-priority lane until twice the limit.
+    admission_action: str = Field(default=os.getenv("ADMISSION_ACTION", "reject"))
+    admission_max_depth: int = Field(default=int(os.getenv("ADMISSION_MAX_DEPTH", "100000")), ge=1)
+    admission_max_depth_per_name: int = Field(
+        default=int(os.getenv("ADMISSION_MAX_DEPTH_PER_NAME", "50000")), ge=1
+    )
+    admission_max_lag: int = Field(default=int(os.getenv("ADMISSION_MAX_LAG", "50000")), ge=1)
+    admission_refresh_ms: int = Field(default=int(os.getenv("ADMISSION_REFRESH_MS", "1000")), ge=1)
+    admission_retry_after_s: int = Field(
+        default=int(os.getenv("ADMISSION_RETRY_AFTER_S", "5")), ge=1
+    )
+    redis_low_priority_stream: str = Field(
+        default=os.getenv("REDIS_LOW_PRIORITY_STREAM", "trx.tasks.low")
+    )
+
+    # * Dead-letter redrive
+    redrive_chunk_size: int = Field(default=int(os.getenv("REDRIVE_CHUNK_SIZE", "500")), ge=1)
+    redrive_rate_per_s: float = Field(default=float(os.getenv("REDRIVE_RATE_PER_S", "50")), gt=0)
+
+    # * Store each task's per-stage timeline on its row (one extra JSON write per finish)
+    task_timeline_enabled: bool = Field(
+        default=os.getenv("TASK_TIMELINE", "false").casefold() == "true"
+    )
+
+    # * Backlog and event-loop monitor in the worker and scheduler; warns once per breach
+    queue_monitor_enabled: bool = Field(
+        default=os.getenv("QUEUE_MONITOR", "true").casefold() == "true"
+    )
+    monitor_interval_ms: int = Field(default=int(os.getenv("MONITOR_INTERVAL_MS", "5000")), ge=100)
+    monitor_loop_probe_ms: int = Field(
+        default=int(os.getenv("MONITOR_LOOP_PROBE_MS", "250")), ge=10
+    )
+    monitor_warn_lag: int = Field(default=int(os.getenv("MONITOR_WARN_LAG", "10000")), ge=1)
+    monitor_warn_pending: int = Field(default=int(os.getenv("MONITOR_WARN_PENDING", "1000")), ge=1)
+    monitor_warn_loop_lag_ms: int = Field(
+        default=int(os.getenv("MONITOR_WARN_LOOP_LAG_MS", "250")), ge=1
+    )
+
+    # * Tracing: W3C traceparent carried from submission to the worker, sampled at the root
+    trace_sample_ratio: float = Field(
+        default=float(os.getenv("TRACE_SAMPLE_RATIO", "0.01")), ge=0, le=1
+    )
+    # * OTLP/HTTP JSON traces endpoint, e.g. http://localhost:4318/v1/traces; empty disables export
+    otlp_traces_endpoint: str = Field(default=os.getenv("OTLP_TRACES_ENDPOINT", ""))
+    trace_queue_size: int = Field(default=int(os.getenv("TRACE_QUEUE_SIZE", "2048")), ge=1)
+
+    # * Cluster-wide metrics: every process flushes deltas to Redis, the API merges them
+    metrics_redis_enabled: bool = Field(
+        default=os.getenv("METRICS_REDIS", "false").casefold() == "true"
+    )
+    metrics_redis_prefix: str = Field(default=os.getenv("METRICS_REDIS_PREFIX", "trx.metrics"))
+    metrics_flush_ms: int = Field(default=int(os.getenv("METRICS_FLUSH_MS", "10000")), ge=100)
+    metrics_window_minutes: int = Field(
+        default=int(os.getenv("METRICS_WINDOW_MINUTES", "5")), ge=1
+    )
+
     # * Misc
     log_level: str = Field(default=os.getenv("LOG_LEVEL", "INFO"))
+    # * "text" or "json" (one object per line, trace fields included)
+    log_format: str = Field(default=os.getenv("LOG_FORMAT", "text"))
+    # * Per-logger thinning of records below WARNING, e.g. "worker.processed=0.1"
+    log_sampling: str = Field(default=os.getenv("LOG_SAMPLING", ""))
+    # * Per-logger records per second below WARNING, e.g. "worker.processed=100"
+    log_rate_limits: str = Field(default=os.getenv("LOG_RATE_LIMITS", ""))
 
     @property
     def sqlalchemy_dsn(self) -> str:
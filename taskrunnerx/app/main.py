@@ -3,7 +3,13 @@ import uvicorn
 
 from .api.routes import router as api_router
 from .config import get_settings
+from .services.admission import admission
+from .services.cache import task_cache
+from .services.cluster_metrics import cluster_metrics
+from .services.events import events
+from .services.publisher import publisher
 from .services.queue import queue
+from .services.tracing import tracer
 
 settings = get_settings()
 app = FastAPI(title=settings.app_name)
@@ -12,10 +18,25 @@ app = FastAPI(title=settings.app_name)
 @app.on_event("startup")
 async def on_startup() -> None:
     await queue.connect()
+    if settings.fast_ack_enabled:
+        publisher.start()
+    if settings.task_cache_enabled:
+        events.add_listener(task_cache.on_task_event)
+        events.start()
+    if settings.admission_enabled:
+        admission.start()
+    if settings.metrics_redis_enabled:
+        cluster_metrics.start("api")
+    tracer.start("taskrunnerx-api")
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await tracer.stop()
+    await cluster_metrics.stop()
+    await admission.stop()
+    await publisher.stop()
+    await events.stop()
     await queue.close()
 
 
@@ -1,7 +1,18 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import DateTime, ForeignKey, Integer, JSON, String, Text, UniqueConstraint
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    JSON,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
 from sqlalchemy.sql import func
@@ -13,6 +24,16 @@ class Task(Base):
     """SQLAlchemy model for queued and processed tasks."""
 
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_dedupe", "name", "payload_hash", "scheduled_window_start"),
+        Index("uq_tasks_idempotency_key", "name", "idempotency_key", unique=True),
+        # * Keyset listing filters; ix_tasks_name/ix_tasks_status cover single-column filters.
+        Index("ix_tasks_name_status_id", "name", "status", "id"),
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        Index("ix_tasks_attempts_id", "attempts", "id"),
+        # * Due backlog per name for admission control, counted from the index alone.
+        Index("ix_tasks_status_scheduled_at_name", "status", "scheduled_at", "name"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(128), index=True, nullable=False)
@@ -26,6 +47,7 @@ class Task(Base):
         DateTime(timezone=True), nullable=False
     )
     execution_key: Mapped[str] = mapped_column(String(256), nullable=False, unique=True)
+    idempotency_key: Mapped[str | None] = mapped_column(String(100), nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -37,6 +59,10 @@ class Task(Base):
     )
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # * Marks and stage durations of the last delivery; written only with TASK_TIMELINE=true.
+    timeline: Mapped[dict[str, Any] | None] = mapped_column(JSON, nullable=True)
+    # * W3C traceparent of the span that created the task; every delivery continues it.
+    traceparent: Mapped[str | None] = mapped_column(String(55), nullable=True)
 
     outbox: Mapped[Optional["TaskOutbox"]] = relationship(
         "TaskOutbox", back_populates="task", cascade="all, delete-orphan", uselist=False
@@ -51,6 +77,8 @@ class Task(Base):
 
 class TaskOutbox(Base):
     __tablename__ = "task_outbox"
+    # * Unsent rows in due order, so relay sweeps never scan rows that are not due yet.
+    __table_args__ = (Index("ix_task_outbox_pending", "sent_at", "available_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     task_id: Mapped[int] = mapped_column(
@@ -97,3 +125,38 @@ class TaskDeadLetter(Base):
     failed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
 
     task: Mapped[Task] = relationship("Task", back_populates="dead_letter")
+
+
+class TaskStat(Base):
+    """Rolled-up task count per ``(name, status)``, maintained alongside each transition."""
+
+    __tablename__ = "task_stats"
+
+    name: Mapped[str] = mapped_column(String(128), primary_key=True)
+    status: Mapped[str] = mapped_column(String(32), primary_key=True)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
+class TaskSchedule(Base):
+    """Recurring schedule that enqueues ``task_name`` on a cron expression or fixed interval."""
+
+    __tablename__ = "task_schedules"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String(128), nullable=False, unique=True)
+    task_name: Mapped[str] = mapped_column(String(128), nullable=False)
+    payload: Mapped[dict[str, Any]] = mapped_column(JSON, nullable=False, default=dict)
+    routing_key: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    cron: Mapped[str | None] = mapped_column(String(128), nullable=True)
+    interval_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    # * What to do with fire times missed while no scheduler ran: skip, coalesce or catch_up.
+    misfire_policy: Mapped[str] = mapped_column(String(16), nullable=False, default="coalesce")
+    catchup_rate_per_s: Mapped[float | None] = mapped_column(Float, nullable=True)
+    next_run_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    last_run_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # * Bumped on every API change so the scheduler leader notices edits cheaply.
+    revision: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
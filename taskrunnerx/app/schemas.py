@@ -1,13 +1,20 @@
 from datetime import datetime
-from typing import Any
+from typing import Any, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
+
+# * Reported as the stream id when dispatch is deferred to the background publisher.
+PENDING_STREAM_ID = "pending"
+
+MisfirePolicy = Literal["skip", "coalesce", "catch_up"]
 
 
 class TaskCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=128)
     payload: dict[str, Any] | None = None
     scheduled_at: datetime | None = None
+    routing_key: str | None = Field(default=None, min_length=1, max_length=128)
+    idempotency_key: str | None = Field(default=None, min_length=1, max_length=100)
 
 
 class TaskRead(BaseModel):
@@ -25,6 +32,9 @@ class TaskRead(BaseModel):
     scheduled_at: datetime
     scheduled_window_start: datetime
     execution_key: str
+    idempotency_key: str | None = None
+    timeline: dict[str, Any] | None = None
+    traceparent: str | None = None
 
     class Config:
         from_attributes = True
@@ -33,3 +43,121 @@ class TaskRead(BaseModel):
 class EnqueueResult(BaseModel):
     task_id: int
     stream_id: str
+
+
+class TaskBatchCreate(BaseModel):
+    items: list[TaskCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class BatchItemResult(BaseModel):
+    task_id: int
+    stream_id: str
+    deduplicated: bool
+
+
+class BatchEnqueueResult(BaseModel):
+    items: list[BatchItemResult]
+
+
+class TaskFilter(BaseModel):
+    """Filters shared by the task listing and export; unset fields match every task."""
+
+    status: str | None = None
+    name: str | None = None
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    min_attempts: int | None = Field(default=None, ge=0)
+
+
+class TaskStatsRead(BaseModel):
+    counts: dict[str, dict[str, int]]
+    totals: dict[str, int]
+
+
+class DeadLetterFilter(BaseModel):
+    name: str | None = None
+    error: str | None = Field(default=None, description="Substring of the recorded error")
+    failed_after: datetime | None = None
+    failed_before: datetime | None = None
+
+
+class DeadLetterRedrive(DeadLetterFilter):
+    rate_per_s: float | None = Field(default=None, gt=0, le=10000)
+
+
+class RedriveJobRead(BaseModel):
+    id: str
+    filters: dict[str, Any]
+    rate_per_s: float
+    status: str
+    reset: int
+    dispatched: int
+    error: str | None = None
+    started_at: datetime
+    finished_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class ScheduleCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=128)
+    task_name: str = Field(..., min_length=1, max_length=128)
+    payload: dict[str, Any] = Field(
+        default_factory=dict,
+        description="Template; ${fire_time}, ${schedule_id} and ${schedule_name} are substituted",
+    )
+    routing_key: str | None = Field(default=None, min_length=1, max_length=128)
+    cron: str | None = Field(default=None, min_length=1, max_length=128)
+    interval_seconds: int | None = Field(default=None, ge=1)
+    enabled: bool = True
+    misfire_policy: MisfirePolicy = Field(
+        default="coalesce",
+        description="Fire times missed while no scheduler ran: drop them, fire the latest once, "
+        "or fire each one on the low-priority lane at catchup_rate_per_s",
+    )
+    catchup_rate_per_s: float | None = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def _one_trigger(self) -> "ScheduleCreate":
+        if (self.cron is None) == (self.interval_seconds is None):
+            msg = "Exactly one of cron or interval_seconds is required"
+            raise ValueError(msg)
+        return self
+
+
+class ScheduleUpdate(BaseModel):
+    task_name: str | None = Field(default=None, min_length=1, max_length=128)
+    payload: dict[str, Any] | None = None
+    routing_key: str | None = Field(default=None, min_length=1, max_length=128)
+    cron: str | None = Field(default=None, min_length=1, max_length=128)
+    interval_seconds: int | None = Field(default=None, ge=1)
+    enabled: bool | None = None
+    misfire_policy: MisfirePolicy | None = None
+    catchup_rate_per_s: float | None = Field(default=None, gt=0)
+
+    @model_validator(mode="after")
+    def _one_trigger(self) -> "ScheduleUpdate":
+        if self.cron is not None and self.interval_seconds is not None:
+            msg = "Set either cron or interval_seconds, not both"
+            raise ValueError(msg)
+        return self
+
+
+class ScheduleRead(BaseModel):
+    id: int
+    name: str
+    task_name: str
+    payload: dict[str, Any]
+    routing_key: str | None = None
+    cron: str | None = None
+    interval_seconds: int | None = None
+    enabled: bool
+    misfire_policy: str
+    catchup_rate_per_s: float | None = None
+    next_run_at: datetime
+    last_run_at: datetime | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
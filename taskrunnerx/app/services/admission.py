@@ -0,0 +1,123 @@
+"""Admission control for task submission, driven by backlog signals refreshed in the background."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from datetime import UTC, datetime
+
+from ...logging import get_logger
+from ...metrics import metrics
+from ..config import get_settings
+from ..deps import db_session
+from .queue import Queue, queue
+from .stats import read_task_stats
+from .tasks import count_due_tasks
+
+settings = get_settings()
+log = get_logger(__name__)
+
+ADMIT = "admit"
+DIVERT = "divert"
+REJECT = "reject"
+
+# * Statuses that make up the backlog a new submission would queue behind, once due.
+BACKLOG_STATUSES = ("queued", "retrying")
+# * In divert mode, load at which diverting gives way to rejecting.
+DIVERT_UNTIL_LOAD = 2.0
+
+
+class AdmissionController:
+    """Decide whether a submission is admitted, diverted to the low-priority lane or rejected.
+
+    Per-name and overall depth count tasks that are due, i.e. queued or retrying with
+    ``scheduled_at`` in the past, so delayed tasks and retries in backoff never hold back new
+    work while the streams are empty. Consumer lag comes from XINFO GROUPS. Both are refreshed
+    every ``refresh_ms`` so a decision is a few dict lookups. The ``task_stats`` backlog, which
+    includes delayed work, is kept in :attr:`scheduled_backlog` for reporting only. The
+    load is the worst of the three signals relative to its limit: below 1 the task is admitted;
+    above it the task is rejected, or with ``action="divert"`` diverted until the load reaches
+    :data:`DIVERT_UNTIL_LOAD`. Until the first refresh succeeds everything is admitted.
+    """
+
+    def __init__(
+        self,
+        task_queue: Queue = queue,
+        *,
+        action: str = settings.admission_action,
+        max_depth: int = settings.admission_max_depth,
+        max_depth_per_name: int = settings.admission_max_depth_per_name,
+        max_lag: int = settings.admission_max_lag,
+        refresh_ms: int = settings.admission_refresh_ms,
+    ) -> None:
+        self._queue = task_queue
+        self._action = action
+        self._max_depth = max_depth
+        self._max_depth_per_name = max_depth_per_name
+        self._max_lag = max_lag
+        self._interval = refresh_ms / 1000
+        self.depth_by_name: dict[str, int] = {}
+        self.depth = 0
+        self.lag = 0
+        self.scheduled_backlog = 0
+        self._runner: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        runner, self._runner = self._runner, None
+        if runner is None:
+            return
+        runner.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+
+    def load(self, name: str) -> float:
+        return max(
+            self.depth / self._max_depth,
+            self.depth_by_name.get(name, 0) / self._max_depth_per_name,
+            self.lag / self._max_lag,
+        )
+
+    def decide(self, name: str) -> str:
+        load = self.load(name)
+        if load < 1:
+            return ADMIT
+        if self._action == DIVERT and load < DIVERT_UNTIL_LOAD:
+            metrics.increment("tasks_diverted")
+            return DIVERT
+        metrics.increment("tasks_rejected")
+        return REJECT
+
+    def _load_depths(self) -> tuple[dict[str, int], int]:
+        with db_session() as db:
+            due = count_due_tasks(db, BACKLOG_STATUSES, datetime.now(tz=UTC))
+            stats = read_task_stats(db)
+        backlog = sum(
+            by_status.get(status, 0) for by_status in stats.values() for status in BACKLOG_STATUSES
+        )
+        return due, backlog
+
+    async def refresh(self) -> None:
+        depth_by_name, scheduled_backlog = await asyncio.to_thread(self._load_depths)
+        lag = await self._queue.consumer_lag(settings.redis_group)
+        self.depth_by_name = depth_by_name
+        self.depth = sum(depth_by_name.values())
+        self.lag = lag
+        self.scheduled_backlog = scheduled_backlog
+        metrics.set_gauge("admission_depth", float(self.depth))
+        metrics.set_gauge("admission_lag", float(lag))
+        metrics.set_gauge("admission_scheduled_backlog", float(scheduled_backlog))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:  # noqa: BLE001 - keep the last signals and try again
+                log.warning("Admission signal refresh failed: %s", exc)
+            await asyncio.sleep(self._interval)
+
+
+admission = AdmissionController()
@@ -0,0 +1,195 @@
+"""Read-through cache of serialized task responses."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Callable
+import threading
+import time
+from typing import Any, cast
+
+import redis
+
+from ...logging import get_logger
+from ..config import get_settings
+from .redis_client import sync_redis
+
+settings = get_settings()
+log = get_logger(__name__)
+
+REDIS_KEY_PREFIX = "trx:task-read:"
+
+# * Return the current version and, when stored under that same version, the cached body.
+_READ = """
+local version = redis.call('get', KEYS[1]) or '0'
+local cached = redis.call('hmget', KEYS[2], 'version', 'body')
+if cached[1] == version then
+    return {version, cached[2]}
+end
+return {version}
+"""
+# * Store the body only if no writer bumped the version since the read that loaded it. The
+# * version key is kept alive past the body: if it expired first, the next bump would restart
+# * its count at 1 and could match a body stored under an earlier 1.
+_FILL = """
+if (redis.call('get', KEYS[1]) or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('hset', KEYS[2], 'version', ARGV[1], 'body', ARGV[2])
+redis.call('pexpire', KEYS[1], ARGV[4])
+return redis.call('pexpire', KEYS[2], ARGV[3])
+"""
+
+
+def redis_cache_key(task_id: int) -> str:
+    # The hash tag keeps a task's body and version in one cluster slot for the scripts.
+    return f"{REDIS_KEY_PREFIX}{{{task_id}}}"
+
+
+def redis_version_key(task_id: int) -> str:
+    return f"{redis_cache_key(task_id)}:version"
+
+
+def version_ttl_ms(body_ttl_ms: int) -> int:
+    """TTL of a version key, set by every bump and every fill to outlast the bodies."""
+
+    return 2 * body_ttl_ms
+
+
+def bump_cached_version(pipe: Any, task_id: int) -> None:
+    """Queue on ``pipe`` the writes that retire every shared cached read of ``task_id``.
+
+    Bumps and fills both push the version key's expiry past that of any body stored under
+    it, so its count never restarts while such a body could still match it.
+    """
+
+    key = redis_version_key(task_id)
+    pipe.incr(key)
+    pipe.pexpire(key, version_ttl_ms(settings.task_cache_redis_ttl_ms))
+
+
+class TaskReadCache:
+    """LRU of serialized ``TaskRead`` bodies with an optional shared Redis tier.
+
+    Entries expire after a TTL and are dropped when a task event announces a state change.
+    Every invalidation ticks a clock; a load that overlapped an invalidation of its task is
+    served but not stored, so a slow read can never repopulate the cache with a stale body.
+
+    The Redis tier is versioned instead: writers bump a per-task version before publishing
+    the event, a read only hits a body stored under the current version, and a loaded body is
+    stored only if the version it was read under is still current. A read that raced a
+    worker commit therefore cannot fill Redis with a stale body for other processes, whether
+    or not this process has seen the event yet.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = settings.task_cache_max_entries,
+        ttl_ms: int = settings.task_cache_ttl_ms,
+        redis_url: str | None = settings.redis_url if settings.task_cache_redis_enabled else None,
+        redis_ttl_ms: int = settings.task_cache_redis_ttl_ms,
+    ) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl_ms / 1000
+        self._redis_url = redis_url
+        self._redis_ttl_ms = redis_ttl_ms
+        self._client: redis.Redis | None = None
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, tuple[float, bytes]] = OrderedDict()
+        self._invalidated: OrderedDict[int, int] = OrderedDict()
+        self._clock = 0
+        self._forgotten_clock = 0
+
+    def _redis(self) -> redis.Redis | None:
+        if self._redis_url is None:
+            return None
+        if self._client is None:
+            # Both keys of a task share its hash tag, so the scripts stay within one slot.
+            self._client = sync_redis(self._redis_url)
+        return self._client
+
+    def _get_local(self, task_id: int) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return None
+            expires_at, body = entry
+            if expires_at < time.monotonic():
+                del self._entries[task_id]
+                return None
+            self._entries.move_to_end(task_id)
+            return body
+
+    def _store_local(self, task_id: int, body: bytes, started_at: int | None) -> bool:
+        with self._lock:
+            if started_at is not None and (
+                self._forgotten_clock > started_at
+                or self._invalidated.get(task_id, -1) > started_at
+            ):
+                return False
+            self._entries[task_id] = (time.monotonic() + self._ttl, body)
+            self._entries.move_to_end(task_id)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def get_or_load(self, task_id: int, loader: Callable[[], bytes | None]) -> bytes | None:
+        """Return the cached body for ``task_id``, calling ``loader`` on a miss."""
+
+        body = self._get_local(task_id)
+        if body is not None:
+            return body
+
+        with self._lock:
+            started_at = self._clock
+        keys = (redis_version_key(task_id), redis_cache_key(task_id))
+        client = self._redis()
+        version: bytes | None = None
+        if client is not None:
+            try:
+                version, *cached = cast(list[bytes], client.eval(_READ, 2, *keys))
+            except redis.RedisError as exc:
+                log.warning("Task cache read from Redis failed: %s", exc)
+                cached = []
+            if cached and cached[0] is not None:
+                self._store_local(task_id, cached[0], started_at)
+                return cached[0]
+
+        body = loader()
+        if body is None or not self._store_local(task_id, body, started_at):
+            return body
+        if client is not None and version is not None:
+            try:
+                client.eval(
+                    _FILL,
+                    2,
+                    *keys,
+                    version,
+                    body,
+                    self._redis_ttl_ms,
+                    version_ttl_ms(self._redis_ttl_ms),
+                )
+            except redis.RedisError as exc:
+                log.warning("Task cache write to Redis failed: %s", exc)
+        return body
+
+    def invalidate(self, task_id: int) -> None:
+        """Drop the local entry; writers bump the Redis version when they publish the event."""
+
+        with self._lock:
+            self._clock += 1
+            self._entries.pop(task_id, None)
+            self._invalidated[task_id] = self._clock
+            self._invalidated.move_to_end(task_id)
+            while len(self._invalidated) > self._max_entries:
+                _, clock = self._invalidated.popitem(last=False)
+                self._forgotten_clock = max(self._forgotten_clock, clock)
+
+    def on_task_event(self, event: dict[str, Any]) -> None:
+        try:
+            self.invalidate(int(event["task_id"]))
+        except (KeyError, TypeError, ValueError):
+            return
+
+
+task_cache = TaskReadCache()
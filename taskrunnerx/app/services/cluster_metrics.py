@@ -0,0 +1,206 @@
+"""Cluster-wide metrics: every process flushes deltas to Redis and the API merges them."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+import contextlib
+import os
+import socket
+import time
+from typing import Any
+
+
+from ...logging import get_logger
+from ...metrics import PROMETHEUS_BUCKETS, Histogram, Metrics, metrics
+from ..config import get_settings
+from .redis_client import async_redis
+
+settings = get_settings()
+log = get_logger(__name__)
+
+# * Separates a series key from the field suffix; split with rpartition since label values
+# * may contain anything.
+_SEP = "|"
+
+
+class ClusterMetrics:
+    """Push this process's metric deltas to Redis every ``flush_ms`` and read the merged view.
+
+    Writes are one pipelined round trip per flush, off the hot path:
+
+    - counters: ``HINCRBY {prefix}:counters <series> <delta>``;
+    - histograms: lifetime count, sum and Prometheus bucket deltas into ``{prefix}:timers``,
+      plus log-bucket deltas into ``{prefix}:timers:{minute}``, which expires once it leaves
+      the ``window_minutes`` percentile window;
+    - gauges: ``HSET {prefix}:gauges:{process}``, expiring when the process stops flushing,
+      and the process scored by flush time in the ``{prefix}:processes`` sorted set. Readers
+      trim that registry by age and fetch only the listed hashes, so a scrape never walks the
+      keyspace. The merged view reports the highest value across live processes.
+
+    Deltas are remembered until a flush succeeds, so a Redis outage delays them rather than
+    losing them, and totals survive process restarts.
+    """
+
+    def __init__(
+        self,
+        collector: Metrics = metrics,
+        *,
+        url: str = settings.redis_url,
+        prefix: str = settings.metrics_redis_prefix,
+        flush_ms: int = settings.metrics_flush_ms,
+        window_minutes: int = settings.metrics_window_minutes,
+        redis: Any | None = None,
+    ) -> None:
+        self._collector = collector
+        self._url = url
+        self._prefix = prefix
+        self._interval = flush_ms / 1000
+        self._window_minutes = window_minutes
+        self._redis = redis
+        self._process = f"{socket.gethostname()}:{os.getpid()}"
+        self._counters: dict[str, int] = {}
+        self._timers: dict[str, tuple[int, float, list[int]]] = {}
+        self._unsent_buckets: defaultdict[tuple[str, int], int] = defaultdict(int)
+        self._runner: asyncio.Task[None] | None = None
+
+    @property
+    def _gauge_ttl_s(self) -> int:
+        return max(int(self._interval * 3), 30)
+
+    def _client(self) -> Any:
+        if self._redis is None:
+            self._redis = async_redis(self._url, decode_responses=True)
+        return self._redis
+
+    def start(self, role: str) -> None:
+        """Flush in the background, tagging gauges with ``role`` (api, worker, scheduler)."""
+
+        self._process = f"{role}:{socket.gethostname()}:{os.getpid()}"
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        runner = self._runner
+        if runner is None:
+            return
+        runner.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        self._runner = None
+        with contextlib.suppress(Exception):
+            await self.flush()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as exc:  # noqa: BLE001 - retried with the next flush
+                log.warning("Metrics flush failed: %s", exc)
+
+    async def flush(self) -> None:
+        """Send everything recorded since the last successful flush."""
+
+        collector = self._collector
+        pipe = self._client().pipeline(transaction=False)
+        counters_key = f"{self._prefix}:counters"
+        timers_key = f"{self._prefix}:timers"
+        minute_key = f"{self._prefix}:timers:{int(time.time() // 60)}"
+
+        counters = dict(collector.counters)
+        for key, value in counters.items():
+            # A counter below what was flushed was reset (tests, clear()); count it afresh.
+            last = self._counters.get(key, 0)
+            delta = value - last if value >= last else value
+            if delta:
+                pipe.hincrby(counters_key, key, delta)
+
+        timers = {
+            key: (hist.count, hist.total, hist.le_counts) for key, hist in collector.timers.items()
+        }
+        for key, (count, total, le_counts) in timers.items():
+            last_count, last_total, last_le = self._timers.get(key, (0, 0.0, [0] * len(le_counts)))
+            if count < last_count:
+                last_count, last_total, last_le = 0, 0.0, [0] * len(le_counts)
+            if count == last_count:
+                continue
+            pipe.hincrby(timers_key, f"{key}{_SEP}count", count - last_count)
+            pipe.hincrbyfloat(timers_key, f"{key}{_SEP}sum", total - last_total)
+            for position, (hits, last_hits) in enumerate(zip(le_counts, last_le, strict=True)):
+                if hits != last_hits:
+                    pipe.hincrby(timers_key, f"{key}{_SEP}le{position}", hits - last_hits)
+        for key, hist in list(collector.timers.items()):
+            for index, hits in hist.drain_pending().items():
+                self._unsent_buckets[key, index] += hits
+        for (key, index), hits in self._unsent_buckets.items():
+            pipe.hincrby(minute_key, f"{key}{_SEP}{index}", hits)
+        if self._unsent_buckets:
+            pipe.expire(minute_key, (self._window_minutes + 1) * 60)
+
+        gauges_key = f"{self._prefix}:gauges:{self._process}"
+        if collector.gauges:
+            pipe.delete(gauges_key)
+            pipe.hset(
+                gauges_key, mapping={key: repr(value) for key, value in collector.gauges.items()}
+            )
+            pipe.expire(gauges_key, self._gauge_ttl_s)
+            pipe.zadd(f"{self._prefix}:processes", {self._process: time.time()})
+        await pipe.execute()
+
+        self._counters = counters
+        self._timers = timers
+        self._unsent_buckets.clear()
+
+    async def read(self) -> Metrics:
+        """Merged view of every process's flushed metrics, as a read-only :class:`Metrics`."""
+
+        redis = self._client()
+        now = time.time()
+        minute = int(now // 60)
+        processes_key = f"{self._prefix}:processes"
+        pipe = redis.pipeline(transaction=False)
+        pipe.zremrangebyscore(processes_key, "-inf", now - self._gauge_ttl_s)
+        pipe.zrange(processes_key, 0, -1)
+        pipe.hgetall(f"{self._prefix}:counters")
+        pipe.hgetall(f"{self._prefix}:timers")
+        for offset in range(self._window_minutes):
+            pipe.hgetall(f"{self._prefix}:timers:{minute - offset}")
+        _, processes, counters, lifetime, *minutes = await pipe.execute()
+        gauge_maps = []
+        if processes:
+            pipe = redis.pipeline(transaction=False)
+            for process in processes:
+                pipe.hgetall(f"{self._prefix}:gauges:{process}")
+            gauge_maps = await pipe.execute()
+
+        merged = Metrics()
+        for key, value in counters.items():
+            merged.counters[key] = int(value)
+        for gauges in gauge_maps:
+            for key, value in gauges.items():
+                merged.gauges[key] = max(float(value), merged.gauges.get(key, float("-inf")))
+
+        parts: defaultdict[str, dict[str, str]] = defaultdict(dict)
+        for field, value in lifetime.items():
+            key, _, part = field.rpartition(_SEP)
+            parts[key][part] = value
+        buckets: defaultdict[str, defaultdict[int, int]] = defaultdict(lambda: defaultdict(int))
+        for fields in minutes:
+            for field, value in fields.items():
+                key, _, index = field.rpartition(_SEP)
+                buckets[key][int(index)] += int(value)
+        for key, fields in parts.items():
+            merged.timers[key] = Histogram.merged(
+                int(fields.get("count", 0)),
+                float(fields.get("sum", 0.0)),
+                [
+                    int(fields.get(f"le{position}", 0))
+                    for position in range(len(PROMETHEUS_BUCKETS) + 1)
+                ],
+                buckets.get(key, {}),
+            )
+        return merged
+
+
+cluster_metrics = ClusterMetrics()
@@ -0,0 +1,81 @@
+"""Redis fast path for execution-key deduplication."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+import time
+
+import redis
+
+from ...logging import get_logger
+from ..config import get_settings
+from .redis_client import sync_redis
+
+settings = get_settings()
+log = get_logger(__name__)
+
+
+class DedupeCache:
+    """Claim execution keys in Redis so unique submissions can skip the SQL dedupe query.
+
+    A claim is a hint, not proof: tasks inserted while Redis was down, by a replica with the
+    cache off, or whose key was evicted have none. A submission that newly claims its key is
+    therefore inserted directly only when the unique ``execution_key`` would reject any
+    duplicate; the database stays the source of truth. When Redis errors the cache switches
+    itself off for a cooldown so a Redis outage costs one timeout, not one per submission.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.redis_url,
+        prefix: str = "trx:dedupe:",
+        timeout_ms: int = settings.dedupe_cache_timeout_ms,
+        cooldown_ms: int = settings.dedupe_cache_cooldown_ms,
+    ) -> None:
+        self._url = url
+        self._prefix = prefix
+        self._timeout = timeout_ms / 1000
+        self._cooldown = cooldown_ms / 1000
+        self._client: redis.Redis | None = None
+        self._disabled_until = 0.0
+
+    def _redis(self) -> redis.Redis | None:
+        if time.monotonic() < self._disabled_until:
+            return None
+        if self._client is None:
+            # Claims are single-key SETs, so a cluster pipeline routes each to its own slot.
+            self._client = sync_redis(
+                self._url,
+                decode_responses=True,
+                socket_timeout=self._timeout,
+                socket_connect_timeout=self._timeout,
+            )
+        return self._client
+
+    def _disable(self, exc: Exception) -> None:
+        self._disabled_until = time.monotonic() + self._cooldown
+        log.warning("Dedupe cache unavailable, using database only: %s", exc)
+
+    def claim(self, expiries: Mapping[str, int]) -> set[str] | None:
+        """``SET NX PX`` each ``execution_key -> ttl_ms``; returns the keys this call claimed.
+
+        ``None`` means Redis could not be asked, so nothing is known about any key.
+        """
+
+        client = self._redis()
+        if client is None:
+            return None
+        if not expiries:
+            return set()
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, ttl_ms in expiries.items():
+                pipe.set(self._prefix + key, 1, nx=True, px=ttl_ms)
+            claimed = pipe.execute()
+        except redis.RedisError as exc:
+            self._disable(exc)
+            return None
+        return {key for key, won in zip(expiries, claimed, strict=True) if won}
+
+
+dedupe_cache = DedupeCache()
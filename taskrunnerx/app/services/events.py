@@ -0,0 +1,121 @@
+"""In-process fan-out of task state change notifications."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+import contextlib
+import json
+from typing import Any
+
+from ...logging import get_logger
+from ..config import get_settings
+from .redis_client import async_redis
+
+settings = get_settings()
+log = get_logger(__name__)
+
+# * States after which a task will not change again without outside intervention.
+TERMINAL_STATUSES = frozenset({"done", "dead_letter"})
+
+TaskEvent = dict[str, Any]
+
+
+class TaskEventHub:
+    """Share one Redis pub/sub subscription between every in-process waiter.
+
+    Workers publish ``{"task_id": ..., "status": ...}`` after each committed transition; the hub
+    routes each message to the queues of the waiters registered for that task and to any
+    process-wide listeners.
+    """
+
+    def __init__(
+        self,
+        url: str = settings.redis_url,
+        channel: str = settings.redis_events_channel,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self._url = url
+        self._channel = channel
+        self._reconnect_delay = reconnect_delay
+        self._subscribers: defaultdict[int, set[asyncio.Queue[TaskEvent]]] = defaultdict(set)
+        self._listeners: list[Callable[[TaskEvent], None]] = []
+        self._runner: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        runner = self._runner
+        if runner is None:
+            return
+        runner.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        self._runner = None
+
+    def add_listener(self, listener: Callable[[TaskEvent], None]) -> None:
+        """Call ``listener`` for every event, whatever task it concerns."""
+
+        self._listeners.append(listener)
+
+    @contextlib.contextmanager
+    def subscribe(self, task_id: int) -> Iterator[asyncio.Queue[TaskEvent]]:
+        """Register for events about ``task_id`` for the duration of the block."""
+
+        self.start()
+        updates: asyncio.Queue[TaskEvent] = asyncio.Queue()
+        self._subscribers[task_id].add(updates)
+        try:
+            yield updates
+        finally:
+            waiters = self._subscribers.get(task_id)
+            if waiters is not None:
+                waiters.discard(updates)
+                if not waiters:
+                    del self._subscribers[task_id]
+
+    def dispatch(self, event: TaskEvent) -> None:
+        for listener in self._listeners:
+            listener(event)
+        try:
+            task_id = int(event["task_id"])
+        except (KeyError, TypeError, ValueError):
+            return
+        for updates in self._subscribers.get(task_id, ()):
+            updates.put_nowait(event)
+
+    async def _listen(self) -> None:
+        # Classic pub/sub messages reach every cluster node, and the asyncio cluster client has
+        # no pubsub(), so a plain connection to the seed node hears every event.
+        client = async_redis(self._url, cluster=False, decode_responses=True)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(self._channel)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if isinstance(event, dict):
+                    self.dispatch(event)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001 - keep the subscription alive
+                log.warning("Task event subscription lost, reconnecting: %s", exc)
+            await asyncio.sleep(self._reconnect_delay)
+
+
+events = TaskEventHub()
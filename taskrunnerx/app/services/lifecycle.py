@@ -0,0 +1,82 @@
+"""Timestamps of each hop a task delivery makes, from due time to its finish commit."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass, field
+from datetime import datetime
+import time
+from typing import Any
+
+from ...metrics import metrics
+
+STAGE_METRIC = "task_stage"
+# * Stage name -> (mark it starts at, mark it ends at). "submit" is timed by the API itself.
+STAGES: dict[str, tuple[str, str]] = {
+    "dispatch": ("due_at", "published_at"),
+    "queue_wait": ("published_at", "picked_up"),
+    "start": ("picked_up", "started"),
+    "handler": ("started", "handler_done"),
+    "finish": ("handler_done", "finished"),
+}
+# * Marks carried in the stream message, as epoch milliseconds.
+MESSAGE_MARKS = ("due_at", "published_at")
+
+
+def epoch_ms(moment: datetime | None = None) -> int:
+    return int((moment.timestamp() if moment is not None else time.time()) * 1000)
+
+
+def record_stage(stage: str, seconds: float, task_name: str) -> None:
+    metrics.timer(STAGE_METRIC, max(seconds, 0.0), labels={"stage": stage, "task": task_name})
+
+
+@dataclass(slots=True)
+class Lifecycle:
+    """Wall-clock marks for one delivery of a task.
+
+    Marks come from different hosts (API, scheduler, worker), so short stages are only as
+    accurate as their clocks are in sync.
+    """
+
+    task_name: str
+    marks: dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def from_message(cls, data: Mapping[str, Any]) -> Lifecycle:
+        """Start from the marks carried in a stream message and mark it picked up now."""
+
+        lifecycle = cls(str(data.get("name", "")))
+        for mark in MESSAGE_MARKS:
+            raw = data.get(mark)
+            if raw and str(raw).isdigit():
+                lifecycle.marks[mark] = int(raw)
+        lifecycle.mark("picked_up")
+        return lifecycle
+
+    def mark(self, name: str) -> None:
+        self.marks[name] = epoch_ms()
+
+    def intervals(self) -> Iterator[tuple[str, int, int]]:
+        """``(stage, begin, end)`` epoch milliseconds of every stage with both ends marked."""
+
+        for stage, (begin, end) in STAGES.items():
+            if begin in self.marks and end in self.marks:
+                yield stage, self.marks[begin], max(self.marks[end], self.marks[begin])
+
+    def stages_ms(self) -> dict[str, int]:
+        return {stage: end - begin for stage, begin, end in self.intervals()}
+
+    def record(self) -> None:
+        """Feed every stage with both ends marked into its histogram."""
+
+        for stage, elapsed_ms in self.stages_ms().items():
+            record_stage(stage, elapsed_ms / 1000, self.task_name)
+
+    def timeline(self) -> dict[str, Any]:
+        """What ``tasks.timeline`` stores: the marks and the stage durations, in milliseconds.
+
+        It is written by the finishing transaction itself, so it stops at ``handler_done``.
+        """
+
+        return {"marks": dict(self.marks), "stages_ms": self.stages_ms()}
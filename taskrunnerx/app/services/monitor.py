@@ -0,0 +1,146 @@
+"""Background sampling of stream backlog and event-loop lag, exported as gauges."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import contextlib
+from dataclasses import dataclass
+import time
+
+from ...logging import get_logger
+from ...metrics import metrics
+from ..config import get_settings
+from .queue import Queue, StreamBacklog, queue
+
+settings = get_settings()
+log = get_logger(__name__)
+
+
+@dataclass(slots=True, frozen=True)
+class MonitorThresholds:
+    """Levels at which :class:`QueueMonitor` warns; loop lag is in milliseconds."""
+
+    lag: int = settings.monitor_warn_lag
+    pending: int = settings.monitor_warn_pending
+    loop_lag_ms: int = settings.monitor_warn_loop_lag_ms
+
+
+class QueueMonitor:
+    """Sample the task streams and this process's event loop at a low fixed rate.
+
+    Every ``interval_ms`` one pipelined round trip reads XLEN, the group's lag (XINFO GROUPS)
+    and its pending entries per consumer (XPENDING) for every stream, reported as the gauges
+    ``stream_length``, ``stream_lag``, ``stream_pending`` and ``stream_consumer_pending``.
+
+    A probe sleeping ``probe_ms`` at a time measures how late the loop wakes it up, which is
+    how long synchronous work (such as the DB calls in ``handle_message``) held the loop.
+    Each delay feeds the ``event_loop_lag`` histogram and the worst one since the previous
+    sample becomes the ``event_loop_lag_seconds`` gauge.
+
+    Crossing one of the ``thresholds`` logs one warning and counts ``monitor_warnings{check}``;
+    recovering logs once more.
+    """
+
+    def __init__(
+        self,
+        task_queue: Queue = queue,
+        *,
+        group: str = settings.redis_group,
+        interval_ms: int = settings.monitor_interval_ms,
+        probe_ms: int = settings.monitor_loop_probe_ms,
+        thresholds: MonitorThresholds | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._queue = task_queue
+        self._group = group
+        self._interval = interval_ms / 1000
+        self._probe_interval = probe_ms / 1000
+        self._thresholds = thresholds or MonitorThresholds()
+        self._clock = clock
+        self.role = "process"
+        self._loop_lag_max = 0.0
+        self._breached: set[str] = set()
+        self._consumers: set[tuple[str, str]] = set()
+        self._runners: list[asyncio.Task[None]] = []
+
+    def start(self, role: str) -> None:
+        """Sample in the background, labelling event-loop lag with ``role``."""
+
+        self.role = role
+        if not self._runners:
+            self._runners = [asyncio.create_task(self._run()), asyncio.create_task(self._probe())]
+
+    async def stop(self) -> None:
+        runners, self._runners = self._runners, []
+        for runner in runners:
+            runner.cancel()
+        for runner in runners:
+            with contextlib.suppress(asyncio.CancelledError):
+                await runner
+
+    def _check(self, check: str, subject: str, value: float, limit: float) -> None:
+        key = f"{check}:{subject}"
+        if value >= limit:
+            if key not in self._breached:
+                self._breached.add(key)
+                metrics.increment("monitor_warnings", labels={"check": check})
+                log.warning("%s of %s is %s, at or over %s", check, subject, value, limit)
+        elif key in self._breached:
+            self._breached.discard(key)
+            log.info("%s of %s is back to %s, under %s", check, subject, value, limit)
+
+    def observe_loop_lag(self, seconds: float) -> None:
+        metrics.timer("event_loop_lag", seconds, labels={"role": self.role})
+        self._loop_lag_max = max(self._loop_lag_max, seconds)
+
+    async def sample(self) -> dict[str, StreamBacklog]:
+        """Read every stream once and publish the gauges; returns what was read."""
+
+        streams = [*self._queue.streams, settings.redis_low_priority_stream]
+        backlog = await self._queue.stream_backlog(self._group, streams)
+        consumers: set[tuple[str, str]] = set()
+        for stream, entry in backlog.items():
+            labels = {"stream": stream}
+            metrics.set_gauge("stream_length", float(entry.length), labels=labels)
+            metrics.set_gauge("stream_pending", float(entry.pending), labels=labels)
+            self._check("pending", stream, entry.pending, self._thresholds.pending)
+            if entry.lag is not None:
+                metrics.set_gauge("stream_lag", float(entry.lag), labels=labels)
+                self._check("lag", stream, entry.lag, self._thresholds.lag)
+            for consumer, pending in entry.pending_by_consumer.items():
+                consumers.add((stream, consumer))
+                metrics.set_gauge(
+                    "stream_consumer_pending",
+                    float(pending),
+                    labels={"stream": stream, "consumer": consumer},
+                )
+        # * XPENDING leaves out consumers with nothing pending; zero them rather than go stale.
+        for stream, consumer in self._consumers - consumers:
+            metrics.set_gauge(
+                "stream_consumer_pending", 0.0, labels={"stream": stream, "consumer": consumer}
+            )
+        self._consumers = consumers
+
+        loop_lag, self._loop_lag_max = self._loop_lag_max, 0.0
+        metrics.set_gauge("event_loop_lag_seconds", loop_lag, labels={"role": self.role})
+        loop_lag_ms = round(loop_lag * 1000)
+        self._check("event_loop_lag_ms", self.role, loop_lag_ms, self._thresholds.loop_lag_ms)
+        return backlog
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.sample()
+            except Exception as exc:  # noqa: BLE001 - sampled again next interval
+                log.warning("Queue monitor sample failed: %s", exc)
+
+    async def _probe(self) -> None:
+        while True:
+            expected = self._clock() + self._probe_interval
+            await asyncio.sleep(self._probe_interval)
+            self.observe_loop_lag(max(self._clock() - expected, 0.0))
+
+
+monitor = QueueMonitor()
@@ -0,0 +1,97 @@
+"""In-process publisher that dispatches committed tasks in coalesced batches."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import contextlib
+
+from ...logging import get_logger
+from ...metrics import metrics
+from ..config import get_settings
+from .queue import Queue, queue
+
+settings = get_settings()
+log = get_logger(__name__)
+
+
+class OutboxPublisher:
+    """Collect task ids handed over after commit and publish them through pipelined XADDs.
+
+    The outbox row is already committed when a task id is submitted, so anything this
+    publisher fails to send (a full buffer, a Redis error, a crash) is still picked up by the
+    scheduler's ``flush_due`` relay.
+    """
+
+    def __init__(
+        self,
+        task_queue: Queue = queue,
+        batch_size: int = settings.publisher_batch_size,
+        linger_ms: int = settings.publisher_linger_ms,
+        max_pending: int = settings.publisher_max_pending,
+    ) -> None:
+        self._queue = task_queue
+        self._batch_size = batch_size
+        self._linger = linger_ms / 1000
+        self._pending: asyncio.Queue[int] = asyncio.Queue(maxsize=max_pending)
+        self._runner: asyncio.Task[None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None and not self._runner.done()
+
+    def start(self) -> None:
+        if not self.running:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush whatever is buffered, then stop the background loop."""
+
+        runner = self._runner
+        if runner is None:
+            return
+        await self._pending.join()
+        runner.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        self._runner = None
+
+    def submit(self, task_ids: Iterable[int]) -> None:
+        for task_id in task_ids:
+            try:
+                self._pending.put_nowait(task_id)
+            except asyncio.QueueFull:
+                # The relay will dispatch it from the outbox.
+                metrics.increment("publisher_overflow")
+
+    async def _next_batch(self) -> list[int]:
+        batch = [await self._pending.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._linger
+        while len(batch) < self._batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._pending.get(), remaining))
+            except TimeoutError:
+                break
+        while len(batch) < self._batch_size and not self._pending.empty():
+            batch.append(self._pending.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._queue.dispatch_tasks(batch)
+                metrics.increment("publisher_batches")
+            except Exception as exc:  # noqa: BLE001 - the relay retries from the outbox
+                metrics.increment("publisher_failures")
+                log.warning("Deferred dispatch of %d tasks to relay: %s", len(batch), exc)
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+
+publisher = OutboxPublisher()
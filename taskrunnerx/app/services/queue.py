@@ -3,21 +3,48 @@
 from __future__ import annotations
 
 import asyncio
-from contextlib import contextmanager
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
 from datetime import UTC, datetime
 import json
 from typing import Any, Callable, cast
 
 from redis import asyncio as aioredis
-from sqlalchemy import select
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
 
 from ..config import get_settings
 from ..db import SessionLocal
+from ...logging import get_logger
 from ...metrics import metrics
 from ..models import Task, TaskDeadLetter, TaskOutbox
+from .cache import bump_cached_version
+from .lifecycle import epoch_ms
+from .redis_client import async_redis
+from .streams import stream_shards
 
 settings = get_settings()
+log = get_logger(__name__)
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+def _fetch_all(db: Session, stmt: Any) -> list[Any]:
+    return list(db.execute(stmt).all())
+
+
+@dataclass(slots=True)
+class StreamBacklog:
+    """One stream as seen by a consumer group."""
+
+    length: int = 0
+    # * None when Redis cannot tell (before 7.0, or after entries were trimmed or deleted).
+    lag: int | None = None
+    pending: int = 0
+    pending_by_consumer: dict[str, int] = field(default_factory=dict)
 
 
 class Queue:
@@ -26,7 +53,9 @@ class Queue:
     def __init__(self, session_factory: Callable[[], Session] = SessionLocal) -> None:
         self._redis: aioredis.Redis | None = None
         self.stream = settings.redis_stream
+        self.stream_shards = settings.redis_stream_shards
         self.dlq_stream = settings.redis_dlq_stream
+        self.events_channel = settings.redis_events_channel
         self._session_factory = session_factory
 
     @contextmanager
@@ -41,22 +70,59 @@ class Queue:
         finally:
             session.close()
 
+    @asynccontextmanager
+    async def _thread_session_scope(self) -> AsyncIterator[Session]:
+        """:meth:`_session_scope` whose commit, rollback and close run in a worker thread.
+
+        Callers run their queries through ``asyncio.to_thread`` as well, so no database round
+        trip blocks the event loop; the session moves between threads only between calls.
+        """
+
+        session = self._session_factory()
+        try:
+            yield session
+            await asyncio.to_thread(session.commit)
+        except BaseException:
+            await asyncio.to_thread(session.rollback)
+            raise
+        finally:
+            await asyncio.to_thread(session.close)
+
+    @property
+    def streams(self) -> list[str]:
+        """All stream keys tasks may be published to."""
+
+        return stream_shards(self.stream, self.stream_shards)
+
+    def _target_stream(self, outbox: TaskOutbox) -> str:
+        return outbox.stream or self.stream
+
+    @staticmethod
+    def _build_message(outbox: TaskOutbox, task: Task) -> dict[str, str]:
+        message = {
+            "task_id": str(task.id),
+            "name": task.name,
+            "payload": json.dumps(task.payload or {}),
+            "execution_key": outbox.execution_key,
+            "scheduled_at": task.scheduled_at.isoformat(),
+            "attempt": str(task.attempts + 1),
+            "due_at": str(epoch_ms(_as_utc(outbox.available_at))),
+            "published_at": str(epoch_ms()),
+        }
+        if task.traceparent:
+            message["traceparent"] = task.traceparent
+        return message
+
     async def connect(self) -> None:
         if not self._redis:
-            redis_factory: Any = aioredis.from_url
-            self._redis = cast(
-                aioredis.Redis,
-                redis_factory(settings.redis_url, decode_responses=True),
-            )
+            self._redis = async_redis(settings.redis_url, decode_responses=True)
 
     async def close(self) -> None:
         if self._redis:
             await self._redis.close()
             self._redis = None
 
-    async def _publish(
-        self, stream: str, payload: dict[str, str], maxlen: int = 10000
-    ) -> str:
+    async def _publish(self, stream: str, payload: dict[str, str], maxlen: int = 10000) -> str:
         await self.connect()
         redis = self._redis
         if redis is None:
@@ -66,6 +132,72 @@ class Queue:
         result = await redis.xadd(stream, fields=fields, maxlen=maxlen, approximate=True)
         return cast(str, result)
 
+    async def _publish_many(
+        self, messages: Sequence[tuple[str, dict[str, str]]], maxlen: int = 10000
+    ) -> list[str]:
+        """XADD every message in a single non-transactional pipeline round trip."""
+
+        if not messages:
+            return []
+        await self.connect()
+        redis = self._redis
+        if redis is None:
+            msg = "Redis connection not established"
+            raise RuntimeError(msg)
+        pipe = redis.pipeline(transaction=False)
+        for stream, payload in messages:
+            pipe.xadd(stream, fields=cast(dict[Any, Any], payload), maxlen=maxlen, approximate=True)
+        results = await pipe.execute()
+        return [cast(str, result) for result in results]
+
+    async def dispatch_tasks(
+        self, task_ids: Sequence[int], chunk_size: int = 500
+    ) -> dict[int, str]:
+        """Push many persisted tasks to Redis, pipelining the XADDs per chunk.
+
+        Returns the stream id for every known task: the existing id for tasks already sent and an
+        empty string for tasks that are not due yet.
+        """
+
+        results: dict[int, str] = {}
+        unique_ids = list(dict.fromkeys(task_ids))
+        for offset in range(0, len(unique_ids), chunk_size):
+            chunk = unique_ids[offset : offset + chunk_size]
+            now = datetime.now(tz=UTC)
+            async with self._thread_session_scope() as db:
+                stmt = (
+                    select(TaskOutbox, Task)
+                    .join(Task, Task.id == TaskOutbox.task_id)
+                    .where(TaskOutbox.task_id.in_(chunk))
+                    .with_for_update()
+                )
+                due: list[tuple[TaskOutbox, Task]] = []
+                for outbox, task in await asyncio.to_thread(_fetch_all, db, stmt):
+                    available_at = outbox.available_at
+                    if available_at.tzinfo is None:
+                        available_at = available_at.replace(tzinfo=UTC)
+                    if outbox.stream_id:
+                        results[task.id] = outbox.stream_id
+                    elif available_at > now:
+                        results[task.id] = ""
+                    else:
+                        due.append((outbox, task))
+
+                stream_ids = await self._publish_many(
+                    [
+                        (self._target_stream(outbox), self._build_message(outbox, task))
+                        for outbox, task in due
+                    ]
+                )
+                sent_at = datetime.now(tz=UTC)
+                for (outbox, task), stream_id in zip(due, stream_ids, strict=True):
+                    outbox.sent_at = sent_at
+                    outbox.stream_id = stream_id
+                    outbox.delivery_attempts += 1
+                    results[task.id] = stream_id
+                metrics.increment("attempts", len(due))
+        return results
+
     async def dispatch_task(self, task_id: int) -> str:
         """Push a persisted task to Redis if due, respecting idempotency."""
 
@@ -92,16 +224,8 @@ class Queue:
             if available_at > now:
                 return ""
 
-            message = {
-                "task_id": str(task_id),
-                "name": task.name,
-                "payload": json.dumps(task.payload or {}),
-                "execution_key": outbox.execution_key,
-                "scheduled_at": task.scheduled_at.isoformat(),
-                "attempt": str(task.attempts + 1),
-            }
-
-            stream_id = await self._publish(self.stream, message)
+            message = self._build_message(outbox, task)
+            stream_id = await self._publish(self._target_stream(outbox), message)
             outbox.sent_at = datetime.now(tz=UTC)
             outbox.stream_id = stream_id
             outbox.delivery_attempts += 1
@@ -111,37 +235,26 @@ class Queue:
         return stream_id
 
     async def flush_due(self, limit: int = 25) -> list[str]:
-        """Flush all due outbox entries."""
+        """Flush all due outbox entries, with every query off the event loop."""
 
         dispatched: list[str] = []
         while True:
             now = datetime.now(tz=UTC)
-            with self._session_scope() as db:
+            async with self._thread_session_scope() as db:
                 stmt = (
                     select(TaskOutbox, Task)
                     .join(Task, Task.id == TaskOutbox.task_id)
-                    .where(TaskOutbox.sent_at.is_(None))
+                    .where(TaskOutbox.sent_at.is_(None), TaskOutbox.available_at <= now)
+                    .order_by(TaskOutbox.available_at)
                     .with_for_update(skip_locked=True)
                     .limit(limit)
                 )
-                rows = db.execute(stmt).all()
+                rows = await asyncio.to_thread(_fetch_all, db, stmt)
                 if not rows:
                     break
                 for outbox, task in rows:
-                    available_at = outbox.available_at
-                    if available_at.tzinfo is None:
-                        available_at = available_at.replace(tzinfo=UTC)
-                    if available_at > now:
-                        continue
-                    message = {
-                        "task_id": str(task.id),
-                        "name": task.name,
-                        "payload": json.dumps(task.payload or {}),
-                        "execution_key": outbox.execution_key,
-                        "scheduled_at": task.scheduled_at.isoformat(),
-                        "attempt": str(task.attempts + 1),
-                    }
-                    stream_id = await self._publish(self.stream, message)
+                    message = self._build_message(outbox, task)
+                    stream_id = await self._publish(self._target_stream(outbox), message)
                     outbox.sent_at = datetime.now(tz=UTC)
                     outbox.stream_id = stream_id
                     outbox.delivery_attempts += 1
@@ -152,6 +265,62 @@ class Queue:
                 break
         return dispatched
 
+    def pending_outbox(
+        self,
+        before: datetime,
+        *,
+        after: tuple[datetime, int] | None = None,
+        limit: int = 1000,
+    ) -> list[tuple[int, int, datetime]]:
+        """Unsent ``(outbox id, task id, available_at)`` due before ``before``, in due order.
+
+        ``after`` is the ``(available_at, outbox id)`` of the last row already read, for paging
+        through a time range in chunks.
+        """
+
+        stmt = select(TaskOutbox.id, TaskOutbox.task_id, TaskOutbox.available_at).where(
+            TaskOutbox.sent_at.is_(None), TaskOutbox.available_at < before
+        )
+        if after is not None:
+            after_at, after_id = after
+            stmt = stmt.where(
+                or_(
+                    TaskOutbox.available_at > after_at,
+                    and_(TaskOutbox.available_at == after_at, TaskOutbox.id > after_id),
+                )
+            )
+        stmt = stmt.order_by(TaskOutbox.available_at, TaskOutbox.id).limit(limit)
+        with self._session_scope() as db:
+            return [
+                (outbox_id, task_id, _as_utc(available_at))
+                for outbox_id, task_id, available_at in db.execute(stmt)
+            ]
+
+    def outbox_added_since(
+        self, after_id: int, before: datetime, limit: int = 1000
+    ) -> list[tuple[int, int, datetime]]:
+        """Unsent outbox rows with ids above ``after_id`` that are due before ``before``."""
+
+        stmt = (
+            select(TaskOutbox.id, TaskOutbox.task_id, TaskOutbox.available_at)
+            .where(
+                TaskOutbox.id > after_id,
+                TaskOutbox.sent_at.is_(None),
+                TaskOutbox.available_at < before,
+            )
+            .order_by(TaskOutbox.id)
+            .limit(limit)
+        )
+        with self._session_scope() as db:
+            return [
+                (outbox_id, task_id, _as_utc(available_at))
+                for outbox_id, task_id, available_at in db.execute(stmt)
+            ]
+
+    def last_outbox_id(self) -> int:
+        with self._session_scope() as db:
+            return int(db.scalar(select(func.coalesce(func.max(TaskOutbox.id), 0))) or 0)
+
     async def requeue_with_delay(self, task_id: int, delay_seconds: float) -> None:
         await asyncio.sleep(delay_seconds)
         await self.dispatch_task(task_id)
@@ -168,5 +337,96 @@ class Queue:
         stream_id = await self._publish(self.dlq_stream, payload)
         return stream_id
 
+    async def consumer_lag(self, group: str, streams: Sequence[str] | None = None) -> int:
+        """Entries not yet delivered to ``group``, summed over ``streams`` (all shards by default).
+
+        Relies on the ``lag`` field of XINFO GROUPS (Redis 7+); streams that do not exist yet
+        or cannot report lag count as zero.
+        """
+
+        await self.connect()
+        redis = self._redis
+        if redis is None:
+            return 0
+        total = 0
+        for stream in streams or self.streams:
+            try:
+                groups = await redis.xinfo_groups(stream)
+            except aioredis.ResponseError:
+                continue
+            for info in groups:
+                if info.get("name") == group:
+                    total += int(info.get("lag") or 0)
+        return total
+
+    async def stream_backlog(
+        self, group: str, streams: Sequence[str] | None = None
+    ) -> dict[str, StreamBacklog]:
+        """Length, group lag and pending entries per stream, in one pipelined round trip.
+
+        Streams or groups that do not exist yet report as empty.
+        """
+
+        await self.connect()
+        redis = self._redis
+        streams = list(streams or self.streams)
+        if redis is None or not streams:
+            return {}
+        pipe = redis.pipeline(transaction=False)
+        for stream in streams:
+            pipe.xlen(stream)
+            pipe.xinfo_groups(stream)
+            pipe.xpending(stream, group)
+        results = await pipe.execute(raise_on_error=False)
+        backlog: dict[str, StreamBacklog] = {}
+        for position, stream in enumerate(streams):
+            length, groups, pending = results[3 * position : 3 * position + 3]
+            entry = StreamBacklog(length=length if isinstance(length, int) else 0)
+            if isinstance(groups, list):
+                for info in groups:
+                    if info.get("name") == group:
+                        lag = info.get("lag")
+                        entry.lag = int(lag) if lag is not None else None
+            if isinstance(pending, dict):
+                entry.pending = int(pending.get("pending") or 0)
+                entry.pending_by_consumer = {
+                    str(consumer["name"]): int(consumer["pending"])
+                    for consumer in pending.get("consumers") or []
+                }
+            backlog[stream] = entry
+        return backlog
+
+    async def publish_event(self, task_id: int, status: str) -> None:
+        """Announce a committed task state change to API waiters; never raises."""
+
+        await self.publish_events([task_id], status)
+
+    async def publish_events(self, task_ids: Sequence[int], status: str) -> None:
+        """Announce the same committed change for many tasks in one round trip; never raises."""
+
+        if not task_ids:
+            return
+        events = [
+            json.dumps({"task_id": task_id, "status": status}, separators=(",", ":"))
+            for task_id in task_ids
+        ]
+        try:
+            await self.connect()
+            redis = self._redis
+            if redis is None:
+                return
+            if len(events) == 1 and not settings.task_cache_redis_enabled:
+                await redis.publish(self.events_channel, events[0])
+                return
+            pipe = redis.pipeline(transaction=False)
+            for task_id, event in zip(task_ids, events, strict=True):
+                if settings.task_cache_redis_enabled:
+                    # Retire the shared cached read before announcing the change.
+                    bump_cached_version(pipe, task_id)
+                pipe.publish(self.events_channel, event)
+            await pipe.execute()
+        except Exception as exc:  # noqa: BLE001 - notifications are best effort
+            log.warning("Failed to publish %d %s task events: %s", len(events), status, exc)
+
 
 queue = Queue()
@@ -0,0 +1,35 @@
+"""Redis client factories that honour ``REDIS_CLUSTER``."""
+
+from __future__ import annotations
+
+from typing import Any, cast
+
+import redis
+from redis import asyncio as aioredis
+
+from ..config import get_settings
+
+settings = get_settings()
+
+
+def async_redis(
+    url: str = settings.redis_url, *, cluster: bool = settings.redis_cluster, **options: Any
+) -> aioredis.Redis:
+    """asyncio client for ``url``; a cluster client when ``cluster`` is set.
+
+    A cluster client follows MOVED redirects and routes each key to the node owning its slot.
+    Its pipelines must be created with ``transaction=False``; they then split the commands
+    per slot, so one pipeline may touch every stream shard.
+    """
+
+    redis_factory: Any = aioredis.RedisCluster.from_url if cluster else aioredis.from_url
+    return cast(aioredis.Redis, redis_factory(url, **options))
+
+
+def sync_redis(
+    url: str = settings.redis_url, *, cluster: bool = settings.redis_cluster, **options: Any
+) -> redis.Redis:
+    """Blocking counterpart of :func:`async_redis`."""
+
+    redis_factory: Any = redis.RedisCluster.from_url if cluster else redis.Redis.from_url
+    return cast(redis.Redis, redis_factory(url, **options))
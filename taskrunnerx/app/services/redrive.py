@@ -0,0 +1,123 @@
+"""Throttled bulk redrive of dead-lettered tasks, tracked as in-process jobs."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+from uuid import uuid4
+
+from sqlalchemy import ColumnElement
+
+from ...logging import get_logger
+from ...metrics import metrics
+from ..config import get_settings
+from ..deps import db_session
+from ..schemas import DeadLetterFilter
+from .queue import Queue, queue
+from .tasks import dead_letter_filters, redrive_dead_letters
+
+settings = get_settings()
+log = get_logger(__name__)
+
+
+@dataclass(slots=True)
+class RedriveJob:
+    id: str
+    filters: dict[str, Any]
+    rate_per_s: float
+    status: str = "running"
+    reset: int = 0
+    dispatched: int = 0
+    error: str | None = None
+    started_at: datetime = field(default_factory=lambda: datetime.now(tz=UTC))
+    finished_at: datetime | None = None
+
+
+class DeadLetterRedriver:
+    """Run redrive jobs: reset matching tasks chunk by chunk, then dispatch them at a fixed rate.
+
+    Reset tasks carry staggered ``available_at`` times, so if this process dies mid-job the
+    scheduler relay finishes the replay at the same pace instead of all at once. Only the most
+    recent ``max_jobs`` jobs are kept for progress queries.
+    """
+
+    def __init__(
+        self,
+        task_queue: Queue = queue,
+        chunk_size: int = settings.redrive_chunk_size,
+        max_jobs: int = 100,
+    ) -> None:
+        self._queue = task_queue
+        self._chunk_size = chunk_size
+        self._max_jobs = max_jobs
+        self._jobs: OrderedDict[str, RedriveJob] = OrderedDict()
+        self._runners: dict[str, asyncio.Task[None]] = {}
+
+    def start(self, filters: dict[str, Any], rate_per_s: float | None = None) -> RedriveJob:
+        job = RedriveJob(
+            id=uuid4().hex, filters=filters, rate_per_s=rate_per_s or settings.redrive_rate_per_s
+        )
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._max_jobs:
+            self._jobs.popitem(last=False)
+        self._runners[job.id] = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> RedriveJob | None:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str) -> None:
+        runner = self._runners.get(job_id)
+        if runner is not None:
+            await runner
+
+    def _reset_chunk(self, conditions: list[ColumnElement[bool]], interval: timedelta) -> list[int]:
+        with db_session() as db:
+            return redrive_dead_letters(
+                db,
+                conditions,
+                limit=self._chunk_size,
+                start_at=datetime.now(tz=UTC),
+                interval=interval,
+            )
+
+    async def _run(self, job: RedriveJob) -> None:
+        interval = timedelta(seconds=1 / job.rate_per_s)
+        conditions = dead_letter_filters(DeadLetterFilter(**job.filters))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # * Off the event loop: a chunk locks and rewrites up to chunk_size rows, which
+                # * would otherwise stall every request of this process, waiters included.
+                task_ids = await asyncio.to_thread(self._reset_chunk, conditions, interval)
+                if not task_ids:
+                    break
+                job.reset += len(task_ids)
+                metrics.increment("tasks_redriven", len(task_ids))
+                await self._queue.publish_events(task_ids, "queued")
+
+                # * Dispatch in one-second slices, each sent once its last task is due.
+                started = loop.time()
+                step = max(1, int(job.rate_per_s))
+                for offset in range(0, len(task_ids), step):
+                    batch = task_ids[offset : offset + step]
+                    due_in = (offset + len(batch) - 1) / job.rate_per_s
+                    delay = started + due_in - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    sent = await self._queue.dispatch_tasks(batch)
+                    job.dispatched += sum(1 for stream_id in sent.values() if stream_id)
+            job.status = "done"
+        except Exception as exc:  # noqa: BLE001 - surfaced through the job; the relay catches up
+            job.status = "failed"
+            job.error = str(exc)
+            log.error("Redrive job %s failed: %s", job.id, exc, exc_info=True)
+        finally:
+            job.finished_at = datetime.now(tz=UTC)
+            self._runners.pop(job.id, None)
+
+
+redriver = DeadLetterRedriver()
@@ -0,0 +1,270 @@
+"""Recurring schedules stored in ``task_schedules`` and the enqueueing of their fire times."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from string import Template
+from typing import Any
+
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models import TaskSchedule
+from ..schemas import ScheduleCreate, ScheduleUpdate, TaskCreate
+from .tasks import create_tasks
+
+settings = get_settings()
+
+# * Fields a PATCH may clear by sending null; null elsewhere means "leave unchanged".
+_NULLABLE_FIELDS = frozenset({"routing_key", "cron", "interval_seconds", "catchup_rate_per_s"})
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+def parse_cron(expression: str) -> CronTrigger:
+    """Compile a five-field crontab expression evaluated in UTC; raises ``ValueError``."""
+
+    return CronTrigger.from_crontab(expression, timezone=UTC)
+
+
+@dataclass(slots=True)
+class ScheduleSpec:
+    """What the scheduler needs to fire a schedule, with its cron expression precompiled."""
+
+    id: int
+    name: str
+    task_name: str
+    payload: dict[str, Any]
+    routing_key: str | None
+    trigger: CronTrigger | None
+    interval: timedelta | None
+    next_run_at: datetime
+    misfire_policy: str = "coalesce"
+    catchup_rate: float = 1.0
+
+    @classmethod
+    def from_row(cls, schedule: TaskSchedule) -> ScheduleSpec:
+        return cls(
+            id=schedule.id,
+            name=schedule.name,
+            task_name=schedule.task_name,
+            payload=dict(schedule.payload or {}),
+            routing_key=schedule.routing_key,
+            trigger=parse_cron(schedule.cron) if schedule.cron else None,
+            interval=(
+                timedelta(seconds=schedule.interval_seconds) if schedule.interval_seconds else None
+            ),
+            next_run_at=_as_utc(schedule.next_run_at),
+            misfire_policy=schedule.misfire_policy,
+            catchup_rate=schedule.catchup_rate_per_s or settings.scheduler_catchup_rate_per_s,
+        )
+
+    def fire_after(self, moment: datetime) -> datetime:
+        """First fire time strictly after ``moment``.
+
+        Interval schedules keep their phase: the result is ``next_run_at`` advanced by whole
+        intervals.
+        """
+
+        if self.interval is not None:
+            if moment < self.next_run_at:
+                return self.next_run_at
+            skipped = (moment - self.next_run_at) // self.interval + 1
+            return self.next_run_at + skipped * self.interval
+        if self.trigger is None:
+            msg = f"Schedule {self.name} has neither a cron expression nor an interval"
+            raise ValueError(msg)
+        return self.trigger.get_next_fire_time(None, moment + timedelta(microseconds=1))
+
+    def fire_times(self, until: datetime) -> Iterator[datetime]:
+        """Fire times from ``next_run_at`` up to and including ``until``, oldest first."""
+
+        fire_at = self.next_run_at
+        while fire_at <= until:
+            yield fire_at
+            fire_at = self.fire_after(fire_at)
+
+    def last_fire_at(self, until: datetime) -> datetime:
+        """Latest fire time not after ``until``; ``next_run_at`` itself must not be after it."""
+
+        if self.interval is not None:
+            return self.next_run_at + (until - self.next_run_at) // self.interval * self.interval
+        last = self.next_run_at
+        for fire_at in self.fire_times(until):
+            last = fire_at
+        return last
+
+
+def _first_run(cron: str | None, interval_seconds: int | None, now: datetime) -> datetime:
+    if interval_seconds is not None:
+        # Whole seconds, like cron fire times, so they survive DATETIME columns unchanged.
+        return now.replace(microsecond=0) + timedelta(seconds=interval_seconds)
+    return parse_cron(cron or "").get_next_fire_time(None, now)
+
+
+def render_payload(template: Any, spec: ScheduleSpec, fire_at: datetime) -> Any:
+    """Substitute ``${fire_time}``, ``${schedule_id}`` and ``${schedule_name}`` in strings."""
+
+    if isinstance(template, str):
+        return Template(template).safe_substitute(
+            fire_time=fire_at.isoformat(), schedule_id=spec.id, schedule_name=spec.name
+        )
+    if isinstance(template, dict):
+        return {key: render_payload(value, spec, fire_at) for key, value in template.items()}
+    if isinstance(template, list):
+        return [render_payload(value, spec, fire_at) for value in template]
+    return template
+
+
+def schedule_idempotency_key(schedule_id: int, fire_at: datetime) -> str:
+    """Key that makes each fire time enqueue at most once, whichever replica fires it."""
+
+    return f"schedule:{schedule_id}:{int(fire_at.timestamp() * 1000)}"
+
+
+def create_schedule(db: Session, data: ScheduleCreate, now: datetime | None = None) -> TaskSchedule:
+    schedule = TaskSchedule(
+        name=data.name,
+        task_name=data.task_name,
+        payload=data.payload,
+        routing_key=data.routing_key,
+        cron=data.cron,
+        interval_seconds=data.interval_seconds,
+        enabled=data.enabled,
+        misfire_policy=data.misfire_policy,
+        catchup_rate_per_s=data.catchup_rate_per_s,
+        next_run_at=_first_run(data.cron, data.interval_seconds, now or datetime.now(tz=UTC)),
+        revision=0,
+    )
+    db.add(schedule)
+    db.flush()
+    return schedule
+
+
+def update_schedule(
+    db: Session, schedule: TaskSchedule, data: ScheduleUpdate, now: datetime | None = None
+) -> TaskSchedule:
+    changes = {
+        field: value
+        for field, value in data.model_dump(exclude_unset=True).items()
+        if value is not None or field in _NULLABLE_FIELDS
+    }
+    trigger_changed = "cron" in changes or "interval_seconds" in changes
+    if changes.get("cron") is not None:
+        schedule.interval_seconds = None
+    if changes.get("interval_seconds") is not None:
+        schedule.cron = None
+    for field, value in changes.items():
+        setattr(schedule, field, value)
+    if schedule.cron is None and schedule.interval_seconds is None:
+        msg = "Exactly one of cron or interval_seconds is required"
+        raise ValueError(msg)
+    if trigger_changed:
+        schedule.next_run_at = _first_run(
+            schedule.cron, schedule.interval_seconds, now or datetime.now(tz=UTC)
+        )
+    schedule.revision += 1
+    return schedule
+
+
+def get_schedule(db: Session, schedule_id: int) -> TaskSchedule | None:
+    return db.get(TaskSchedule, schedule_id)
+
+
+def list_schedules(db: Session) -> list[TaskSchedule]:
+    return list(db.scalars(select(TaskSchedule).order_by(TaskSchedule.id)))
+
+
+def delete_schedule(db: Session, schedule: TaskSchedule) -> None:
+    db.delete(schedule)
+
+
+def ensure_schedule(db: Session, data: ScheduleCreate) -> TaskSchedule:
+    """Create ``data`` unless a schedule with the same name exists already."""
+
+    existing = db.scalar(select(TaskSchedule).where(TaskSchedule.name == data.name))
+    return existing or create_schedule(db, data)
+
+
+def schedules_fingerprint(db: Session) -> tuple[int, int, int]:
+    """Changes whenever a schedule is created, edited or deleted; one cheap aggregate query."""
+
+    row = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.max(TaskSchedule.id), 0),
+            func.coalesce(func.sum(TaskSchedule.revision), 0),
+        ).select_from(TaskSchedule)
+    ).one()
+    return int(row[0]), int(row[1]), int(row[2])
+
+
+def load_schedule_specs(db: Session) -> list[ScheduleSpec]:
+    stmt = select(TaskSchedule).where(TaskSchedule.enabled.is_(True))
+    return [ScheduleSpec.from_row(schedule) for schedule in db.scalars(stmt)]
+
+
+def fire_schedules(
+    db: Session,
+    fires: Sequence[tuple[ScheduleSpec, datetime]],
+    now: datetime,
+    *,
+    catch_up: bool = False,
+    traceparent: str | None = None,
+) -> list[int]:
+    """Enqueue one task per ``(schedule, fire time)`` and advance each schedule past ``now``.
+
+    Each spec's ``next_run_at`` is advanced in place as well. Task creation and the new
+    ``next_run_at`` values commit together, and every task carries
+    :func:`schedule_idempotency_key`, so a leader that takes over mid-way neither skips nor
+    repeats a fire time. With ``catch_up`` the tasks go to the low-priority lane and each
+    schedule only moves past its last fired time, leaving later missed times for the next
+    batch. ``traceparent`` is stored on every new task. Returns the ids of newly created tasks.
+    """
+
+    if not fires:
+        return []
+    items = [
+        TaskCreate(
+            name=spec.task_name,
+            payload=render_payload(spec.payload, spec, fire_at),
+            routing_key=spec.routing_key,
+            idempotency_key=schedule_idempotency_key(spec.id, fire_at),
+        )
+        for spec, fire_at in fires
+    ]
+    created = create_tasks(
+        db,
+        items,
+        stream=settings.redis_low_priority_stream if catch_up else None,
+        traceparent=traceparent,
+    )
+
+    last_fired: dict[int, tuple[ScheduleSpec, datetime]] = {}
+    for spec, fire_at in fires:
+        if spec.id not in last_fired or fire_at > last_fired[spec.id][1]:
+            last_fired[spec.id] = (spec, fire_at)
+    rows: list[dict[str, Any]] = []
+    for spec, fire_at in last_fired.values():
+        spec.next_run_at = spec.fire_after(fire_at if catch_up else max(fire_at, now))
+        rows.append({"id": spec.id, "last_run_at": fire_at, "next_run_at": spec.next_run_at})
+    db.execute(update(TaskSchedule), rows)
+    return [task.id for task, is_new in created if is_new]
+
+
+def skip_schedules(db: Session, specs: Sequence[ScheduleSpec], now: datetime) -> None:
+    """Move each schedule past ``now`` without firing the times it missed."""
+
+    if not specs:
+        return
+    rows: list[dict[str, Any]] = []
+    for spec in specs:
+        spec.next_run_at = spec.fire_after(now)
+        rows.append({"id": spec.id, "next_run_at": spec.next_run_at})
+    db.execute(update(TaskSchedule), rows)
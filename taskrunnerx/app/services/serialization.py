@@ -0,0 +1,38 @@
+"""Fast JSON encoding for API responses built straight from database rows."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up, stdlib json is the fallback
+    orjson = None
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    msg = f"Cannot serialise {type(value).__name__}"
+    raise TypeError(msg)
+
+
+def dumps(value: Any) -> bytes:
+    """Encode ``value`` as compact JSON, using orjson when it is installed."""
+
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """JSON response that skips per-item model validation and encodes with :func:`dumps`."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
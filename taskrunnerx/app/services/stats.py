@@ -0,0 +1,144 @@
+"""Per ``(name, status)`` task counts kept in ``task_stats`` instead of COUNT(*) scans."""
+
+from __future__ import annotations
+
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import event, func, select, union, union_all, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from ..models import Task, TaskStat
+
+_DELTAS_KEY = "task_stat_deltas"
+
+
+def record_transition(db: Session, name: str, old: str | None, new: str | None) -> None:
+    """Note that one ``name`` task moved from ``old`` to ``new`` (``None`` for created/removed).
+
+    Deltas are netted per session and written just before it commits, so a task that passes
+    through several statuses in one transaction touches the counter rows once, late, and
+    inside the same transaction as the transition itself.
+    """
+
+    if old == new:
+        return
+    deltas: Counter[tuple[str, str]] = db.info.setdefault(_DELTAS_KEY, Counter())
+    if old is not None:
+        deltas[(name, old)] -= 1
+    if new is not None:
+        deltas[(name, new)] += 1
+
+
+def record_created(db: Session, names: Iterable[str]) -> None:
+    """Count freshly inserted tasks, which always start out ``queued``."""
+
+    deltas: Counter[tuple[str, str]] = db.info.setdefault(_DELTAS_KEY, Counter())
+    for name, created in Counter(names).items():
+        deltas[(name, "queued")] += created
+
+
+def _upsert(db: Session, rows: list[dict[str, Any]]) -> None:
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql_insert(TaskStat).values(rows)
+        db.execute(stmt.on_duplicate_key_update(count=TaskStat.count + stmt.inserted.count))
+        return
+    if dialect in {"postgresql", "sqlite"}:
+        insert = postgresql_insert if dialect == "postgresql" else sqlite_insert
+        stmt = insert(TaskStat).values(rows)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[TaskStat.name, TaskStat.status],
+                set_={"count": TaskStat.count + stmt.excluded.count},
+            )
+        )
+        return
+    for row in rows:  # pragma: no cover - dialects without an upsert
+        changed = db.execute(
+            update(TaskStat)
+            .where(TaskStat.name == row["name"], TaskStat.status == row["status"])
+            .values(count=TaskStat.count + row["count"])
+        ).rowcount
+        if not changed:
+            db.add(TaskStat(**row))
+
+
+def apply_stat_deltas(db: Session) -> None:
+    """Write pending deltas; called automatically before every commit."""
+
+    deltas: Counter[tuple[str, str]] | None = db.info.pop(_DELTAS_KEY, None)
+    if not deltas:
+        return
+    # * Sorted so concurrent transactions lock counter rows in the same order.
+    rows = [
+        {"name": name, "status": status, "count": delta}
+        for (name, status), delta in sorted(deltas.items())
+        if delta
+    ]
+    if rows:
+        _upsert(db, rows)
+
+
+@event.listens_for(Session, "before_commit")
+def _before_commit(session: Session) -> None:
+    apply_stat_deltas(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DELTAS_KEY, None)
+
+
+def read_task_stats(db: Session) -> dict[str, dict[str, int]]:
+    """Return ``{name: {status: count}}`` straight from the rollup table."""
+
+    stats: dict[str, dict[str, int]] = {}
+    for name, status, count in db.execute(
+        select(TaskStat.name, TaskStat.status, TaskStat.count).where(TaskStat.count != 0)
+    ):
+        stats.setdefault(name, {})[status] = count
+    return stats
+
+
+def count_with_status(db: Session, status: str) -> int:
+    """Total tasks currently in ``status`` across every task name."""
+
+    stmt = select(func.coalesce(func.sum(TaskStat.count), 0)).where(TaskStat.status == status)
+    return int(db.scalar(stmt) or 0)
+
+
+def task_stat_names(db: Session) -> list[str]:
+    """Every task name with a counter or a task row, for :func:`reconcile_task_stats`."""
+
+    names = union(select(TaskStat.name), select(Task.name).distinct())
+    return sorted(db.scalars(names))
+
+
+def reconcile_task_stats(db: Session, name: str) -> int:
+    """Correct drifted ``name`` counters by how far they are off; returns how many changed.
+
+    Counts and counters are read by one statement, so both come from the same snapshot and
+    nothing is locked while ``name``'s tasks are counted. Transitions committed after that
+    snapshot have already moved the counters, so each correction is applied as a delta like
+    any transition's rather than overwriting them; only the final upsert locks counter rows.
+    Commit after each name to keep those locks short.
+    """
+
+    counted = select(Task.status, func.count().label("count")).where(Task.name == name)
+    stored = select(TaskStat.status, (-TaskStat.count).label("count")).where(TaskStat.name == name)
+    drift: Counter[str] = Counter()
+    for status, count in db.execute(union_all(counted.group_by(Task.status), stored)):
+        drift[status] += count
+    rows = [
+        {"name": name, "status": status, "count": delta}
+        for status, delta in sorted(drift.items())
+        if delta
+    ]
+    if rows:
+        _upsert(db, rows)
+    return len(rows)
@@ -0,0 +1,53 @@
+"""Stream shard naming and routing helpers."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+import zlib
+
+
+def shard_stream(base: str, index: int) -> str:
+    """Return the hash-tagged stream key for shard ``index``.
+
+    The braces form a Redis Cluster hash tag, so every shard hashes to its own slot while the
+    stream and anything keyed with the same tag stay co-located.
+    """
+
+    return f"{base}:{{{index}}}"
+
+
+def stream_shards(base: str, count: int) -> list[str]:
+    """Return every stream key for a queue split into ``count`` shards."""
+
+    if count <= 1:
+        return [base]
+    return [shard_stream(base, index) for index in range(count)]
+
+
+def shard_index(routing_key: str, count: int) -> int:
+    """Map a routing key onto a shard using a hash that is stable across processes."""
+
+    if count <= 1:
+        return 0
+    return zlib.crc32(routing_key.encode("utf-8")) % count
+
+
+def stream_for(base: str, count: int, routing_key: str) -> str:
+    """Return the stream a task with ``routing_key`` should be published to."""
+
+    if count <= 1:
+        return base
+    return shard_stream(base, shard_index(routing_key, count))
+
+
+def assigned_streams(base: str, count: int, shards: Iterable[int] | None = None) -> list[str]:
+    """Return the streams for the selected shard indexes, defaulting to all of them."""
+
+    streams = stream_shards(base, count)
+    if count <= 1 or shards is None:
+        return streams
+    selected = sorted({index for index in shards if 0 <= index < count})
+    if not selected:
+        msg = f"No valid shard indexes for {count} shards"
+        raise ValueError(msg)
+    return [streams[index] for index in selected]
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from collections.abc import Iterable
+import base64
+from collections.abc import Iterable, Mapping, Sequence
 from datetime import UTC, datetime, timedelta
 import hashlib
 import json
 from typing import Any
 
-from sqlalchemy import and_, select
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, ColumnElement, func, insert, or_, select, update
+from sqlalchemy.orm import InstrumentedAttribute, Session
 
 from ..config import get_settings
 from ..models import Task, TaskDeadLetter, TaskInbox, TaskOutbox
-from ..schemas import TaskCreate
+from ..schemas import DeadLetterFilter, TaskCreate, TaskFilter, TaskRead
+from .dedupe import dedupe_cache
+from .stats import record_created, record_transition
+from .streams import stream_for
 
 """
 Implements a task management system
@@ -19,6 +23,16 @@ Implements a task management system
 
 SETTINGS = get_settings()
 
+# * Columns clients may project with ``fields=``/``columns=``, in TaskRead order.
+TASK_COLUMNS: dict[str, InstrumentedAttribute[Any]] = {
+    name: getattr(Task, name) for name in TaskRead.model_fields
+}
+# * Columns a listing can page along ahead of ``id``; each leads a ``(column, id)`` index.
+KEYSET_COLUMNS: dict[str, InstrumentedAttribute[Any]] = {
+    "created_at": Task.created_at,
+    "attempts": Task.attempts,
+}
+
 
 def _normalize_payload(payload: dict[str, Any]) -> str:
     return json.dumps(payload, sort_keys=True, separators=(",", ":"))
@@ -54,6 +68,60 @@ def compute_execution_key(name: str, payload_hash: str, window_start: datetime)
     return f"{name}:{payload_hash}:{int(window_start.timestamp() * 1000)}"
 
 
+def compute_idempotent_execution_key(name: str, idempotency_key: str, created_at: datetime) -> str:
+    """Execution key for a client-keyed task, unique per creation so keys can be reused."""
+
+    return f"{name}:idem:{idempotency_key}:{int(created_at.timestamp() * 1000)}"
+
+
+def task_stream(data: TaskCreate) -> str:
+    """Pick the stream shard for a task, routing by key when given and by name otherwise."""
+
+    return stream_for(
+        SETTINGS.redis_stream, SETTINGS.redis_stream_shards, data.routing_key or data.name
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=UTC)
+
+
+def _claim_ttl_ms(window_start: datetime, now: datetime) -> int:
+    """How long a claim on ``window_start`` must last for on-time submissions to still see it."""
+
+    lapses_at = window_start + timedelta(
+        milliseconds=SETTINGS.dedupe_window_ms + SETTINGS.clock_skew_ms
+    )
+    return int((lapses_at - now).total_seconds() * 1000)
+
+
+def _claim_windows(
+    candidates: Sequence[Sequence[tuple[str, datetime]]], now: datetime
+) -> list[bool]:
+    """Claim each item's own ``(execution_key, window_start)`` in Redis with one pipeline.
+
+    ``candidates`` lists every window an item may dedupe against, its own first. Returns, per
+    item, whether it may skip the SQL dedupe lookup: only when its own window is its sole
+    candidate and this call newly claimed it. The only task it can then duplicate has the
+    same ``execution_key``, which the unique index rejects whether or not that task was ever
+    claimed (Redis down, dedupe cache off, key evicted). Items near a window edge also match
+    neighbouring windows under other execution keys, so they always use the database, as do
+    items whose key was already claimed or whose window already closed.
+    """
+
+    if not SETTINGS.dedupe_cache_enabled:
+        return [False] * len(candidates)
+    expiries = {
+        key: ttl_ms
+        for (key, window), *_ in candidates
+        if (ttl_ms := _claim_ttl_ms(window, now)) > 0
+    }
+    claimed = dedupe_cache.claim(expiries)
+    if claimed is None:
+        return [False] * len(candidates)
+    return [len(keys) == 1 and keys[0][0] in claimed for keys in candidates]
+
+
 def _existing_task(
     db: Session, name: str, payload_hash: str, candidate_windows: Iterable[datetime]
 ) -> Task | None:
@@ -71,39 +139,306 @@ def _existing_task(
     return db.scalar(stmt)
 
 
-def create_task(db: Session, data: TaskCreate) -> tuple[Task, bool]:
-    payload: dict[str, Any] = data.payload or {}
-    payload_hash = compute_payload_hash(payload)
-    scheduled_at = data.scheduled_at or datetime.now(tz=UTC)
-    candidate_windows = _window_candidates(scheduled_at)
-    existing = _existing_task(db, data.name, payload_hash, candidate_windows)
-    if existing:
-        return existing, False
-
-    window_start = candidate_windows[0]
-    execution_key = compute_execution_key(data.name, payload_hash, window_start)
-    task = Task(
+def _new_task(
+    data: TaskCreate,
+    *,
+    payload_hash: str,
+    scheduled_at: datetime,
+    execution_key: str,
+    traceparent: str | None,
+) -> Task:
+    return Task(
         name=data.name,
-        payload=payload,
+        payload=data.payload or {},
         payload_hash=payload_hash,
         status="queued",
         scheduled_at=scheduled_at,
-        scheduled_window_start=window_start,
+        scheduled_window_start=_window_candidates(scheduled_at)[0],
         execution_key=execution_key,
+        idempotency_key=data.idempotency_key,
+        traceparent=traceparent,
     )
+
+
+def _insert_task(db: Session, task: Task, stream: str) -> None:
+    """Add ``task`` and the outbox row that dispatches it to ``stream``."""
+
     db.add(task)
     db.flush()
     outbox = TaskOutbox(
         task_id=task.id,
-        stream=SETTINGS.redis_stream,
-        execution_key=execution_key,
-        payload=payload,
-        available_at=scheduled_at,
+        stream=stream,
+        execution_key=task.execution_key,
+        payload=task.payload,
+        available_at=task.scheduled_at,
     )
     db.add(outbox)
+    record_created(db, [task.name])
+
+
+def _keyed_tasks(
+    db: Session, idents: Iterable[tuple[str, str]], now: datetime
+) -> dict[tuple[str, str], Task]:
+    """Find live tasks by ``(name, idempotency_key)``, releasing keys past retention."""
+
+    idents = set(idents)
+    if not idents:
+        return {}
+    stmt = select(Task).where(
+        and_(
+            Task.idempotency_key.in_({key for _, key in idents}),
+            Task.name.in_({name for name, _ in idents}),
+        )
+    )
+    cutoff = now - timedelta(seconds=SETTINGS.idempotency_retention_s)
+    found: dict[tuple[str, str], Task] = {}
+    released = False
+    for task in db.scalars(stmt):
+        ident = (task.name, task.idempotency_key or "")
+        if ident not in idents:
+            continue
+        if _as_utc(task.created_at) < cutoff:
+            task.idempotency_key = None
+            released = True
+            continue
+        found[ident] = task
+    if released:
+        db.flush()
+    return found
+
+
+def _create_keyed_task(
+    db: Session, data: TaskCreate, stream: str | None = None, traceparent: str | None = None
+) -> tuple[Task, bool]:
+    key = data.idempotency_key or ""
+    now = datetime.now(tz=UTC)
+    existing = _keyed_tasks(db, [(data.name, key)], now)
+    if existing:
+        return existing[(data.name, key)], False
+    scheduled_at = data.scheduled_at or now
+    task = _new_task(
+        data,
+        payload_hash="",
+        scheduled_at=scheduled_at,
+        execution_key=compute_idempotent_execution_key(data.name, key, now),
+        traceparent=traceparent,
+    )
+    _insert_task(db, task, stream or task_stream(data))
+    return task, True
+
+
+def create_task(
+    db: Session, data: TaskCreate, *, stream: str | None = None, traceparent: str | None = None
+) -> tuple[Task, bool]:
+    """Persist ``data`` unless it duplicates a live task; ``stream`` overrides shard routing.
+
+    ``traceparent`` is stored on a newly created task and carried by each of its deliveries.
+    """
+
+    if data.idempotency_key is not None:
+        return _create_keyed_task(db, data, stream, traceparent)
+
+    payload: dict[str, Any] = data.payload or {}
+    payload_hash = compute_payload_hash(payload)
+    scheduled_at = data.scheduled_at or datetime.now(tz=UTC)
+    candidate_windows = _window_candidates(scheduled_at)
+    candidates = [
+        (compute_execution_key(data.name, payload_hash, window), window)
+        for window in candidate_windows
+    ]
+    [fresh] = _claim_windows([candidates], datetime.now(tz=UTC))
+    if not fresh:
+        existing = _existing_task(db, data.name, payload_hash, candidate_windows)
+        if existing:
+            return existing, False
+
+    execution_key = candidates[0][0]
+    task = _new_task(
+        data,
+        payload_hash=payload_hash,
+        scheduled_at=scheduled_at,
+        execution_key=execution_key,
+        traceparent=traceparent,
+    )
+    _insert_task(db, task, stream or task_stream(data))
     return task, True
 
 
+def _existing_tasks(
+    db: Session, candidates: Iterable[tuple[str, str, list[datetime]]]
+) -> dict[tuple[str, str, datetime], Task]:
+    names: set[str] = set()
+    hashes: set[str] = set()
+    windows: set[datetime] = set()
+    for name, payload_hash, candidate_windows in candidates:
+        names.add(name)
+        hashes.add(payload_hash)
+        windows.update(candidate_windows)
+    if not names:
+        return {}
+    stmt = select(Task).where(
+        and_(
+            Task.name.in_(names),
+            Task.payload_hash.in_(hashes),
+            Task.scheduled_window_start.in_(windows),
+        )
+    )
+    found: dict[tuple[str, str, datetime], Task] = {}
+    for task in db.scalars(stmt):
+        window_start = _as_utc(task.scheduled_window_start)
+        found.setdefault((task.name, task.payload_hash, window_start), task)
+    return found
+
+
+def create_tasks(
+    db: Session,
+    items: Sequence[TaskCreate],
+    *,
+    stream: str | None = None,
+    traceparent: str | None = None,
+) -> list[tuple[Task, bool]]:
+    """Create many tasks with at most one dedupe lookup and multi-row inserts.
+
+    Results line up with ``items``. An item that repeats an earlier one in the same batch
+    resolves to that earlier task and is reported as not created. ``stream`` overrides shard
+    routing and ``traceparent`` is stored for every new task.
+    """
+
+    now = datetime.now(tz=UTC)
+    # * Items with an idempotency key skip payload hashing; their hash slot stays None.
+    prepared: list[tuple[TaskCreate, dict[str, Any], str | None, datetime, list[datetime]]] = []
+    for data in items:
+        payload: dict[str, Any] = data.payload or {}
+        scheduled_at = data.scheduled_at or now
+        payload_hash = None if data.idempotency_key is not None else compute_payload_hash(payload)
+        prepared.append(
+            (data, payload, payload_hash, scheduled_at, _window_candidates(scheduled_at))
+        )
+
+    hashed = [
+        (data.name, payload_hash, windows)
+        for data, _, payload_hash, _, windows in prepared
+        if payload_hash is not None
+    ]
+    fresh = _claim_windows(
+        [
+            [(compute_execution_key(name, payload_hash, window), window) for window in windows]
+            for name, payload_hash, windows in hashed
+        ],
+        now,
+    )
+    existing = _existing_tasks(
+        db, [candidate for candidate, new in zip(hashed, fresh, strict=True) if not new]
+    )
+    keyed = _keyed_tasks(
+        db,
+        [(data.name, data.idempotency_key) for data, *_ in prepared if data.idempotency_key],
+        now,
+    )
+
+    # * Each slot is either an existing task or the execution key of a row inserted below.
+    slots: list[Task | str] = []
+    pending: dict[tuple[str, str, datetime], str] = {}
+    pending_keyed: dict[tuple[str, str], str] = {}
+    task_rows: list[dict[str, Any]] = []
+    outbox_rows: dict[str, dict[str, Any]] = {}
+    for data, payload, payload_hash, scheduled_at, windows in prepared:
+        match: Task | str | None
+        if payload_hash is None:
+            ident = (data.name, data.idempotency_key or "")
+            match = keyed.get(ident) or pending_keyed.get(ident)
+            execution_key = compute_idempotent_execution_key(*ident, now)
+        else:
+            keys = [(data.name, payload_hash, window) for window in windows]
+            match = next(
+                (existing[key] for key in keys if key in existing),
+                next((pending[key] for key in keys if key in pending), None),
+            )
+            execution_key = compute_execution_key(data.name, payload_hash, windows[0])
+        if match is not None:
+            slots.append(match)
+            continue
+
+        if payload_hash is None:
+            pending_keyed[ident] = execution_key
+        else:
+            pending[keys[0]] = execution_key
+        slots.append(execution_key)
+        task_rows.append(
+            {
+                "name": data.name,
+                "payload": payload,
+                "payload_hash": payload_hash or "",
+                "status": "queued",
+                "attempts": 0,
+                "scheduled_at": scheduled_at,
+                "scheduled_window_start": windows[0],
+                "execution_key": execution_key,
+                "idempotency_key": data.idempotency_key,
+                "traceparent": traceparent,
+            }
+        )
+        outbox_rows[execution_key] = {
+            "stream": stream or task_stream(data),
+            "execution_key": execution_key,
+            "payload": payload,
+            "available_at": scheduled_at,
+            "delivery_attempts": 0,
+        }
+
+    created: dict[str, Task] = {}
+    if task_rows:
+        db.execute(insert(Task), task_rows)
+        stmt = select(Task).where(Task.execution_key.in_(list(outbox_rows)))
+        created = {task.execution_key: task for task in db.scalars(stmt)}
+        db.execute(
+            insert(TaskOutbox),
+            [
+                {"task_id": created[execution_key].id, **row}
+                for execution_key, row in outbox_rows.items()
+            ],
+        )
+        record_created(db, (row["name"] for row in task_rows))
+
+    results: list[tuple[Task, bool]] = []
+    first_seen: set[str] = set()
+    for slot in slots:
+        if isinstance(slot, Task):
+            results.append((slot, False))
+            continue
+        results.append((created[slot], slot not in first_seen))
+        first_seen.add(slot)
+    return results
+
+
+def release_expired_idempotency_keys(db: Session, now: datetime | None = None) -> int:
+    """Clear idempotency keys older than the retention window so they can be reused."""
+
+    cutoff = (now or datetime.now(tz=UTC)) - timedelta(seconds=SETTINGS.idempotency_retention_s)
+    stmt = (
+        update(Task)
+        .where(and_(Task.idempotency_key.is_not(None), Task.created_at < cutoff))
+        .values(idempotency_key=None)
+        .execution_options(synchronize_session=False)
+    )
+    return db.execute(stmt).rowcount or 0
+
+
+def count_due_tasks(db: Session, statuses: Iterable[str], now: datetime) -> dict[str, int]:
+    """Tasks per name in ``statuses`` whose ``scheduled_at`` (their next delivery) has passed.
+
+    Tasks scheduled ahead and retries still in backoff are left out; the count is read from
+    the ``(status, scheduled_at, name)`` index alone.
+    """
+
+    stmt = (
+        select(Task.name, func.count())
+        .where(Task.status.in_(list(statuses)), Task.scheduled_at <= now)
+        .group_by(Task.name)
+    )
+    return {name: int(count) for name, count in db.execute(stmt)}
+
+
 def set_task_started(db: Session, task_id: int, execution_key: str) -> Task | None:
     q = select(Task).where(Task.id == task_id)
     task = db.scalar(q)
@@ -113,6 +448,7 @@ def set_task_started(db: Session, task_id: int, execution_key: str) -> Task | No
         return None
     if task.inbox and task.inbox.processed_at:
         return None
+    record_transition(db, task.name, task.status, "running")
     task.status = "running"
     task.started_at = datetime.now(tz=UTC)
     task.attempts += 1
@@ -127,7 +463,11 @@ def set_task_started(db: Session, task_id: int, execution_key: str) -> Task | No
 
 
 def set_task_finished(
-    db: Session, task_id: int, execution_key: str, error: str | None = None
+    db: Session,
+    task_id: int,
+    execution_key: str,
+    error: str | None = None,
+    timeline: dict[str, Any] | None = None,
 ) -> Task | None:
     q = select(Task).where(Task.id == task_id)
     task = db.scalar(q)
@@ -136,8 +476,12 @@ def set_task_finished(
     if task.execution_key != execution_key:
         return None
 
-    task.status = "failed" if error else "done"
+    status = "failed" if error else "done"
+    record_transition(db, task.name, task.status, status)
+    task.status = status
     task.finished_at = datetime.now(tz=UTC)
+    if timeline is not None:
+        task.timeline = timeline
     if error:
         task.last_error = error
     if task.inbox:
@@ -166,11 +510,19 @@ def mark_task_retry(
     if attempts >= max_attempts:
         return False, attempts
 
-    next_run = datetime.now(tz=UTC) + delay
+    now = datetime.now(tz=UTC)
+    next_run = now + delay
+    record_transition(db, task.name, task.status, "retrying")
     task.status = "retrying"
     task.last_error = error
     task.scheduled_at = next_run
     task.scheduled_window_start = _window_candidates(next_run)[0]
+    if task.idempotency_key is None:
+        # The task keeps its execution key, so only this claim sends new submissions in its new
+        # window to the lookup; if Redis is down it is lost and they may run alongside it.
+        window = _as_utc(task.scheduled_window_start)
+        window_key = compute_execution_key(task.name, task.payload_hash, window)
+        _claim_windows([[(window_key, window)]], now)
     if task.outbox:
         task.outbox.sent_at = None
         task.outbox.stream_id = None
@@ -185,6 +537,7 @@ def move_to_dead_letter(
     task = db.get(Task, task_id)
     failed_at = datetime.now(tz=UTC)
     if task:
+        record_transition(db, task.name, task.status, "dead_letter")
         task.status = "dead_letter"
         task.last_error = error
         task.finished_at = failed_at
@@ -201,10 +554,235 @@ def move_to_dead_letter(
     return dlq
 
 
+def dead_letter_filters(filters: DeadLetterFilter) -> list[ColumnElement[bool]]:
+    """SQL conditions on dead letters; ``error`` matches a substring of the recorded error."""
+
+    conditions: list[ColumnElement[bool]] = []
+    if filters.name is not None:
+        conditions.append(TaskDeadLetter.name == filters.name)
+    if filters.error is not None:
+        conditions.append(TaskDeadLetter.error.contains(filters.error, autoescape=True))
+    if filters.failed_after is not None:
+        conditions.append(TaskDeadLetter.failed_at >= filters.failed_after)
+    if filters.failed_before is not None:
+        conditions.append(TaskDeadLetter.failed_at < filters.failed_before)
+    return conditions
+
+
+def redrive_execution_key(name: str, task_id: int, at: datetime) -> str:
+    return f"{name}:redrive:{task_id}:{int(at.timestamp() * 1000)}"
+
+
+def redrive_dead_letters(
+    db: Session,
+    conditions: Sequence[ColumnElement[bool]],
+    *,
+    limit: int,
+    start_at: datetime,
+    interval: timedelta,
+) -> list[int]:
+    """Reset up to ``limit`` dead-lettered tasks matching ``conditions`` back to ``queued``.
+
+    Only a task's current dead letter matches, so redriven tasks are never picked twice and the
+    old dead-letter rows stay as history. Each task gets a fresh execution key and attempt
+    budget; the ``i``-th is made available at ``start_at + i * interval`` so even the relay
+    replays them at the requested rate. Returns task ids in availability order.
+    """
+
+    stmt = (
+        select(Task.id, Task.name, TaskOutbox.id)
+        .join(
+            TaskDeadLetter,
+            and_(
+                TaskDeadLetter.task_id == Task.id,
+                TaskDeadLetter.execution_key == Task.execution_key,
+            ),
+        )
+        .join(TaskOutbox, TaskOutbox.task_id == Task.id)
+        .where(Task.status == "dead_letter", *conditions)
+        .order_by(Task.id)
+        .limit(limit)
+        .with_for_update()
+    )
+    rows = db.execute(stmt).all()
+    if not rows:
+        return []
+
+    task_rows: list[dict[str, Any]] = []
+    outbox_rows: list[dict[str, Any]] = []
+    for index, (task_id, name, outbox_id) in enumerate(rows):
+        available_at = start_at + index * interval
+        execution_key = redrive_execution_key(name, task_id, start_at)
+        task_rows.append(
+            {
+                "id": task_id,
+                "status": "queued",
+                "attempts": 0,
+                "last_error": None,
+                "started_at": None,
+                "finished_at": None,
+                "scheduled_at": available_at,
+                "execution_key": execution_key,
+            }
+        )
+        outbox_rows.append(
+            {
+                "id": outbox_id,
+                "execution_key": execution_key,
+                "available_at": available_at,
+                "sent_at": None,
+                "stream_id": None,
+            }
+        )
+        record_transition(db, name, "dead_letter", "queued")
+    db.execute(update(Task), task_rows)
+    db.execute(update(TaskOutbox), outbox_rows)
+    return [task_id for task_id, _, _ in rows]
+
+
 def get_task(db: Session, task_id: int) -> Task | None:
     return db.get(Task, task_id)
 
 
-def list_tasks(db: Session, limit: int = 50, offset: int = 0) -> list[Task]:
-    stmt = select(Task).order_by(Task.id.desc()).offset(offset).limit(limit)
-    return list(db.scalars(stmt).all())
+def select_columns(
+    available: Mapping[str, InstrumentedAttribute[Any]], requested: str | None
+) -> list[str]:
+    """Validate a comma-separated column list, defaulting to every available column."""
+
+    if not requested:
+        return list(available)
+    columns = list(dict.fromkeys(part.strip() for part in requested.split(",") if part.strip()))
+    unknown = [column for column in columns if column not in available]
+    if unknown or not columns:
+        msg = f"Unknown columns: {', '.join(unknown) or requested}"
+        raise ValueError(msg)
+    return columns
+
+
+def get_task_row(db: Session, task_id: int, columns: Sequence[str]) -> dict[str, Any] | None:
+    """Load only ``columns`` of one task as a plain dict."""
+
+    stmt = select(*(TASK_COLUMNS[column] for column in columns)).where(Task.id == task_id)
+    row = db.execute(stmt).first()
+    return dict(row._mapping) if row is not None else None
+
+
+def _keyset(stmt: Any, cursor: Mapping[str, Any] | None, keyset: str | None) -> Any:
+    """Order ``stmt`` along ``keyset`` (then ``id``), descending, resuming after ``cursor``."""
+
+    if keyset is None:
+        if cursor is not None:
+            stmt = stmt.where(Task.id < cursor["id"])
+        return stmt.order_by(Task.id.desc())
+    column = KEYSET_COLUMNS[keyset]
+    if cursor is not None:
+        if keyset not in cursor:
+            msg = "Cursor does not match the listing filters"
+            raise ValueError(msg)
+        value = cursor[keyset]
+        # * The leading bound is the index range; the OR only breaks ties within it.
+        stmt = stmt.where(column <= value, or_(column < value, Task.id < cursor["id"]))
+    return stmt.order_by(column.desc(), Task.id.desc())
+
+
+def list_task_rows(
+    db: Session,
+    columns: Sequence[str],
+    limit: int = 50,
+    offset: int = 0,
+    *,
+    cursor: Mapping[str, Any] | None = None,
+    filters: TaskFilter | None = None,
+) -> list[dict[str, Any]]:
+    """Like :func:`list_tasks`, but projecting ``columns`` in SQL and returning plain dicts.
+
+    ``columns`` must include ``id`` and the :func:`keyset_column` of ``filters`` to build a
+    cursor.
+    """
+
+    filters = filters or TaskFilter()
+    stmt = select(*(TASK_COLUMNS[column] for column in columns)).where(*task_filters(filters))
+    stmt = _keyset(stmt, cursor, keyset_column(filters))
+    if offset:
+        stmt = stmt.offset(offset)
+    return [dict(row._mapping) for row in db.execute(stmt.limit(limit))]
+
+
+def keyset_column(filters: TaskFilter) -> str | None:
+    """Column a filtered listing pages along ahead of ``id``, or ``None`` for ``id`` alone.
+
+    A range filter can only use its ``(column, id)`` index if the listing is ordered the same
+    way, so ``created_at`` filters list newest first by creation time and ``min_attempts``
+    lists the most attempted first. With both, ``created_at`` drives and attempts is checked
+    row by row.
+    """
+
+    if filters.created_after is not None or filters.created_before is not None:
+        return "created_at"
+    if filters.min_attempts is not None:
+        return "attempts"
+    return None
+
+
+def encode_cursor(row: Mapping[str, Any], keyset: str | None = None) -> str:
+    """Opaque keyset cursor pointing just past ``row`` in the listing's order."""
+
+    position = {"id": row["id"]}
+    if keyset is not None:
+        value = row[keyset]
+        position[keyset] = value.isoformat() if isinstance(value, datetime) else value
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        decoded: dict[str, Any] = {"id": int(position["id"])}
+        if "created_at" in position:
+            decoded["created_at"] = datetime.fromisoformat(position["created_at"])
+        if "attempts" in position:
+            decoded["attempts"] = int(position["attempts"])
+    except (ValueError, TypeError, KeyError) as exc:
+        msg = "Malformed cursor"
+        raise ValueError(msg) from exc
+    return decoded
+
+
+def task_filters(filters: TaskFilter) -> list[ColumnElement[bool]]:
+    """SQL conditions for the task listing filters, each backed by an index on ``tasks``.
+
+    The ``created_at`` and ``attempts`` indexes serve a listing only in the order given by
+    :func:`keyset_column`.
+    """
+
+    conditions: list[ColumnElement[bool]] = []
+    if filters.status is not None:
+        conditions.append(Task.status == filters.status)
+    if filters.name is not None:
+        conditions.append(Task.name == filters.name)
+    if filters.created_after is not None:
+        conditions.append(Task.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        conditions.append(Task.created_at < filters.created_before)
+    if filters.min_attempts is not None:
+        conditions.append(Task.attempts >= filters.min_attempts)
+    return conditions
+
+
+def list_tasks(
+    db: Session,
+    limit: int = 50,
+    offset: int = 0,
+    *,
+    cursor: Mapping[str, Any] | None = None,
+    filters: TaskFilter | None = None,
+) -> list[Task]:
+    """List tasks in :func:`keyset_column` order, resuming after ``cursor`` when given."""
+
+    filters = filters or TaskFilter()
+    stmt = _keyset(select(Task).where(*task_filters(filters)), cursor, keyset_column(filters))
+    if offset:
+        stmt = stmt.offset(offset)
+    return list(db.scalars(stmt.limit(limit)).all())
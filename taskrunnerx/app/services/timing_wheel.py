@@ -0,0 +1,92 @@
+"""Hierarchical timing wheel for firing many timers with bounded per-tick work."""
+
+from __future__ import annotations
+
+from collections.abc import Hashable
+import math
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TimingWheel(Generic[K]):
+    """Timers bucketed by level: level 0 slots are one ``tick`` wide, each higher level's slots
+    span a full rotation of the level below.
+
+    Adding a timer and expiring one are O(1); a timer is moved down a level at most
+    ``levels - 1`` times, when the slot holding it comes up. With the defaults (100 ms ticks,
+    64 slots, 4 levels) a wheel covers about 19 days; timers beyond that wait in an overflow
+    list until the top level turns. Times are plain seconds, e.g. ``datetime.timestamp()``.
+    """
+
+    def __init__(self, tick: float, slots: int = 64, levels: int = 4, start: float = 0.0) -> None:
+        self.tick = tick
+        self._slots = slots
+        self._levels = levels
+        self._buckets: list[list[list[tuple[int, K]]]] = [
+            [[] for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: list[tuple[int, K]] = []
+        self._due: list[K] = []
+        self._current = self._ticks(start)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _ticks(self, moment: float) -> int:
+        return math.floor(moment / self.tick)
+
+    def add(self, key: K, due: float) -> None:
+        """Fire ``key`` on the first :meth:`advance` at or after ``due``."""
+
+        self._size += 1
+        self._place(self._ticks(due), key)
+
+    def _place(self, ticks: int, key: K) -> None:
+        if ticks <= self._current:
+            self._due.append(key)
+            return
+        span = 1
+        for level in range(self._levels):
+            if ticks // span - self._current // span < self._slots:
+                self._buckets[level][(ticks // span) % self._slots].append((ticks, key))
+                return
+            span *= self._slots
+        self._overflow.append((ticks, key))
+
+    def _cascade(self, level: int) -> None:
+        span = self._slots**level
+        bucket = self._buckets[level][(self._current // span) % self._slots]
+        entries = bucket[:]
+        bucket.clear()
+        if level == self._levels - 1:
+            entries += self._overflow
+            self._overflow = []
+        for ticks, key in entries:
+            self._place(ticks, key)
+
+    def advance(self, now: float) -> list[K]:
+        """Move the wheel to ``now`` and return every key that became due, oldest first."""
+
+        target = self._ticks(now)
+        if target - self._current >= self._slots:
+            # Long gap (e.g. a paused process): re-bucket everything instead of stepping ticks.
+            entries = [entry for level in self._buckets for slot in level for entry in slot]
+            entries += self._overflow
+            self._buckets = [[[] for _ in range(self._slots)] for _ in range(self._levels)]
+            self._overflow = []
+            self._current = target
+            for ticks, key in sorted(entries, key=lambda entry: entry[0]):
+                self._place(ticks, key)
+        while self._current < target:
+            self._current += 1
+            for level in range(self._levels - 1, 0, -1):
+                if self._current % self._slots**level == 0:
+                    self._cascade(level)
+            slot = self._buckets[0][self._current % self._slots]
+            self._due.extend(key for _, key in slot)
+            slot.clear()
+        due, self._due = self._due, []
+        self._size -= len(due)
+        return due
@@ -0,0 +1,270 @@
+"""W3C trace context for tasks, head sampling and export of sampled spans as OTLP/JSON."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Iterator, Mapping
+import contextlib
+from dataclasses import dataclass, field
+import os
+import time
+from typing import Any
+
+import requests
+
+from ...logging import SPAN_ID, TRACE_ID, get_logger
+from ...metrics import metrics
+from ..config import get_settings
+
+settings = get_settings()
+log = get_logger(__name__)
+
+# * Parent-span kinds as numbered by OTLP.
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CONSUMER = 5
+
+
+@dataclass(slots=True, frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    """``SpanContext`` from a ``traceparent`` header or stream field; ``None`` when malformed."""
+
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+def head_sampled(trace_id: str, ratio: float) -> bool:
+    """Decide from the trace id alone, so every process agrees without coordination."""
+
+    return int(trace_id[16:], 16) < ratio * 2**64
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    context: SpanContext
+    parent_span_id: str | None
+    kind: int
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def to_otlp(self) -> dict[str, Any]:
+        span: dict[str, Any] = {
+            "traceId": self.context.trace_id,
+            "spanId": self.context.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Tracer:
+    """Start spans that continue a ``traceparent`` and export the sampled ones in batches.
+
+    Sampling happens once, at the root: a new trace is sampled with probability
+    ``sample_ratio`` and every span under it inherits that decision through the traceparent
+    flag. Unsampled spans only cost two random ids; sampled ones wait in a queue of at most
+    ``queue_size`` spans (overflow is dropped and counted) until the background exporter
+    POSTs them to ``endpoint`` as OTLP/HTTP JSON. Without an endpoint nothing is recorded.
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint: str = settings.otlp_traces_endpoint,
+        sample_ratio: float = settings.trace_sample_ratio,
+        queue_size: int = settings.trace_queue_size,
+        batch_size: int = 512,
+        export_ms: int = 5000,
+    ) -> None:
+        self.endpoint = endpoint
+        self.sample_ratio = sample_ratio
+        self._queue: deque[Span] = deque()
+        self._queue_size = queue_size
+        self._batch_size = batch_size
+        self._interval = export_ms / 1000
+        self._service = "taskrunnerx"
+        self._runner: asyncio.Task[None] | None = None
+
+    def start(self, service: str) -> None:
+        self._service = service
+        if self.endpoint and (self._runner is None or self._runner.done()):
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        runner = self._runner
+        if runner is None:
+            return
+        runner.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        self._runner = None
+        with contextlib.suppress(Exception):
+            await self.export()
+
+    def new_context(self, parent: SpanContext | None = None) -> SpanContext:
+        """Child of ``parent``, or the root of a new trace with a fresh sampling decision."""
+
+        if parent is not None:
+            return SpanContext(parent.trace_id, _new_id(8), parent.sampled)
+        trace_id = _new_id(16)
+        return SpanContext(trace_id, _new_id(8), head_sampled(trace_id, self.sample_ratio))
+
+    def start_span(
+        self,
+        name: str,
+        parent: SpanContext | None = None,
+        *,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Mapping[str, Any] | None = None,
+    ) -> Span:
+        """Open a span; pair with :meth:`end_span`, or use :meth:`span` for a block."""
+
+        return Span(
+            name,
+            self.new_context(parent),
+            parent.span_id if parent is not None else None,
+            kind,
+            time.time_ns(),
+            attributes=dict(attributes or {}),
+        )
+
+    def end_span(self, span: Span, error: BaseException | None = None) -> None:
+        span.end_ns = time.time_ns()
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        self.finish(span)
+
+    @contextlib.contextmanager
+    def span(
+        self,
+        name: str,
+        parent: SpanContext | None = None,
+        *,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Mapping[str, Any] | None = None,
+    ) -> Iterator[Span]:
+        """Run the block as a span; log lines inside carry its trace and span ids."""
+
+        span = self.start_span(name, parent, kind=kind, attributes=attributes)
+        tokens = TRACE_ID.set(span.context.trace_id), SPAN_ID.set(span.context.span_id)
+        error: BaseException | None = None
+        try:
+            yield span
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            TRACE_ID.reset(tokens[0])
+            SPAN_ID.reset(tokens[1])
+            self.end_span(span, error)
+
+    def record(
+        self, name: str, parent: SpanContext, start_ns: int, end_ns: int, **attributes: Any
+    ) -> None:
+        """Record an already-timed child span of ``parent`` (e.g. from lifecycle marks)."""
+
+        if parent.sampled and self.endpoint:
+            context = self.new_context(parent)
+            self.finish(
+                Span(
+                    name, context, parent.span_id, SPAN_KIND_INTERNAL, start_ns, end_ns, attributes
+                )
+            )
+
+    def finish(self, span: Span) -> None:
+        if not span.context.sampled or not self.endpoint:
+            return
+        if len(self._queue) >= self._queue_size:
+            metrics.increment("trace_spans_dropped")
+            return
+        self._queue.append(span)
+
+    def payload(self, spans: list[Span]) -> dict[str, Any]:
+        """OTLP/JSON ``ExportTraceServiceRequest`` body for ``spans``."""
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [_otlp_attribute("service.name", self._service)]},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "taskrunnerx"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    async def export(self) -> int:
+        """POST queued spans in batches; returns how many were sent."""
+
+        sent = 0
+        while self._queue:
+            batch = [self._queue.popleft() for _ in range(min(self._batch_size, len(self._queue)))]
+            response = await asyncio.to_thread(
+                requests.post, self.endpoint, json=self.payload(batch), timeout=5
+            )
+            response.raise_for_status()
+            sent += len(batch)
+        if sent:
+            metrics.increment("trace_spans_exported", sent)
+        return sent
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.export()
+            except Exception as exc:  # noqa: BLE001 - the batch is dropped, tracing is best effort
+                metrics.increment("trace_export_failures")
+                log.warning("Span export failed: %s", exc)
+
+
+tracer = Tracer()
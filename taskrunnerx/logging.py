@@ -1,8 +1,17 @@
 """Logging configuration."""
 
+import atexit
+from collections.abc import Callable, Mapping
+import copy
+from datetime import UTC, datetime
+import json
 import logging
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import random
 import sys
+import time
 from typing import Any
 
 from contextvars import ContextVar
@@ -20,6 +29,147 @@ class ContextFilter(logging.Filter):
         return True
 
 
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the trace fields set by :class:`ContextFilter`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "trace_id": getattr(record, "trace_id", "-"),
+            "span_id": getattr(record, "span_id", "-"),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def log_formatter(text_format: str) -> logging.Formatter:
+    """Formatter for ``LOG_FORMAT``: JSON lines, or ``text_format``."""
+
+    if get_settings().log_format.casefold() == "json":
+        return JsonFormatter()
+    return logging.Formatter(text_format)
+
+
+def parse_logger_rates(raw: str) -> dict[str, float]:
+    """``"worker.processed=0.1,worker=1"`` as ``{"worker.processed": 0.1, "worker": 1.0}``."""
+
+    rates: dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            rates[name.strip()] = float(value)
+    return rates
+
+
+class SamplingFilter(logging.Filter):
+    """Thin out records below WARNING per logger; warnings and errors always pass.
+
+    ``sample`` keeps that fraction of a logger's records and ``rate_limits`` then caps them
+    at so many per second, with bursts up to one second's worth. A rule for ``worker`` also
+    covers ``worker.processed`` unless that has a rule of its own. Dropped records are
+    counted in :attr:`dropped`.
+    """
+
+    def __init__(
+        self,
+        sample: Mapping[str, float] | None = None,
+        rate_limits: Mapping[str, float] | None = None,
+        *,
+        rng: Callable[[], float] = random.random,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__()
+        self._sample = dict(sample or {})
+        self._rate_limits = dict(rate_limits or {})
+        self._rng = rng
+        self._clock = clock
+        # * Rate-limited rule name -> (tokens left, refilled at).
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls) -> "SamplingFilter | None":
+        settings = get_settings()
+        sample = parse_logger_rates(settings.log_sampling)
+        rate_limits = parse_logger_rates(settings.log_rate_limits)
+        return cls(sample, rate_limits) if sample or rate_limits else None
+
+    @staticmethod
+    def _rule(rules: Mapping[str, float], name: str) -> str | None:
+        while name:
+            if name in rules:
+                return name
+            name = name.rpartition(".")[0]
+        return None
+
+    def _take(self, rule: str) -> bool:
+        limit = self._rate_limits[rule]
+        now = self._clock()
+        tokens, refilled_at = self._buckets.get(rule, (limit, now))
+        tokens = min(limit, tokens + (now - refilled_at) * limit)
+        if tokens < 1:
+            self._buckets[rule] = (tokens, now)
+            return False
+        self._buckets[rule] = (tokens - 1, now)
+        return True
+
+    def filter(self, record: logging.LogRecord) -> bool:  # noqa: D401 - logging hook
+        if record.levelno >= logging.WARNING:
+            return True
+        rule = self._rule(self._sample, record.name)
+        if rule is not None and self._rng() >= self._sample[rule]:
+            self.dropped += 1
+            return False
+        rule = self._rule(self._rate_limits, record.name)
+        if rule is not None and not self._take(rule):
+            self.dropped += 1
+            return False
+        return True
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Queue records as they are, leaving formatting (tracebacks included) to the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Arguments may be mutated once the call returns, so resolve the message now.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def queue_logging(
+    logger: Logger, handler: logging.Handler, sampling: SamplingFilter | None = None
+) -> QueueListener:
+    """Send ``logger``'s records to ``handler`` on a background thread.
+
+    The caller only filters the record (sampling first, then the trace context, which must
+    be read on the caller's thread) and puts it on an unbounded queue; formatting and the
+    write happen on the listener thread, so a slow stdout never blocks the event loop.
+    """
+
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = _DeferredQueueHandler(records)
+    if sampling is not None:
+        queue_handler.addFilter(sampling)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    # Flush what is queued at exit, unless the owner already stopped it.
+    if listener._thread is not None:
+        listener.stop()
+
+
 def setup_logging() -> None:
     """Setup application logging."""
 
@@ -28,14 +178,13 @@ def setup_logging() -> None:
         return
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(
-        logging.Formatter(
+        log_formatter(
             "%(asctime)s - %(name)s - %(levelname)s - trace=%(trace_id)s span=%(span_id)s %(message)s"
         )
     )
-    handler.addFilter(ContextFilter())
     root = logging.getLogger()
     root.setLevel(getattr(logging, settings.log_level.upper()))
-    root.addHandler(handler)
+    queue_logging(root, handler, SamplingFilter.from_settings())
 
 
 def get_logger(name: str) -> Logger:
@@ -2,52 +2,298 @@
 
 from __future__ import annotations
 
+from array import array
+from bisect import bisect_left
 from collections import defaultdict
+from collections.abc import Callable, Iterator, Mapping
 from dataclasses import dataclass, field
+import math
+import os
+import time
 from typing import Any
 
+QUANTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+# * Upper bounds (seconds) of the cumulative buckets exposed to Prometheus.
+PROMETHEUS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = "taskrunnerx_"
+# * Label value that new label sets fold into once a metric has ``max_series`` of them.
+OVERFLOW_LABEL = "other"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def series_key(metric: str, labels: Mapping[str, str] | None = None) -> str:
+    """``metric{a="x",b="y"}`` with labels sorted by name, or just ``metric`` without labels."""
+
+    if not labels:
+        return metric
+    pairs = ",".join(f'{name}="{_escape(str(labels[name]))}"' for name in sorted(labels))
+    return f"{metric}{{{pairs}}}"
+
+
+def split_series_key(key: str) -> tuple[str, str]:
+    """Metric name and the ``{...}`` label part (empty without labels) of a series key."""
+
+    name, brace, rest = key.partition("{")
+    return name, brace + rest
+
+
+def _add_label(label_part: str, name: str, value: str) -> str:
+    pair = f'{name}="{value}"'
+    return f"{label_part[:-1]},{pair}}}" if label_part else f"{{{pair}}}"
+
+
+class Histogram:
+    """Fixed-memory latency histogram with log-spaced buckets over a sliding window.
+
+    Values between ``lowest`` and ``highest`` seconds land in buckets ``growth`` apart, so a
+    reported percentile is within about half of ``growth - 1`` (2.5% by default) of the true
+    one; values outside the range clamp to the end buckets. Percentiles and ``max`` cover the
+    last ``window_s`` seconds, kept as ``slices`` sub-windows that are reset as they come
+    around again; ``count``, ``total`` and ``avg`` cover the whole lifetime. Recording is
+    O(1) and memory stays at ``slices`` bucket arrays however many values are recorded.
+
+    Buckets touched since the last :meth:`drain_pending` are also tallied, so another process
+    can merge them into a cluster-wide histogram.
+    """
+
+    __slots__ = (
+        "_clock",
+        "_counts",
+        "_growth",
+        "_le_counts",
+        "_log_growth",
+        "_lowest",
+        "_maxima",
+        "_pending",
+        "_slice_ids",
+        "_slice_s",
+        "_size",
+        "count",
+        "total",
+    )
+
+    def __init__(
+        self,
+        *,
+        lowest: float = 1e-6,
+        highest: float = 3600.0,
+        growth: float = 1.05,
+        window_s: float = 60.0,
+        slices: int = 6,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._lowest = lowest
+        self._growth = growth
+        self._log_growth = math.log(growth)
+        self._size = int(math.log(highest / lowest) / self._log_growth) + 2
+        self._slice_s = window_s / slices
+        self._counts = [array("Q", bytes(8 * self._size)) for _ in range(slices)]
+        self._slice_ids = [-1] * slices
+        self._maxima = [0.0] * slices
+        self._le_counts = [0] * (len(PROMETHEUS_BUCKETS) + 1)
+        self._pending: defaultdict[int, int] = defaultdict(int)
+        self._clock = clock
+        self.count = 0
+        self.total = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self._lowest:
+            return 0
+        return min(int(math.log(value / self._lowest) / self._log_growth) + 1, self._size - 1)
+
+    def _bucket_value(self, index: int) -> float:
+        # Geometric midpoint of the bucket, which bounds the relative error on both sides.
+        return self._lowest * self._growth ** max(index - 0.5, 0)
+
+    def record(self, value: float) -> None:
+        slice_id = int(self._clock() / self._slice_s)
+        position = slice_id % len(self._counts)
+        if self._slice_ids[position] != slice_id:
+            self._counts[position] = array("Q", bytes(8 * self._size))
+            self._slice_ids[position] = slice_id
+            self._maxima[position] = 0.0
+        index = self._index(value)
+        self._counts[position][index] += 1
+        self._pending[index] += 1
+        self._maxima[position] = max(self._maxima[position], value)
+        self._le_counts[bisect_left(PROMETHEUS_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> dict[str, float | int]:
+        """Lifetime count/total/avg plus windowed percentiles and max."""
+
+        current = int(self._clock() / self._slice_s)
+        live = [
+            position
+            for position, slice_id in enumerate(self._slice_ids)
+            if 0 <= current - slice_id < len(self._counts)
+        ]
+        merged = [0] * self._size
+        for position in live:
+            for index, hits in enumerate(self._counts[position]):
+                if hits:
+                    merged[index] += hits
+        seen = sum(merged)
+        window_max = max((self._maxima[position] for position in live), default=0.0)
+        stats: dict[str, float | int] = {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "total": self.total,
+            "window_count": seen,
+        }
+        ranks = [(label, max(1, math.ceil(quantile * seen))) for label, quantile in QUANTILES]
+        cumulative = 0
+        index = 0
+        for label, rank in ranks:
+            while seen and cumulative + merged[index] < rank:
+                cumulative += merged[index]
+                index += 1
+            stats[label] = min(self._bucket_value(index), window_max) if seen else 0.0
+        stats["max"] = window_max
+        return stats
+
+    @classmethod
+    def merged(
+        cls, count: int, total: float, le_counts: list[int], buckets: Mapping[int, int]
+    ) -> Histogram:
+        """Read-only histogram rebuilt from merged counts, e.g. summed over processes.
+
+        ``buckets`` maps log-bucket indexes (see :meth:`drain_pending`) to counts and becomes
+        the window; its max is the upper edge of the highest non-empty bucket.
+        """
+
+        histogram = cls(slices=1, clock=lambda: 0.0)
+        histogram.count = count
+        histogram.total = total
+        histogram._le_counts = list(le_counts)
+        histogram._slice_ids[0] = 0
+        top = -1
+        for index, hits in buckets.items():
+            if 0 <= index < histogram._size and hits > 0:
+                histogram._counts[0][index] += hits
+                top = max(top, index)
+        if top >= 0:
+            histogram._maxima[0] = histogram._lowest * histogram._growth**top
+        return histogram
+
+    @property
+    def le_counts(self) -> list[int]:
+        """Lifetime per-bucket (not cumulative) counts for :data:`PROMETHEUS_BUCKETS` + ``+Inf``."""
+
+        return list(self._le_counts)
+
+    def drain_pending(self) -> dict[int, int]:
+        """Log-bucket counts recorded since the previous call."""
+
+        pending, self._pending = self._pending, defaultdict(int)
+        return dict(pending)
+
+    def cumulative_buckets(self) -> Iterator[tuple[str, int]]:
+        """Lifetime ``(le, count of values <= le)`` pairs ending with ``+Inf``."""
+
+        running = 0
+        for bound, hits in zip((*PROMETHEUS_BUCKETS, math.inf), self._le_counts, strict=True):
+            running += hits
+            yield ("+Inf" if bound == math.inf else repr(bound)), running
+
 
 @dataclass(slots=True)
 class Metrics:
     """Simple in-memory metrics collector."""
 
     counters: defaultdict[str, int] = field(default_factory=lambda: defaultdict(int))
-    timers: defaultdict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    timers: defaultdict[str, Histogram] = field(default_factory=lambda: defaultdict(Histogram))
     gauges: dict[str, float] = field(default_factory=dict)
+    # * Label sets seen per metric name, capped at max_series to bound memory and scrape size.
+    max_series: int = 200
+    label_sets: defaultdict[str, set[str]] = field(default_factory=lambda: defaultdict(set))
+
+    def _key(self, metric: str, labels: Mapping[str, str] | None) -> str:
+        if not labels:
+            return metric
+        key = series_key(metric, labels)
+        known = self.label_sets[metric]
+        if key not in known:
+            if len(known) >= self.max_series:
+                self.counters["metrics_series_overflow"] += 1
+                key = series_key(metric, dict.fromkeys(labels, OVERFLOW_LABEL))
+            known.add(key)
+        return key
 
-    def increment(self, metric: str, value: int = 1) -> None:
+    def increment(
+        self, metric: str, value: int = 1, labels: Mapping[str, str] | None = None
+    ) -> None:
         """Increment counter metric."""
-        self.counters[metric] += value
+        self.counters[self._key(metric, labels)] += value
 
-    def timer(self, metric: str, duration: float) -> None:
+    def timer(self, metric: str, duration: float, labels: Mapping[str, str] | None = None) -> None:
         """Record timer metric."""
-        self.timers[metric].append(duration)
+        self.timers[self._key(metric, labels)].record(duration)
 
-    def set_gauge(self, metric: str, value: float) -> None:
+    def set_gauge(self, metric: str, value: float, labels: Mapping[str, str] | None = None) -> None:
         """Set gauge metric."""
-        self.gauges[metric] = value
+        self.gauges[self._key(metric, labels)] = value
+
+    def total(self, metric: str) -> int:
+        """Counter value summed over all of its label sets."""
+        return sum(
+            value for key, value in self.counters.items() if split_series_key(key)[0] == metric
+        )
 
     def get_stats(self) -> dict[str, Any]:
         """Get all metrics."""
-        success = self.counters.get("tasks_success", 0)
-        failure = self.counters.get("tasks_failure", 0)
+        success = self.total("tasks_success")
+        failure = self.total("tasks_failure")
         total = success + failure
         success_rate = (success / total) if total else 0.0
         return {
             "counters": dict(self.counters),
-            "timers": {
-                key: {
-                    "count": len(values),
-                    "avg": sum(values) / len(values) if values else 0.0,
-                    "total": sum(values),
-                }
-                for key, values in self.timers.items()
-            },
+            "timers": {key: timer.snapshot() for key, timer in self.timers.items()},
             "gauges": dict(self.gauges),
             "derived": {
                 "success_rate": success_rate,
             },
         }
 
+    def render_prometheus(self, extra_gauges: Mapping[str, float] | None = None) -> str:
+        """Prometheus text exposition (format 0.0.4) of every series.
+
+        ``extra_gauges`` maps series keys to values computed at scrape time, so they are never
+        kept around after they stop being reported.
+        """
+        lines: list[str] = []
+
+        def family(name: str, kind: str) -> str:
+            full = f"{PROMETHEUS_PREFIX}{name}"
+            lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        for name, series in _by_name(self.counters).items():
+            full = family(f"{name}_total", "counter")
+            lines.extend(f"{full}{labels} {value}" for labels, value in series)
+        for name, series in _by_name({**self.gauges, **(extra_gauges or {})}).items():
+            full = family(name, "gauge")
+            lines.extend(f"{full}{labels} {value!r}" for labels, value in series)
+        for name, series in _by_name(self.timers).items():
+            full = family(name, "histogram")
+            for labels, histogram in series:
+                for bound, count in histogram.cumulative_buckets():
+                    lines.append(f"{full}_bucket{_add_label(labels, 'le', bound)} {count}")
+                lines.append(f"{full}_sum{labels} {histogram.total!r}")
+                lines.append(f"{full}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _by_name(values: Mapping[str, Any]) -> dict[str, list[tuple[str, Any]]]:
+    grouped: dict[str, list[tuple[str, Any]]] = defaultdict(list)
+    for key in sorted(values):
+        name, labels = split_series_key(key)
+        grouped[name].append((labels, values[key]))
+    return grouped
+
 
-metrics = Metrics()
+metrics = Metrics(max_series=int(os.getenv("METRICS_MAX_SERIES", "200")))
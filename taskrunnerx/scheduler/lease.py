@@ -0,0 +1,48 @@
+"""Redis lease used to elect a single scheduler leader among replicas."""
+
+from __future__ import annotations
+
+from typing import Any
+from uuid import uuid4
+
+# * Renew or release only while we still hold the lease; another holder's token is untouched.
+_RENEW = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLease:
+    """A ``SET NX PX`` lease: whoever holds ``key`` until it expires is the leader.
+
+    Call :meth:`acquire` well within ``ttl_ms`` (a third of it is typical); it both takes a free
+    lease and extends one we already hold. A paused leader can outlive its lease, so work done
+    under it must be safe to repeat once; scheduled fires are, through idempotency keys.
+    """
+
+    def __init__(self, redis: Any, key: str, ttl_ms: int, token: str | None = None) -> None:
+        self._redis = redis
+        self.key = key
+        self.ttl_ms = ttl_ms
+        self.token = token or uuid4().hex
+        self.held = False
+
+    async def acquire(self) -> bool:
+        if self.held:
+            self.held = bool(await self._redis.eval(_RENEW, 1, self.key, self.token, self.ttl_ms))
+        if not self.held:
+            self.held = bool(await self._redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+        return self.held
+
+    async def release(self) -> None:
+        if self.held:
+            await self._redis.eval(_RELEASE, 1, self.key, self.token)
+            self.held = False
@@ -0,0 +1,127 @@
+"""Sub-second relay for delayed tasks, backed by a timing wheel over a near-term window."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import contextlib
+from datetime import UTC, datetime, timedelta
+
+from taskrunnerx.app.config import get_settings
+from taskrunnerx.app.services.queue import Queue, queue
+from taskrunnerx.app.services.timing_wheel import TimingWheel
+from taskrunnerx.logging import get_logger
+from taskrunnerx.metrics import metrics
+
+settings = get_settings()
+log = get_logger(__name__)
+
+
+class DelayedRelay:
+    """Dispatch delayed tasks close to their ``available_at`` without rescanning the outbox.
+
+    Only rows due within ``horizon_ms`` are read, in ``(available_at, id)`` order and in chunks
+    that resume where the last read stopped; they wait in a :class:`TimingWheel` until due.
+    Rows inserted later behind that read position are picked up by id. Anything the relay
+    misses (a retry re-armed in place, a crash) is still swept by ``Queue.flush_due``.
+    """
+
+    def __init__(
+        self,
+        task_queue: Queue = queue,
+        *,
+        horizon_ms: int = settings.relay_horizon_ms,
+        tick_ms: int = settings.relay_tick_ms,
+        load_ms: int = settings.relay_load_ms,
+        max_entries: int = settings.relay_max_entries,
+        chunk_size: int = 1000,
+    ) -> None:
+        self._queue = task_queue
+        self._horizon = timedelta(milliseconds=horizon_ms)
+        self._tick = tick_ms / 1000
+        self._load_every = load_ms / 1000
+        self._max_entries = max_entries
+        self._chunk_size = chunk_size
+        self._reset()
+
+    def _reset(self) -> None:
+        self._wheel: TimingWheel[int] = TimingWheel(
+            self._tick, start=datetime.now(tz=UTC).timestamp()
+        )
+        self._cursor: tuple[datetime, int] | None = None
+        self._last_id: int | None = None
+        self._next_load = 0.0
+
+    def __len__(self) -> int:
+        return len(self._wheel)
+
+    def _add(self, rows: list[tuple[int, int, datetime]]) -> None:
+        for _, task_id, available_at in rows:
+            self._wheel.add(task_id, available_at.timestamp())
+
+    def load(self, now: datetime) -> int:
+        """Read newly visible rows into the wheel; returns how many were added."""
+
+        before = len(self._wheel)
+        if self._last_id is None:
+            self._last_id = self._queue.last_outbox_id()
+        if self._cursor is not None:
+            # * Rows created after the range read passed their due time.
+            cursor = self._cursor
+            added = [
+                row
+                for row in self._queue.outbox_added_since(
+                    self._last_id, cursor[0], limit=self._chunk_size
+                )
+                if (row[2], row[0]) <= cursor
+            ]
+            self._add(added)
+            if added:
+                self._last_id = max(self._last_id, *(row[0] for row in added))
+
+        horizon = now + self._horizon
+        while len(self._wheel) < self._max_entries:
+            rows = self._queue.pending_outbox(horizon, after=self._cursor, limit=self._chunk_size)
+            if not rows:
+                break
+            self._add(rows)
+            last = rows[-1]
+            self._cursor = (last[2], last[0])
+            self._last_id = max(self._last_id, *(row[0] for row in rows))
+            if len(rows) < self._chunk_size:
+                break
+        return len(self._wheel) - before
+
+    async def tick(self, now: datetime | None = None) -> int:
+        """Load if due, then dispatch every task whose time has come; returns how many."""
+
+        now = now or datetime.now(tz=UTC)
+        moment = now.timestamp()
+        if moment >= self._next_load:
+            # * Off the event loop, so outbox reads never delay renewing the leader lease.
+            await asyncio.to_thread(self.load, now)
+            self._next_load = moment + self._load_every
+        due = self._wheel.advance(moment)
+        for offset in range(0, len(due), self._chunk_size):
+            await self._queue.dispatch_tasks(due[offset : offset + self._chunk_size])
+        if due:
+            metrics.increment("relay_dispatched", len(due))
+        metrics.set_gauge("relay_wheel_size", float(len(self._wheel)))
+        return len(due)
+
+    async def run(self, stop: asyncio.Event, is_active: Callable[[], bool]) -> None:
+        """Tick while ``is_active()`` (the scheduler leader) and drop all state otherwise."""
+
+        active = False
+        while not stop.is_set():
+            try:
+                if is_active():
+                    active = True
+                    await self.tick()
+                elif active:
+                    active = False
+                    self._reset()
+            except Exception as exc:  # noqa: BLE001 - the outbox still holds every row
+                log.error("Relay error: %s", exc, exc_info=True)
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(stop.wait(), self._tick)
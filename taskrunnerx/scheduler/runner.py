@@ -0,0 +1,203 @@
+"""Leader-only loop that fires DB-stored schedules from an in-memory heap."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+import contextlib
+from datetime import UTC, datetime, timedelta
+import heapq
+from itertools import islice
+
+from taskrunnerx.app.config import get_settings
+from taskrunnerx.app.deps import db_session
+from taskrunnerx.app.services.queue import Queue, queue
+from taskrunnerx.app.services.schedules import (
+    ScheduleSpec,
+    fire_schedules,
+    load_schedule_specs,
+    schedules_fingerprint,
+    skip_schedules,
+)
+from taskrunnerx.app.services.tracing import tracer
+from taskrunnerx.logging import get_logger
+from taskrunnerx.metrics import metrics
+from taskrunnerx.scheduler.lease import RedisLease
+
+settings = get_settings()
+log = get_logger(__name__)
+
+Fire = tuple[ScheduleSpec, datetime]
+
+
+class ScheduleRunner:
+    """Fire due schedules while holding the leader lease.
+
+    Schedules sit in a heap keyed by ``next_run_at``, so a wakeup costs one aggregate query to
+    spot API edits plus ``O(log n)`` per fire, however many schedules exist. Followers keep
+    nothing in memory; a new leader rebuilds the heap from ``task_schedules``, which the old
+    leader kept current in the same transactions that created the tasks.
+    """
+
+    def __init__(
+        self,
+        lease: RedisLease,
+        task_queue: Queue = queue,
+        *,
+        poll_ms: int = settings.scheduler_poll_ms,
+        batch_size: int = settings.scheduler_fire_batch,
+        misfire_grace_ms: int = settings.scheduler_misfire_grace_ms,
+    ) -> None:
+        self._lease = lease
+        self._queue = task_queue
+        self._poll = poll_ms / 1000
+        self._batch_size = batch_size
+        self._grace = timedelta(milliseconds=misfire_grace_ms)
+        # * Heap entries are (wake time, schedule id); stale ones no longer match _wake.
+        self._heap: list[tuple[datetime, int]] = []
+        self._wake: dict[int, datetime] = {}
+        self._specs: dict[int, ScheduleSpec] = {}
+        self._fingerprint: tuple[int, int, int] | None = None
+
+    def _forget(self) -> None:
+        self._heap.clear()
+        self._specs.clear()
+        self._wake.clear()
+        self._fingerprint = None
+
+    def _push(self, spec: ScheduleSpec, not_before: datetime | None = None) -> None:
+        wake_at = spec.next_run_at if not_before is None else max(spec.next_run_at, not_before)
+        self._wake[spec.id] = wake_at
+        heapq.heappush(self._heap, (wake_at, spec.id))
+
+    def _reload_if_changed(self) -> None:
+        with db_session() as db:
+            fingerprint = schedules_fingerprint(db)
+            if fingerprint == self._fingerprint:
+                return
+            specs = load_schedule_specs(db)
+        self._specs = {spec.id: spec for spec in specs}
+        self._wake = {spec.id: spec.next_run_at for spec in specs}
+        self._heap = [(spec.next_run_at, spec.id) for spec in specs]
+        heapq.heapify(self._heap)
+        self._fingerprint = fingerprint
+        log.info("Loaded %d schedules", len(specs))
+
+    def _pop_due(self, now: datetime) -> list[ScheduleSpec]:
+        due: list[ScheduleSpec] = []
+        while self._heap and self._heap[0][0] <= now:
+            wake_at, schedule_id = heapq.heappop(self._heap)
+            spec = self._specs.get(schedule_id)
+            if spec is not None and self._wake.get(schedule_id) == wake_at:
+                del self._wake[schedule_id]
+                due.append(spec)
+        return due
+
+    def _plan(
+        self, due: list[ScheduleSpec], now: datetime
+    ) -> tuple[list[Fire], list[Fire], list[ScheduleSpec]]:
+        """Split due schedules into on-time fires, catch-up fires and misfires to skip."""
+
+        on_time: list[Fire] = []
+        catch_up: list[Fire] = []
+        skipped: list[ScheduleSpec] = []
+        for spec in due:
+            if now - spec.next_run_at <= self._grace:
+                on_time.append((spec, spec.next_run_at))
+            elif spec.misfire_policy == "skip":
+                skipped.append(spec)
+            elif spec.misfire_policy == "catch_up":
+                # * One second's worth per wakeup; the rest waits for the next batch.
+                burst = max(1, int(spec.catchup_rate))
+                catch_up.extend((spec, fire_at) for fire_at in islice(spec.fire_times(now), burst))
+            else:
+                on_time.append((spec, spec.last_fire_at(now)))
+        return on_time, catch_up, skipped
+
+    @staticmethod
+    def _skip(skipped: list[ScheduleSpec], now: datetime) -> None:
+        with db_session() as db:
+            skip_schedules(db, skipped, now)
+
+    @staticmethod
+    def _create_fires(
+        fires: list[Fire], now: datetime, catch_up: bool, traceparent: str | None
+    ) -> list[int]:
+        with db_session() as db:
+            return fire_schedules(db, fires, now, catch_up=catch_up, traceparent=traceparent)
+
+    async def _fire(self, fires: list[Fire], now: datetime, *, catch_up: bool) -> list[int]:
+        created: list[int] = []
+        for offset in range(0, len(fires), self._batch_size):
+            chunk = fires[offset : offset + self._batch_size]
+            # * One root span per chunk: a trace per scheduler tick, holding the tasks it fired.
+            with tracer.span("fire_schedules", attributes={"fires": len(chunk)}) as span:
+                task_ids = await asyncio.to_thread(
+                    self._create_fires, chunk, now, catch_up, span.context.traceparent
+                )
+            fired = Counter(spec.id for spec, _ in chunk)
+            for spec in {spec.id: spec for spec, _ in chunk}.values():
+                if catch_up:
+                    pause = timedelta(seconds=fired[spec.id] / spec.catchup_rate)
+                    self._push(spec, now + pause)
+                else:
+                    self._push(spec)
+            if task_ids:
+                try:
+                    await self._queue.dispatch_tasks(task_ids)
+                except Exception as exc:  # noqa: BLE001 - committed; the relay dispatches them
+                    log.warning("Deferred dispatch of %d scheduled tasks: %s", len(task_ids), exc)
+            created.extend(task_ids)
+        return created
+
+    async def tick(self, now: datetime | None = None) -> list[int]:
+        """Fire everything due at ``now``; returns the ids of the tasks created.
+
+        A schedule more than ``misfire_grace_ms`` behind follows its misfire policy: ``skip``
+        drops the missed times, ``coalesce`` fires only the latest of them, and ``catch_up``
+        fires each one on the low-priority lane, ``catchup_rate_per_s`` at a time per second.
+        """
+
+        # * Database work runs in threads so a slow query never delays renewing the lease.
+        await asyncio.to_thread(self._reload_if_changed)
+        now = now or datetime.now(tz=UTC)
+        on_time, catch_up, skipped = self._plan(self._pop_due(now), now)
+        try:
+            if skipped:
+                await asyncio.to_thread(self._skip, skipped, now)
+                for spec in skipped:
+                    self._push(spec)
+            created = await self._fire(on_time, now, catch_up=False)
+            created += await self._fire(catch_up, now, catch_up=True)
+        except Exception:
+            # Unfired specs left the heap; rebuild it from the table on the next tick.
+            self._fingerprint = None
+            raise
+        if on_time:
+            metrics.increment("schedules_fired", len(on_time))
+        if catch_up:
+            metrics.increment("schedules_caught_up", len(catch_up))
+        if skipped:
+            metrics.increment("schedules_misfired", len(skipped))
+        return created
+
+    def _seconds_until_next(self) -> float:
+        if not self._heap:
+            return self._poll
+        delay = (self._heap[0][0] - datetime.now(tz=UTC)).total_seconds()
+        return min(max(delay, 0.0), self._poll)
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            delay = self._poll
+            try:
+                if await self._lease.acquire():
+                    await self.tick()
+                    delay = self._seconds_until_next()
+                else:
+                    self._forget()
+            except Exception as exc:  # noqa: BLE001 - keep electing and firing
+                log.error("Schedule loop error: %s", exc, exc_info=True)
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(stop.wait(), delay)
+        await self._lease.release()
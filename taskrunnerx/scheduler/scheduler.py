@@ -1,41 +1,110 @@
 import asyncio
+from collections.abc import Callable
 import signal
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy.exc import IntegrityError
 
+from taskrunnerx.app.config import get_settings
 from taskrunnerx.app.deps import db_session
-from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.schemas import ScheduleCreate
+from taskrunnerx.app.services.cluster_metrics import cluster_metrics
+from taskrunnerx.app.services.monitor import monitor
 from taskrunnerx.app.services.queue import queue
-from taskrunnerx.app.services.tasks import create_task
+from taskrunnerx.app.services.redis_client import async_redis
+from taskrunnerx.app.services.schedules import ensure_schedule
+from taskrunnerx.app.services.stats import reconcile_task_stats, task_stat_names
+from taskrunnerx.app.services.tasks import release_expired_idempotency_keys
+from taskrunnerx.app.services.tracing import tracer
+from taskrunnerx.scheduler.lease import RedisLease
+from taskrunnerx.scheduler.relay import DelayedRelay
+from taskrunnerx.scheduler.runner import ScheduleRunner
 
+settings = get_settings()
+
+# * Seeded on startup when missing; edit or disable it through /api/schedules like any other.
+DEFAULT_SCHEDULES = (
+    ScheduleCreate(
+        name="heartbeat",
+        task_name="heartbeat",
+        payload={"source": "scheduler"},
+        interval_seconds=60,
+    ),
+)
 
-async def enqueue_heartbeat() -> None:
-    with db_session() as db:
-        task, _ = create_task(
-            db,
-            TaskCreate(name="heartbeat", payload={"source": "scheduler"}),
-        )
-    await queue.dispatch_task(task.id)
+
+def seed_default_schedules() -> None:
+    for data in DEFAULT_SCHEDULES:
+        try:
+            with db_session() as db:
+                ensure_schedule(db, data)
+        except IntegrityError:
+            pass  # Another replica seeded it first.
 
 
 async def flush_due_tasks() -> None:
     await queue.flush_due()
 
 
+def release_idempotency_keys_blocking() -> None:
+    with db_session() as db:
+        release_expired_idempotency_keys(db)
+
+
+async def release_idempotency_keys() -> None:
+    # * Jobs share the event loop with lease renewal, so database work runs in a thread.
+    await asyncio.to_thread(release_idempotency_keys_blocking)
+
+
+def reconcile_stats_by_name(is_leader: Callable[[], bool]) -> None:
+    with db_session() as db:
+        names = task_stat_names(db)
+    for name in names:
+        if not is_leader():
+            return
+        with db_session() as db:
+            reconcile_task_stats(db, name)
+
+
+async def reconcile_stats(is_leader: Callable[[], bool]) -> None:
+    # * Leader only, and off the event loop so the recount never delays lease renewal.
+    if is_leader():
+        await asyncio.to_thread(reconcile_stats_by_name, is_leader)
+
+
 async def main() -> None:
     await queue.connect()
+    seed_default_schedules()
+    redis = async_redis(settings.redis_url, decode_responses=True)
+    lease = RedisLease(redis, settings.scheduler_leader_key, settings.scheduler_lease_ms)
+    runner = ScheduleRunner(lease)
+    relay = DelayedRelay()
+
     scheduler = AsyncIOScheduler(timezone="UTC")
-    scheduler.add_job(enqueue_heartbeat, trigger=IntervalTrigger(minutes=1))
+    # * Safety net behind the relay; only scans rows that are already due.
     scheduler.add_job(flush_due_tasks, trigger=IntervalTrigger(seconds=5))
+    scheduler.add_job(release_idempotency_keys, trigger=IntervalTrigger(minutes=15))
+    scheduler.add_job(
+        reconcile_stats, trigger=IntervalTrigger(minutes=10), args=[lambda: lease.held]
+    )
     scheduler.start()
+    if settings.metrics_redis_enabled:
+        cluster_metrics.start("scheduler")
+    tracer.start("taskrunnerx-scheduler")
+    if settings.queue_monitor_enabled:
+        monitor.start("scheduler")
 
     stop = asyncio.Event()
     loop = asyncio.get_running_loop()
     for sig in (signal.SIGINT, signal.SIGTERM):
         loop.add_signal_handler(sig, stop.set)
-    await stop.wait()
+    await asyncio.gather(runner.run(stop), relay.run(stop, lambda: lease.held))
     scheduler.shutdown(wait=False)
+    await monitor.stop()
+    await tracer.stop()
+    await cluster_metrics.stop()
+    await redis.close()
     await queue.close()
 
 
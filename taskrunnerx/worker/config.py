@@ -3,12 +3,39 @@ import os
 from pydantic import BaseModel, Field
 
 
+def _parse_shards(raw: str) -> list[int] | None:
+    values = [part.strip() for part in raw.split(",") if part.strip()]
+    if not values:
+        return None
+    return [int(value) for value in values]
+
+
 class WorkerSettings(BaseModel):
     redis_url: str = Field(default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    # * Connect with a Redis Cluster client; REDIS_URL then names any node of the cluster.
+    redis_cluster: bool = Field(default=os.getenv("REDIS_CLUSTER", "false").casefold() == "true")
     stream: str = Field(default=os.getenv("REDIS_STREAM", "trx.tasks"))
+    stream_shards: int = Field(default=int(os.getenv("REDIS_STREAM_SHARDS", "1")), ge=1)
+    # * Comma-separated shard indexes this worker consumes; empty means every shard.
+    shards: list[int] | None = Field(default=_parse_shards(os.getenv("WORKER_SHARDS", "")))
+    # * Drained only when the assigned main streams are empty.
+    low_priority_stream: str = Field(
+        default=os.getenv("REDIS_LOW_PRIORITY_STREAM", "trx.tasks.low")
+    )
     group: str = Field(default=os.getenv("REDIS_GROUP", "trx.workers"))
     consumer: str = Field(default=os.getenv("WORKER_NAME", "worker-1"))
     block_ms: int = Field(default=int(os.getenv("WORKER_BLOCK_MS", "5000")))
+    # * Serves Prometheus text on GET /metrics when non-zero.
+    metrics_port: int = Field(default=int(os.getenv("WORKER_METRICS_PORT", "0")), ge=0)
+    metrics_host: str = Field(default=os.getenv("WORKER_METRICS_HOST", "0.0.0.0"))
+    # * On-demand handler profiling: a Redis hash of task name (or "*") -> sample rate.
+    profile_key: str = Field(default=os.getenv("WORKER_PROFILE_KEY", "taskrunnerx:profile"))
+    profile_dir: str = Field(default=os.getenv("WORKER_PROFILE_DIR", "profiles"))
+    profile_poll_ms: int = Field(default=int(os.getenv("WORKER_PROFILE_POLL_MS", "2000")), ge=100)
+    # * Sample rate for every task while SIGUSR1 has profiling toggled on.
+    profile_signal_rate: float = Field(
+        default=float(os.getenv("WORKER_PROFILE_SIGNAL_RATE", "1.0")), gt=0, le=1
+    )
 
 
 def get_worker_settings() -> WorkerSettings:
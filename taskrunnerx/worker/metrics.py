@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 from dataclasses import dataclass, field
 from time import time
 from types import TracebackType
 
+from ..metrics import metrics
+
 
 @dataclass(slots=True)
 class Timer:
@@ -26,3 +30,32 @@ class Timer:
     ) -> None:
         _ = exc_type, exc, tb  # Unused hook parameters.
         self.elapsed = time() - self.start
+
+
+async def _serve_metrics(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()).strip():
+            pass  # Headers are not needed.
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type = "200 OK", "text/plain; version=0.0.4; charset=utf-8"
+            body = metrics.render_prometheus().encode()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain", b"not found\n"
+        head = (
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n"
+        )
+        writer.write(head.encode() + body)
+        await writer.drain()
+    finally:
+        writer.close()
+        with contextlib.suppress(ConnectionError):
+            await writer.wait_closed()
+
+
+async def start_metrics_server(host: str, port: int) -> asyncio.Server:
+    """Minimal HTTP endpoint for Prometheus scrapes, so the worker needs no web framework."""
+
+    return await asyncio.start_server(_serve_metrics, host, port)
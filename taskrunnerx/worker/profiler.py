@@ -0,0 +1,170 @@
+"""On-demand cProfile sampling of task handlers, switched on at runtime."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Mapping
+import contextlib
+import cProfile
+import os
+from pathlib import Path
+import pstats
+import random
+import re
+import signal
+from typing import Any
+
+from ..logging import get_logger
+from ..metrics import metrics
+from .config import get_worker_settings
+
+WCFG = get_worker_settings()
+log = get_logger(__name__)
+
+# * Rule name matching every task.
+ALL_TASKS = "*"
+_UNSAFE = re.compile(r"[^\w.-]")
+
+
+class HandlerProfiler:
+    """Profile a sample of handler runs per task name and keep one aggregate per handler.
+
+    Rules map a task name, or ``*`` for every task, to the fraction of its runs to profile.
+    They come from the Redis hash ``key`` (``HSET taskrunnerx:profile sha256 0.1``; ``DEL`` it
+    to stop), polled every ``poll_ms``, and from SIGUSR1, which toggles profiling of every task
+    at ``signal_rate``. While no rule is set the worker only reads :attr:`active`.
+
+    cProfile sees the whole event loop while a handler runs, so background work such as
+    metrics flushes can appear in a profile; other handlers cannot, since the worker runs one
+    at a time. Aggregates are written to ``{directory}/{task}.{process}.pstats`` whenever they
+    change, for ``python -m pstats`` or snakeviz, and start afresh each time profiling is
+    switched on.
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str = WCFG.profile_key,
+        directory: str = WCFG.profile_dir,
+        poll_ms: int = WCFG.profile_poll_ms,
+        signal_rate: float = WCFG.profile_signal_rate,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.active = False
+        self.rules: dict[str, float] = {}
+        self._key = key
+        self._directory = Path(directory)
+        self._interval = poll_ms / 1000
+        self._signal_rate = signal_rate
+        self._rng = rng
+        self._process = f"{WCFG.consumer}.{os.getpid()}"
+        self._remote: dict[str, float] = {}
+        self._local: dict[str, float] = {}
+        self._stats: dict[str, pstats.Stats] = {}
+        self._dirty: set[str] = set()
+        self._profiling = False
+        self._redis: Any | None = None
+        self._runner: asyncio.Task[None] | None = None
+
+    def _apply(self) -> None:
+        rules = {**self._remote, **self._local}
+        if rules and not self.active:
+            self._stats.clear()
+            log.info("Handler profiling on: %s", rules)
+        elif self.active and not rules:
+            log.info("Handler profiling off")
+        self.rules = rules
+        self.active = bool(rules)
+
+    def set_rules(self, rules: Mapping[str, float]) -> None:
+        """Replace the rules read from Redis; rates are clamped to (0, 1]."""
+
+        self._remote = {name: min(rate, 1.0) for name, rate in rules.items() if rate > 0}
+        self._apply()
+
+    def toggle(self) -> None:
+        """Signal handler: profile every task at ``signal_rate``, or stop doing so."""
+
+        self._local = {} if self._local else {ALL_TASKS: self._signal_rate}
+        self._apply()
+
+    def rate(self, name: str) -> float:
+        return self.rules.get(name, self.rules.get(ALL_TASKS, 0.0))
+
+    async def run(self, name: str, call: Callable[[], Awaitable[None]]) -> None:
+        """Await ``call()``, under cProfile when this run of ``name`` is sampled."""
+
+        rate = self.rate(name)
+        if self._profiling or rate <= 0 or self._rng() >= rate:
+            await call()
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # Another profiler owns the interpreter.
+            await call()
+            return
+        self._profiling = True
+        try:
+            await call()
+        finally:
+            profile.disable()
+            self._profiling = False
+            self._add(name, profile)
+
+    def _add(self, name: str, profile: cProfile.Profile) -> None:
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = pstats.Stats(profile)
+        else:
+            stats.add(profile)
+        self._dirty.add(name)
+        metrics.increment("handler_profiles", labels={"task": name})
+
+    def dump(self) -> list[Path]:
+        """Write every aggregate that changed since the last dump; returns the files written."""
+
+        if not self._dirty:
+            return []
+        self._directory.mkdir(parents=True, exist_ok=True)
+        written = []
+        for name in sorted(self._dirty):
+            path = self._directory / f"{_UNSAFE.sub('_', name)}.{self._process}.pstats"
+            self._stats[name].dump_stats(path)
+            written.append(path)
+        self._dirty.clear()
+        return written
+
+    async def poll(self) -> None:
+        """Reload the rules from the Redis control hash."""
+
+        if self._redis is None:
+            return
+        rules: dict[str, float] = {}
+        for name, raw in (await self._redis.hgetall(self._key)).items():
+            try:
+                rules[name] = float(raw)
+            except ValueError:
+                log.warning("Ignoring profile rule %s=%r", name, raw)
+        self.set_rules(rules)
+
+    def start(self, redis: Any) -> None:
+        """Poll ``redis`` for rules and toggle on SIGUSR1 where signals are supported."""
+
+        self._redis = redis
+        with contextlib.suppress(NotImplementedError, AttributeError, RuntimeError):
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.toggle)
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+                self.dump()
+            except Exception as exc:  # noqa: BLE001 - profiling must never stop the worker
+                log.warning("Profiler poll failed: %s", exc)
+            await asyncio.sleep(self._interval)
+
+
+profiler = HandlerProfiler()
@@ -7,43 +7,146 @@ from collections.abc import Awaitable, Callable, Mapping
 from datetime import timedelta
 import json
 from typing import Any, cast
-from uuid import uuid4
 
 from redis import asyncio as aioredis
-from sqlalchemy import func, select
 
 from ..app.config import get_settings
 from ..app.deps import db_session
 from ..metrics import metrics
+from ..app.services.cluster_metrics import cluster_metrics
+from ..app.services.lifecycle import Lifecycle
+from ..app.services.monitor import monitor
 from ..app.services.queue import queue
+from ..app.services.redis_client import async_redis
 from ..app.services.tasks import (
     mark_task_retry,
     move_to_dead_letter,
     set_task_finished,
     set_task_started,
 )
-from ..app.models import Task, TaskDeadLetter
+from ..app.models import Task
+from ..app.services.stats import apply_stat_deltas, count_with_status
+from ..app.services.streams import assigned_streams, stream_shards
+from ..app.services.tracing import SPAN_KIND_CONSUMER, Span, parse_traceparent, tracer
 from .config import get_worker_settings
 from .logging import reset_trace_context, set_trace_context, setup_logging
-from .metrics import Timer
+from .metrics import Timer, start_metrics_server
+from .profiler import profiler
 
 WCFG = get_worker_settings()
 SETTINGS = get_settings()
 log = setup_logging(SETTINGS.log_level)
+# * One line per processed task: the usual target of LOG_SAMPLING / LOG_RATE_LIMITS.
+processed_log = log.getChild("processed")
 
 
-async def ensure_group(r: aioredis.Redis) -> None:
-    streams = await r.xinfo_groups(WCFG.stream)
-    if any(group.get("name") == WCFG.group for group in streams):
+# * Entries per XREADGROUP and stream.
+READ_COUNT = 10
+
+StreamEntries = list[tuple[str, list[tuple[str, dict[str, str]]]]]
+
+
+def consumed_streams() -> list[str]:
+    """Streams assigned to this worker according to ``WORKER_SHARDS``."""
+
+    return assigned_streams(WCFG.stream, WCFG.stream_shards, WCFG.shards)
+
+
+def connect_redis() -> aioredis.Redis:
+    """Client for ``REDIS_URL``; a cluster client when ``REDIS_CLUSTER=true``."""
+
+    return async_redis(WCFG.redis_url, cluster=WCFG.redis_cluster, decode_responses=True)
+
+
+class StreamReader:
+    """Read the consumer group with one XREADGROUP per stream.
+
+    Each shard has its own hash tag, so under Redis Cluster one XREADGROUP over several of
+    them fails with CROSSSLOT. :meth:`poll` reads the main streams concurrently without
+    blocking. :meth:`read` blocks only when they are all empty. It then keeps one blocking
+    read in flight per stream, the low-priority lane included, and returns as soon as any of
+    them delivers. Reads that deliver later are returned by a later call, never dropped.
+    """
+
+    def __init__(
+        self,
+        r: aioredis.Redis,
+        streams: list[str],
+        lane: str,
+        *,
+        group: str = WCFG.group,
+        consumer: str = WCFG.consumer,
+        block_ms: int = WCFG.block_ms,
+    ) -> None:
+        self._redis = r
+        self._streams = streams
+        self._all_streams = [*streams, lane]
+        self._group = group
+        self._consumer = consumer
+        self._block_ms = block_ms
+        self._blocking: dict[str, asyncio.Task[StreamEntries]] = {}
+
+    async def _read(self, stream: str, block: int | None = None) -> StreamEntries:
+        resp = await self._redis.xreadgroup(
+            groupname=self._group,
+            consumername=self._consumer,
+            streams={stream: ">"},
+            count=READ_COUNT,
+            block=block,
+        )
+        return cast(StreamEntries, resp or [])
+
+    def _finished(self) -> StreamEntries:
+        entries: StreamEntries = []
+        for stream, read in list(self._blocking.items()):
+            if read.done():
+                del self._blocking[stream]
+                entries.extend(read.result())
+        return entries
+
+    async def poll(self) -> StreamEntries:
+        """Entries from blocking reads that have delivered, plus one poll of the main streams."""
+
+        entries = self._finished()
+        for resp in await asyncio.gather(*(self._read(stream) for stream in self._streams)):
+            entries.extend(resp)
+        return entries
+
+    async def read(self) -> StreamEntries:
+        """Poll; when that finds nothing, block until any stream delivers or ``block_ms``."""
+
+        entries = await self.poll()
+        if entries:
+            return entries
+        for stream in self._all_streams:
+            if stream not in self._blocking:
+                self._blocking[stream] = asyncio.create_task(self._read(stream, self._block_ms))
+        await asyncio.wait(self._blocking.values(), return_when=asyncio.FIRST_COMPLETED)
+        return self._finished()
+
+
+async def _ensure_stream_group(r: aioredis.Redis, stream: str) -> None:
+    try:
+        groups = await r.xinfo_groups(stream)
+    except aioredis.ResponseError:
+        groups = []  # Stream does not exist yet; created below via MKSTREAM.
+    if any(group.get("name") == WCFG.group for group in groups):
         return
 
     try:
-        await r.xgroup_create(WCFG.stream, WCFG.group, id="$", mkstream=True)
+        await r.xgroup_create(stream, WCFG.group, id="$", mkstream=True)
     except Exception as exc:  # pragma: no cover - defensive
         if "BUSYGROUP" not in str(exc):
             raise
     else:
-        log.info("Created consumer group %s", WCFG.group)
+        log.info("Created consumer group %s on %s", WCFG.group, stream)
+
+
+async def ensure_group(r: aioredis.Redis) -> None:
+    """Create the consumer group on every shard so unassigned shards are never orphaned."""
+
+    for stream in [*stream_shards(WCFG.stream, WCFG.stream_shards), WCFG.low_priority_stream]:
+        await _ensure_stream_group(r, stream)
 
 
 TaskHandler = Callable[[dict[str, Any]], Awaitable[None]]
@@ -55,7 +158,7 @@ async def _handle_heartbeat(_: dict[str, Any]) -> None:
 
 async def _handle_echo(payload: dict[str, Any]) -> None:
     await asyncio.sleep(0.05)
-    log.info("ECHO: %s", payload)
+    log.debug("ECHO: %d payload keys", len(payload))
 
 
 async def _handle_sha256(payload: dict[str, Any]) -> None:
@@ -86,122 +189,204 @@ async def _dispatch_task(name: str, payload: dict[str, Any]) -> None:
     await handler(payload)
 
 
-async def handle_message(r: aioredis.Redis, msg_id: str, data: Mapping[str, Any]) -> None:
+def _timeline(lifecycle: Lifecycle) -> dict[str, Any] | None:
+    return lifecycle.timeline() if SETTINGS.task_timeline_enabled else None
+
+
+def _start_span(data: Mapping[str, Any], labels: Mapping[str, str]) -> Span:
+    # * Continue the trace of whoever created the task; its sampling decision carries over.
+    return tracer.start_span(
+        "handle_task",
+        parse_traceparent(data.get("traceparent")),
+        kind=SPAN_KIND_CONSUMER,
+        attributes={
+            "task.id": str(data.get("task_id", "")),
+            "task.name": labels["task"],
+            "task.attempt": str(data.get("attempt", "")),
+            "stream": labels["stream"],
+        },
+    )
+
+
+def _message_payload(data: Mapping[str, Any]) -> dict[str, Any]:
+    payload = json.loads(data.get("payload") or "{}")
+    if not isinstance(payload, dict):
+        return {}
+    return {str(key): value for key, value in payload.items()}
+
+
+async def _run_handler(name: str, payload: dict[str, Any]) -> float:
+    """Run the handler for ``name``, under the profiler when it is sampling; returns seconds."""
+
+    with Timer() as timer:
+        if profiler.active:
+            await profiler.run(name, lambda: _dispatch_task(name, payload))
+        else:
+            await _dispatch_task(name, payload)
+    return timer.elapsed
+
+
+def _claim(task_id: int, execution_key: str, labels: Mapping[str, str]) -> bool:
+    """Mark the task running; ``False`` if this execution already ran or is running."""
+
+    with db_session() as db:
+        if set_task_started(db, task_id, execution_key) is not None:
+            return True
+    metrics.increment("tasks_skipped", labels=labels)
+    log.info("Skipping duplicate task execution task_id=%s key=%s", task_id, execution_key)
+    return False
+
+
+def _record_failure(
+    task_id: int, execution_key: str, error: str, lifecycle: Lifecycle
+) -> tuple[bool, float, int]:
+    """Store the failure and re-arm the task if attempts remain.
+
+    Returns whether it will be retried, the backoff in seconds and the attempts so far.
+    """
+
+    with db_session() as db:
+        set_task_finished(db, task_id, execution_key, error=error, timeline=_timeline(lifecycle))
+        task_obj = db.get(Task, task_id)
+        delay_seconds = _retry_delay_seconds(task_obj.attempts if task_obj else 0)
+        should_retry, attempts = mark_task_retry(
+            db,
+            task_id,
+            execution_key,
+            delay=timedelta(seconds=delay_seconds),
+            error=error,
+            max_attempts=SETTINGS.max_task_attempts,
+        )
+    return should_retry, delay_seconds, attempts
+
+
+async def _schedule_retry(
+    task_id: int, delay_seconds: float, attempts: int, labels: Mapping[str, str]
+) -> None:
+    metrics.increment("tasks_retried", labels=labels)
+    await queue.publish_event(task_id, "retrying")
+    asyncio.create_task(queue.requeue_with_delay(task_id, delay_seconds))
+    log.info("Scheduled retry task_id=%s after %.2fs attempts=%s", task_id, delay_seconds, attempts)
+
+
+async def _dead_letter(
+    task_id: int, execution_key: str, name: str, payload: dict[str, Any], error: str
+) -> int:
+    """Move the task to the dead-letter table and announce it; returns the new DLQ size."""
+
+    with db_session() as db:
+        record = move_to_dead_letter(
+            db, task_id, execution_key, name=name, payload=payload, error=error
+        )
+        # Keep the record's loaded state readable after the session closes.
+        db.flush()
+        db.expunge(record)
+        apply_stat_deltas(db)
+        total = count_with_status(db, "dead_letter")
+    await queue.publish_dead_letter(record)
+    await queue.publish_event(task_id, "dead_letter")
+    return total
+
+
+def _finish_delivery(lifecycle: Lifecycle, span: Span, error: Exception | None) -> None:
+    """Record the stage durations, as child spans too when sampled, and end ``span``."""
+
+    lifecycle.record()
+    if span.context.sampled:
+        for stage, begin_ms, end_ms in lifecycle.intervals():
+            tracer.record(f"task.{stage}", span.context, begin_ms * 1_000_000, end_ms * 1_000_000)
+    tracer.end_span(span, error)
+
+
+async def handle_message(
+    r: aioredis.Redis, msg_id: str, data: Mapping[str, Any], stream: str | None = None
+) -> None:
     task_id: int | None = None
     execution_key = str(data.get("execution_key", ""))
     trace_token: tuple[Any, Any] | None = None
     typed_payload: dict[str, Any] = {}
+    labels = {"task": str(data.get("name", "")), "stream": stream or WCFG.stream}
+    lifecycle = Lifecycle.from_message(data)
+    span = _start_span(data, labels)
+    error: Exception | None = None
     try:
-        trace_id = uuid4().hex
-        span_id = uuid4().hex[:16]
-        trace_token = set_trace_context(trace_id, span_id)
+        trace_token = set_trace_context(span.context.trace_id, span.context.span_id)
 
         task_id = int(data.get("task_id", 0))
         name = data.get("name", "")
-        payload_raw = data.get("payload") or "{}"
-        payload = json.loads(payload_raw)
-        if not isinstance(payload, dict):
-            payload = {}
-        typed_payload = {str(key): value for key, value in payload.items()}
+        typed_payload = _message_payload(data)
 
-        with db_session() as db:
-            task = set_task_started(db, task_id, execution_key)
-            if task is None:
-                metrics.increment("tasks_skipped")
-                log.info(
-                    "Skipping duplicate task execution task_id=%s key=%s",
-                    task_id,
-                    execution_key,
-                )
-                return
+        if not _claim(task_id, execution_key, labels):
+            return
+        lifecycle.mark("started")
+        await queue.publish_event(task_id, "running")
 
-        with Timer() as timer:
-            await _dispatch_task(name, typed_payload)
+        elapsed = await _run_handler(name, typed_payload)
+        lifecycle.mark("handler_done")
 
         with db_session() as db:
-            set_task_finished(db, task_id, execution_key, error=None)
+            set_task_finished(db, task_id, execution_key, error=None, timeline=_timeline(lifecycle))
+        lifecycle.mark("finished")
+        await queue.publish_event(task_id, "done")
 
-        metrics.timer("task_duration", timer.elapsed)
-        metrics.increment("tasks_success")
-        log.info(
+        metrics.timer("task_duration", elapsed, labels=labels)
+        metrics.increment("tasks_success", labels=labels)
+        processed_log.info(
             "Processed %s task_id=%s name=%s in %.3fs",
             msg_id,
             task_id,
             name,
-            timer.elapsed,
+            elapsed,
         )
     except Exception as exc:  # noqa: BLE001 - intentional broad catch for task safety
-        metrics.increment("tasks_failure")
+        error = exc
+        metrics.increment("tasks_failure", labels=labels)
         failing_task = task_id if task_id is not None else 0
         log.error("Error processing %s: %s", msg_id, exc, exc_info=True)
         if failing_task and execution_key:
-            delay_seconds = 0.0
-            attempts = 0
-            with db_session() as db:
-                set_task_finished(db, failing_task, execution_key, error=str(exc))
-                task_obj = db.get(Task, failing_task)
-                current_attempts = task_obj.attempts if task_obj else 0
-                delay_seconds = _retry_delay_seconds(current_attempts)
-                should_retry, attempts = mark_task_retry(
-                    db,
-                    failing_task,
-                    execution_key,
-                    delay=timedelta(seconds=delay_seconds),
-                    error=str(exc),
-                    max_attempts=SETTINGS.max_task_attempts,
-                )
+            should_retry, delay_seconds, attempts = _record_failure(
+                failing_task, execution_key, str(exc), lifecycle
+            )
             if should_retry:
-                asyncio.create_task(queue.requeue_with_delay(failing_task, delay_seconds))
-                log.info(
-                    "Scheduled retry task_id=%s after %.2fs attempts=%s",
-                    failing_task,
-                    delay_seconds,
-                    attempts,
-                )
+                await _schedule_retry(failing_task, delay_seconds, attempts, labels)
             else:
-                with db_session() as db:
-                    record = move_to_dead_letter(
-                        db,
-                        failing_task,
-                        execution_key,
-                        name=data.get("name", ""),
-                        payload=typed_payload,
-                        error=str(exc),
-                    )
-                    total = db.scalar(select(func.count()).select_from(TaskDeadLetter)) or 0
-                await queue.publish_dead_letter(record)
+                total = await _dead_letter(
+                    failing_task, execution_key, data.get("name", ""), typed_payload, str(exc)
+                )
+                metrics.increment("tasks_dead_lettered", labels=labels)
                 metrics.set_gauge("dlq_size", float(total))
         else:
             with db_session() as db:
                 set_task_finished(db, failing_task, execution_key, error=str(exc))
+            if failing_task:
+                await queue.publish_event(failing_task, "failed")
     finally:
+        _finish_delivery(lifecycle, span, error)
         if trace_token:
             reset_trace_context(trace_token)
-        await r.xack(WCFG.stream, WCFG.group, msg_id)
+        await r.xack(stream or WCFG.stream, WCFG.group, msg_id)
 
 
 async def worker_loop() -> None:
-    redis_factory: Any = aioredis.from_url
-    redis_client = cast(
-        aioredis.Redis,
-        redis_factory(WCFG.redis_url, decode_responses=True),
-    )
+    redis_client = connect_redis()
     await ensure_group(redis_client)
+    if WCFG.metrics_port:
+        await start_metrics_server(WCFG.metrics_host, WCFG.metrics_port)
+        log.info("Serving Prometheus metrics on port %s", WCFG.metrics_port)
+    if SETTINGS.metrics_redis_enabled:
+        cluster_metrics.start("worker")
+    tracer.start("taskrunnerx-worker")
+    if SETTINGS.queue_monitor_enabled:
+        monitor.start("worker")
+    profiler.start(redis_client)
+    streams = consumed_streams()
+    reader = StreamReader(redis_client, streams, WCFG.low_priority_stream)
+    log.info("Consuming streams %s", ", ".join([*streams, WCFG.low_priority_stream]))
     while True:
         try:
-            resp = await redis_client.xreadgroup(
-                groupname=WCFG.group,
-                consumername=WCFG.consumer,
-                streams={WCFG.stream: ">"},
-                count=10,
-                block=WCFG.block_ms,
-            )
-            if not resp:
-                continue
-
-            for _, entries in resp:
+            for stream, entries in await reader.read():
                 for entry_id, fields in entries:
-                    await handle_message(redis_client, entry_id, fields)
+                    await handle_message(redis_client, entry_id, fields, stream=stream)
         except Exception as exc:  # pragma: no cover - defensive loop guard
             log.error("Loop error: %s", exc, exc_info=True)
             await asyncio.sleep(1)
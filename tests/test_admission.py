@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from fastapi import HTTPException
+import pytest
+
+from taskrunnerx.app.api import routes
+from taskrunnerx.app.models import TaskOutbox
+from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.services import admission as admission_module
+from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.admission import ADMIT, DIVERT, REJECT, AdmissionController
+
+
+class LagQueue:
+    def __init__(self, lag: int = 0) -> None:
+        self.lag = lag
+
+    async def consumer_lag(self, group: str) -> int:
+        return self.lag
+
+
+@pytest.fixture()
+def backlog(session_factory, monkeypatch) -> None:
+    @contextmanager
+    def session_scope() -> Any:
+        session = session_factory()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    monkeypatch.setattr(admission_module, "db_session", session_scope)
+    items = [TaskCreate(name="echo", payload={"n": n}) for n in range(6)]
+    items += [TaskCreate(name="sha256", payload={"n": n}) for n in range(2)]
+    # * Scheduled ahead: part of the task_stats backlog but not of the due depth.
+    later = datetime.now(tz=UTC) + timedelta(hours=2)
+    items += [TaskCreate(name="echo", payload={"n": n}, scheduled_at=later) for n in range(5)]
+    with session_factory() as session:
+        tasks_service.create_tasks(session, items)
+        session.commit()
+
+
+@pytest.mark.anyio("asyncio")
+async def test_admission_limits_per_name_and_overall(backlog) -> None:
+    controller = AdmissionController(
+        LagQueue(),  # type: ignore[arg-type]
+        action="divert",
+        max_depth=10,
+        max_depth_per_name=4,
+        max_lag=100,
+    )
+    assert controller.decide("echo") == ADMIT
+
+    await controller.refresh()
+
+    assert (controller.depth, controller.depth_by_name) == (8, {"echo": 6, "sha256": 2})
+    assert controller.scheduled_backlog == 13
+    assert controller.decide("echo") == DIVERT
+    assert controller.decide("sha256") == ADMIT
+
+    controller.lag = 250
+    assert controller.decide("sha256") == REJECT
+
+
+def test_submission_rejected_with_retry_after(monkeypatch) -> None:
+    controller = AdmissionController(LagQueue(), max_lag=10)  # type: ignore[arg-type]
+    controller.lag = 10
+    monkeypatch.setattr(routes, "admission", controller)
+    monkeypatch.setattr(routes.settings, "admission_enabled", True)
+
+    with pytest.raises(HTTPException) as excinfo:
+        routes._admit({"echo"})
+
+    assert excinfo.value.status_code == 429
+    assert excinfo.value.headers == {"Retry-After": str(routes.settings.admission_retry_after_s)}
+
+
+def test_diverted_tasks_are_routed_to_the_low_priority_lane(session_factory) -> None:
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={}), stream="trx.tasks.low"
+        )
+        session.commit()
+        outbox = session.query(TaskOutbox).filter_by(task_id=task.id).one()
+        assert outbox.stream == "trx.tasks.low"
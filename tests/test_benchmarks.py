@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import pytest
+
+from benchmarks.throughput import compare, run_benchmark
+
+
+@pytest.mark.anyio("asyncio")
+async def test_benchmark_runs_every_phase_end_to_end() -> None:
+    pytest.importorskip("fakeredis")
+    results = await run_benchmark(
+        tasks=20, concurrency=4, flush_limit=8, db_url=None, redis_url=None
+    )
+
+    phases = results["phases"]
+    assert phases["submit"]["tasks"] == 20
+    assert phases["flush_due"]["tasks"] == 20
+    assert phases["worker"]["tasks"] == 40
+    assert phases["submit"]["redis_round_trips_per_task"] == 1.0
+    assert phases["worker"]["db_statements_per_task"] > 0
+    assert {"submit", "queue_wait", "handler"} <= set(results["stages_ms"])
+    assert "worker.tasks_per_s" in compare(results, results)
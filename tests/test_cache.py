@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Any
+
+from taskrunnerx.app.services import cache as cache_module
+from taskrunnerx.app.services.cache import TaskReadCache
+
+
+def test_cache_serves_hits_and_reloads_after_invalidation() -> None:
+    cache = TaskReadCache(max_entries=10, ttl_ms=60000, redis_url=None)
+    loads: list[int] = []
+
+    def loader() -> bytes:
+        loads.append(1)
+        return f'{{"version": {len(loads)}}}'.encode()
+
+    assert cache.get_or_load(1, loader) == b'{"version": 1}'
+    assert cache.get_or_load(1, loader) == b'{"version": 1}'
+    cache.on_task_event({"task_id": 1, "status": "done"})
+    assert cache.get_or_load(1, loader) == b'{"version": 2}'
+    assert len(loads) == 2
+
+
+def test_cache_does_not_store_loads_that_raced_an_invalidation() -> None:
+    cache = TaskReadCache(max_entries=10, ttl_ms=60000, redis_url=None)
+
+    def stale_loader() -> bytes:
+        cache.invalidate(1)  # The worker commits while this read is in flight.
+        return b"stale"
+
+    assert cache.get_or_load(1, stale_loader) == b"stale"
+    assert cache.get_or_load(1, lambda: b"fresh") == b"fresh"
+
+
+def test_cache_evicts_least_recently_used_and_expired_entries() -> None:
+    cache = TaskReadCache(max_entries=2, ttl_ms=60000, redis_url=None)
+    for task_id in (1, 2):
+        cache.get_or_load(task_id, lambda: b"cached")
+    cache.get_or_load(1, lambda: b"reloaded")
+    cache.get_or_load(3, lambda: b"cached")
+
+    assert cache.get_or_load(1, lambda: b"reloaded") == b"cached"
+    assert cache.get_or_load(2, lambda: b"reloaded") == b"reloaded"
+
+    expired = TaskReadCache(max_entries=2, ttl_ms=1, redis_url=None)
+    expired._entries[5] = (0.0, b"old")
+    assert expired.get_or_load(5, lambda: b"new") == b"new"
+
+
+class VersionedRedis:
+    """Just enough of the cache scripts, plus the writers' version bump."""
+
+    def __init__(self) -> None:
+        self.versions: dict[str, bytes] = {}
+        self.bodies: dict[str, tuple[bytes, bytes]] = {}
+        self.ttls: dict[str, int] = {}
+
+    def bump(self, task_id: int) -> None:
+        key = cache_module.redis_version_key(task_id)
+        self.versions[key] = str(int(self.versions.get(key, b"0")) + 1).encode()
+
+    def eval(self, script: str, numkeys: int, version_key: str, body_key: str, *args: Any) -> Any:
+        version = self.versions.get(version_key, b"0")
+        if script == cache_module._READ:
+            cached = self.bodies.get(body_key)
+            return [version, cached[1]] if cached and cached[0] == version else [version]
+        if version != args[0]:
+            return 0
+        self.bodies[body_key] = (args[0], args[1])
+        if version_key in self.versions:
+            self.ttls[version_key] = args[3]
+        self.ttls[body_key] = args[2]
+        return 1
+
+
+def shared_cache(client: VersionedRedis) -> TaskReadCache:
+    cache = TaskReadCache(max_entries=10, ttl_ms=60000, redis_url="redis://cache")
+    cache._client = client  # type: ignore[assignment]
+    return cache
+
+
+def test_shared_tier_never_stores_a_load_that_raced_a_version_bump() -> None:
+    client = VersionedRedis()
+    reader, other = shared_cache(client), shared_cache(client)
+
+    def stale_loader() -> bytes:
+        client.bump(1)  # A worker commits; this process has not seen the event yet.
+        return b"stale"
+
+    assert reader.get_or_load(1, stale_loader) == b"stale"
+    assert client.bodies == {}
+    assert other.get_or_load(1, lambda: b"fresh") == b"fresh"
+    assert shared_cache(client).get_or_load(1, lambda: b"reloaded") == b"fresh"
+
+    client.bump(1)
+    assert shared_cache(client).get_or_load(1, lambda: b"newer") == b"newer"
+
+
+def test_shared_fill_keeps_the_version_key_alive_past_the_body() -> None:
+    client = VersionedRedis()
+    client.bump(1)
+
+    assert shared_cache(client).get_or_load(1, lambda: b"body") == b"body"
+    version_key, body_key = cache_module.redis_version_key(1), cache_module.redis_cache_key(1)
+    assert client.ttls[version_key] > client.ttls[body_key]
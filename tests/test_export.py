@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime
+import gzip
+import json
+
+import pytest
+from sqlalchemy.orm import Session
+
+from taskrunnerx.app.schemas import TaskCreate, TaskFilter
+from taskrunnerx.app.services import export as export_service
+from taskrunnerx.app.services import tasks as tasks_service
+
+
+@pytest.fixture()
+def export_db(session_factory, monkeypatch) -> None:
+    @contextmanager
+    def scoped_session() -> Iterator[Session]:
+        with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(export_service, "db_session", scoped_session)
+    items = [
+        TaskCreate(name="echo", payload={"n": n}, scheduled_at=datetime.now(tz=UTC))
+        for n in range(5)
+    ]
+    with session_factory() as session:
+        tasks_service.create_tasks(session, items)
+        session.commit()
+
+
+@pytest.mark.usefixtures("export_db")
+def test_export_streams_selected_columns_as_ndjson() -> None:
+    columns = tasks_service.select_columns(tasks_service.TASK_COLUMNS, "id,status,payload")
+    stmt = export_service.task_export_query(columns, TaskFilter(name="echo"))
+
+    body = b"".join(export_service.iter_ndjson(stmt, columns, chunk_rows=2))
+    rows = [json.loads(line) for line in body.splitlines()]
+
+    assert [row["payload"]["n"] for row in rows] == [0, 1, 2, 3, 4]
+    assert all(set(row) == {"id", "status", "payload"} for row in rows)
+
+
+@pytest.mark.usefixtures("export_db")
+def test_export_gzip_round_trips() -> None:
+    columns = tasks_service.select_columns(tasks_service.TASK_COLUMNS, None)
+    stmt = export_service.task_export_query(columns)
+
+    body = gzip.decompress(b"".join(export_service.iter_ndjson(stmt, columns, gzip=True)))
+
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert len(rows) == 5
+    assert rows[0]["created_at"]
+
+
+def test_export_rejects_unknown_columns() -> None:
+    with pytest.raises(ValueError, match="secret"):
+        tasks_service.select_columns(tasks_service.TASK_COLUMNS, "id,secret")
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 import asyncio
 from contextlib import contextmanager
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
+import json
 from typing import Any
 
 import pytest
@@ -10,19 +11,43 @@ import pytest
 from taskrunnerx.app.models import Task, TaskDeadLetter
 from taskrunnerx.app.schemas import TaskCreate
 from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.events import TaskEventHub
+from taskrunnerx.app.services.stats import read_task_stats
+from taskrunnerx.metrics import metrics
 from taskrunnerx.worker import worker as worker_module
 
 
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.calls: list[tuple[str, dict[str, Any]]] = []
+
+    def xadd(self, stream: str, fields: dict[str, Any], **_: Any) -> None:
+        self.calls.append((stream, fields))
+
+    async def execute(self) -> list[str]:
+        self.redis.round_trips += 1
+        return [await self.redis.xadd(stream, fields) for stream, fields in self.calls]
+
+
 class FakeRedis:
     def __init__(self) -> None:
+        self.round_trips = 0
         self.entries: list[tuple[str, dict[str, Any]]] = []
         self.acks: list[tuple[str, str, str]] = []
+        self.published: list[tuple[str, str]] = []
 
     async def xadd(self, stream: str, fields: dict[str, Any], **_: Any) -> str:
         entry_id = f"{len(self.entries)}-0"
         self.entries.append((entry_id, fields))
         return entry_id
 
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, message))
+
     async def xack(self, stream: str, group: str, msg_id: str) -> None:
         self.acks.append((stream, group, msg_id))
 
@@ -47,6 +72,7 @@ async def test_retry_flow_is_idempotent(session_factory, queue) -> None:
     original_queue = worker_module.queue
     worker_module.queue = queue
     worker_module.SETTINGS.retry_backoff_ms = 0
+    worker_module.SETTINGS.task_timeline_enabled = True
     original_db_session = worker_module.db_session
 
     @contextmanager
@@ -106,6 +132,19 @@ async def test_retry_flow_is_idempotent(session_factory, queue) -> None:
             assert db_task.inbox is not None
             assert db_task.inbox.processed_at is not None
             assert session.query(TaskDeadLetter).count() == 0
+            assert read_task_stats(session) == {"flaky": {"done": 1}}
+            assert db_task.timeline is not None
+            assert set(db_task.timeline["stages_ms"]) == {
+                "dispatch",
+                "queue_wait",
+                "start",
+                "handler",
+            }
+        stage_series = [key for key in metrics.timers if key.startswith("task_stage{")]
+        assert 'task_stage{stage="finish",task="flaky"}' in stage_series
+        assert metrics.timers['task_stage{stage="queue_wait",task="flaky"}'].count == 2
+        statuses = [json.loads(message)["status"] for _, message in fake_redis.published]
+        assert statuses == ["running", "retrying", "running", "done"]
     finally:
         if original_handler is not None:
             worker_module.HANDLERS["flaky"] = original_handler
@@ -113,3 +152,153 @@ async def test_retry_flow_is_idempotent(session_factory, queue) -> None:
             worker_module.HANDLERS.pop("flaky", None)
         worker_module.queue = original_queue
         worker_module.db_session = original_db_session
+        worker_module.SETTINGS.task_timeline_enabled = False
+
+
+@pytest.mark.anyio("asyncio")
+async def test_dead_letter_updates_stats_and_publishes_record(
+    session_factory, queue, monkeypatch
+) -> None:
+    fake_redis = FakeRedis()
+    queue._redis = fake_redis
+
+    @contextmanager
+    def worker_session() -> Any:
+        session = session_factory()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    async def broken_task(_: dict[str, Any]) -> None:
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(worker_module, "queue", queue)
+    monkeypatch.setattr(worker_module, "db_session", worker_session)
+    monkeypatch.setitem(worker_module.HANDLERS, "broken", broken_task)
+    worker_module.SETTINGS.max_task_attempts = 1
+
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(session, TaskCreate(name="broken", payload={"n": 1}))
+        session.commit()
+        task_id = task.id
+    await queue.dispatch_task(task_id)
+    entry_id, fields = fake_redis.entries[0]
+
+    await worker_module.handle_message(fake_redis, entry_id, fields)
+
+    dead_letter = fake_redis.entries[-1][1]
+    assert dead_letter["task_id"] == str(task_id)
+    assert dead_letter["error"] == "boom"
+    assert metrics.gauges["dlq_size"] == 1.0
+    with session_factory() as session:
+        assert read_task_stats(session) == {"broken": {"dead_letter": 1}}
+
+
+@pytest.mark.anyio("asyncio")
+async def test_dispatch_publishes_to_recorded_shard(session_factory, queue) -> None:
+    published: list[str] = []
+
+    async def fake_publish(stream: str, payload: dict[str, str], maxlen: int = 10000) -> str:
+        published.append(stream)
+        return f"{len(published)}-0"
+
+    queue._publish = fake_publish  # type: ignore[assignment]
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={"n": 1}, scheduled_at=datetime.now(tz=UTC))
+        )
+        session.commit()
+        task.outbox.stream = "trx.tasks:{3}"
+        session.commit()
+        task_id = task.id
+
+    stream_id = await queue.dispatch_task(task_id)
+
+    assert stream_id == "1-0"
+    assert published == ["trx.tasks:{3}"]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_dispatch_tasks_pipelines_due_tasks(session_factory, queue) -> None:
+    fake_redis = FakeRedis()
+    queue._redis = fake_redis
+    now = datetime.now(tz=UTC)
+    items = [TaskCreate(name="echo", payload={"n": n}, scheduled_at=now) for n in range(3)]
+    items.append(TaskCreate(name="echo", payload={"n": 9}, scheduled_at=now + timedelta(hours=1)))
+    with session_factory() as session:
+        task_ids = [task.id for task, _ in tasks_service.create_tasks(session, items)]
+        session.commit()
+
+    first = await queue.dispatch_tasks(task_ids)
+    second = await queue.dispatch_tasks(task_ids)
+
+    assert fake_redis.round_trips == 1
+    assert len(fake_redis.entries) == 3
+    assert first[task_ids[-1]] == ""
+    assert second == first
+
+
+@pytest.mark.anyio("asyncio")
+async def test_event_hub_fans_out_to_task_waiters() -> None:
+    hub = TaskEventHub()
+    hub.start = lambda: None  # type: ignore[method-assign]
+    seen: list[dict[str, Any]] = []
+    hub.add_listener(seen.append)
+
+    with hub.subscribe(7) as first, hub.subscribe(7) as second, hub.subscribe(8) as other:
+        hub.dispatch({"task_id": 7, "status": "done"})
+        assert first.get_nowait() == second.get_nowait() == {"task_id": 7, "status": "done"}
+        assert other.empty()
+    hub.dispatch({"task_id": 7, "status": "running"})
+
+    assert len(seen) == 2
+    assert hub._subscribers == {}
+
+
+class StreamsRedis:
+    """XREADGROUP over in-memory streams that, like Redis Cluster, refuses several keys."""
+
+    def __init__(self) -> None:
+        self.streams: dict[str, list[tuple[str, dict[str, str]]]] = {}
+        self.arrived = asyncio.Event()
+
+    def add(self, stream: str, entry_id: str) -> None:
+        self.streams.setdefault(stream, []).append((entry_id, {"task_id": entry_id}))
+        self.arrived.set()
+
+    async def xreadgroup(
+        self, groupname: str, consumername: str, streams: dict[str, str], count: int, block: Any
+    ) -> list[Any]:
+        if len(streams) != 1:
+            msg = "CROSSSLOT Keys in request don't hash to the same slot"
+            raise RuntimeError(msg)
+        [stream] = streams
+        while not self.streams.get(stream) and block is not None:
+            self.arrived.clear()
+            await self.arrived.wait()
+        entries, self.streams[stream] = self.streams.get(stream, [])[:count], []
+        return [[stream, entries]] if entries else []
+
+
+@pytest.mark.anyio("asyncio")
+async def test_stream_reader_reads_one_stream_per_call_and_lane_last() -> None:
+    redis = StreamsRedis()
+    reader = worker_module.StreamReader(
+        redis, ["trx.tasks:{0}", "trx.tasks:{1}"], "trx.tasks.low", block_ms=1000
+    )
+    redis.add("trx.tasks:{0}", "1-0")
+    redis.add("trx.tasks:{1}", "2-0")
+    redis.add("trx.tasks.low", "3-0")
+
+    assert await reader.read() == [
+        ["trx.tasks:{0}", [("1-0", {"task_id": "1-0"})]],
+        ["trx.tasks:{1}", [("2-0", {"task_id": "2-0"})]],
+    ]
+    assert await reader.read() == [["trx.tasks.low", [("3-0", {"task_id": "3-0"})]]]
+
+    waiting = asyncio.create_task(reader.read())
+    await asyncio.sleep(0)
+    redis.add("trx.tasks:{1}", "4-0")
+    assert await asyncio.wait_for(waiting, 1) == [["trx.tasks:{1}", [("4-0", {"task_id": "4-0"})]]]
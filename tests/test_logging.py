@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import io
+import json
+import logging
+import threading
+
+from taskrunnerx.logging import (
+    JsonFormatter,
+    SamplingFilter,
+    parse_logger_rates,
+    queue_logging,
+    reset_trace_context,
+    set_trace_context,
+)
+
+
+def _record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 1, "line %s", (1,), None)
+
+
+def test_sampling_and_rate_limits_thin_info_lines_per_logger() -> None:
+    now = [0.0]
+    draws = iter([0.05, 0.5] * 10)
+    sampling = SamplingFilter(
+        parse_logger_rates("worker.processed=0.1"),
+        parse_logger_rates("worker=2"),
+        rng=lambda: next(draws),
+        clock=lambda: now[0],
+    )
+    kept = [sampling.filter(_record("worker.processed")) for _ in range(4)]
+    assert kept == [True, False, True, False]
+
+    # * "worker" covers its children: a burst of two per second, then refills over time.
+    assert [sampling.filter(_record("worker.loop")) for _ in range(3)] == [False, False, False]
+    now[0] = 0.5
+    assert sampling.filter(_record("worker.loop"))
+    assert not sampling.filter(_record("worker.loop"))
+    assert sampling.filter(_record("worker.loop", logging.ERROR))
+    assert sampling.filter(_record("api"))
+    assert sampling.dropped == 6
+
+
+def test_queue_logging_writes_json_with_trace_fields_off_thread() -> None:
+    stream = io.StringIO()
+    threads: list[str] = []
+
+    class Recording(logging.StreamHandler):
+        def emit(self, record: logging.LogRecord) -> None:
+            threads.append(threading.current_thread().name)
+            super().emit(record)
+
+    handler = Recording(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("test.queue_logging")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    listener = queue_logging(logger, handler)
+    try:
+        payload = {"n": 1}
+        tokens = set_trace_context("a" * 32, "b" * 16)
+        logger.info("payload %s", payload)
+        reset_trace_context(tokens)
+        payload["n"] = 2
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "payload {'n': 1}"
+    assert (entry["trace_id"], entry["span_id"], entry["level"]) == ("a" * 32, "b" * 16, "INFO")
+    assert threads
+    assert threading.main_thread().name not in threads
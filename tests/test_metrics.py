@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import random
+import time
+from typing import Any
+
+import pytest
+
+from taskrunnerx.app.services.cluster_metrics import ClusterMetrics
+from taskrunnerx.metrics import Histogram, Metrics
+
+
+class HashRedis:
+    """Hashes and a non-transactional pipeline, as used by the metrics flush."""
+
+    def __init__(self) -> None:
+        self.hashes: dict[str, dict[str, str]] = {}
+        self.sorted: dict[str, dict[str, float]] = {}
+
+    def pipeline(self, transaction: bool = True) -> HashPipeline:
+        return HashPipeline(self)
+
+
+class HashPipeline:
+    def __init__(self, redis: HashRedis) -> None:
+        self._redis = redis
+        self._calls: list[tuple[str, tuple[Any, ...]]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return lambda *args, **kwargs: self._calls.append((name, (*args, kwargs)))
+
+    async def execute(self) -> list[Any]:
+        results: list[Any] = []
+        hashes = self._redis.hashes
+        for name, (key, *args) in self._calls:
+            kwargs = args.pop()
+            if name.startswith("z"):
+                scores = self._redis.sorted.setdefault(key, {})
+                if name == "zadd":
+                    scores.update(args[0])
+                elif name == "zremrangebyscore":
+                    for member, score in list(scores.items()):
+                        if score <= args[1]:
+                            del scores[member]
+                results.append(sorted(scores, key=scores.__getitem__))
+                continue
+            target = hashes.setdefault(key, {})
+            if name in ("hincrby", "hincrbyfloat"):
+                field, amount = args
+                target[field] = str(float(target.get(field, 0)) + amount)
+                if name == "hincrby":
+                    target[field] = str(int(float(target[field])))
+            elif name == "hset":
+                target.update(kwargs["mapping"])
+            elif name == "delete":
+                hashes.pop(key, None)
+            results.append(dict(hashes.get(key, {})))
+        return results
+
+
+def test_histogram_percentiles_stay_within_bucket_precision() -> None:
+    rng = random.Random(3)
+    values = [rng.lognormvariate(-4, 1.5) for _ in range(20_000)]
+    histogram = Histogram(clock=lambda: 0.0)
+    for value in values:
+        histogram.record(value)
+
+    stats = histogram.snapshot()
+    ordered = sorted(values)
+    for label, quantile in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        exact = ordered[int(quantile * len(ordered)) - 1]
+        assert abs(stats[label] - exact) / exact < 0.05, label
+    assert stats["max"] == ordered[-1]
+    assert stats["count"] == len(values)
+
+
+def test_histogram_window_forgets_old_values_but_keeps_lifetime_totals() -> None:
+    now = [0.0]
+    histogram = Histogram(window_s=60.0, slices=6, clock=lambda: now[0])
+    for _ in range(100):
+        histogram.record(2.0)
+    now[0] = 30.0
+    histogram.record(0.01)
+    assert histogram.snapshot()["max"] == 2.0
+
+    now[0] = 65.0
+    stats = histogram.snapshot()
+    assert stats["window_count"] == 1
+    assert stats["max"] == 0.01
+    assert abs(stats["p99"] - 0.01) < 0.0005
+    assert stats["count"] == 101
+
+
+def test_labelled_series_render_as_prometheus_text_and_are_capped() -> None:
+    collector = Metrics(max_series=2)
+    for task in ("echo", "sha256", "echo"):
+        labels = {"task": task, "stream": "trx.tasks"}
+        collector.increment("tasks_success", labels=labels)
+        collector.timer("task_duration", 0.02, labels=labels)
+    collector.increment("tasks_success", labels={"task": 'we"ird', "stream": "trx.tasks"})
+    collector.set_gauge("dlq_size", 3.0)
+
+    assert collector.total("tasks_success") == 4
+    assert collector.get_stats()["derived"]["success_rate"] == 1.0
+    text = collector.render_prometheus({'tasks{status="queued",task="echo"}': 5.0})
+    lines = text.splitlines()
+    assert "# TYPE taskrunnerx_tasks_success_total counter" in lines
+    assert 'taskrunnerx_tasks_success_total{stream="trx.tasks",task="echo"} 2' in lines
+    # * A third label set exceeds max_series and folds into "other".
+    assert 'taskrunnerx_tasks_success_total{stream="other",task="other"} 1' in lines
+    assert "taskrunnerx_metrics_series_overflow_total 1" in lines
+    assert "taskrunnerx_dlq_size 3.0" in lines
+    assert 'taskrunnerx_tasks{status="queued",task="echo"} 5.0' in lines
+    assert "# TYPE taskrunnerx_task_duration histogram" in lines
+    assert 'taskrunnerx_task_duration_bucket{stream="trx.tasks",task="echo",le="0.01"} 0' in lines
+    assert 'taskrunnerx_task_duration_bucket{stream="trx.tasks",task="echo",le="0.025"} 2' in lines
+    assert 'taskrunnerx_task_duration_bucket{stream="trx.tasks",task="echo",le="+Inf"} 2' in lines
+    assert 'taskrunnerx_task_duration_count{stream="trx.tasks",task="sha256"} 1' in lines
+
+
+@pytest.mark.anyio("asyncio")
+async def test_cluster_view_merges_deltas_from_every_process() -> None:
+    redis = HashRedis()
+    worker, api = Metrics(), Metrics()
+    worker_sink = ClusterMetrics(worker, redis=redis)
+    api_sink = ClusterMetrics(api, redis=redis)
+    labels = {"task": "echo", "stream": "trx.tasks"}
+
+    worker.increment("tasks_success", labels=labels)
+    worker.timer("task_duration", 0.2, labels=labels)
+    await worker_sink.flush()
+    # * Only what changed since the last flush is sent again.
+    worker.increment("tasks_success", 2, labels=labels)
+    worker.timer("task_duration", 0.4, labels=labels)
+    await worker_sink.flush()
+    await worker_sink.flush()
+    api.increment("tasks_success", labels=labels)
+    api.set_gauge("admission_depth", 7.0)
+    await api_sink.flush()
+    # * A process that stopped flushing long ago is trimmed from the registry, not read.
+    prefix = api_sink._prefix
+    redis.sorted[f"{prefix}:processes"]["worker:gone:1"] = time.time() - 3600
+    redis.hashes[f"{prefix}:gauges:worker:gone:1"] = {"admission_depth": "99.0"}
+
+    merged = await api_sink.read()
+    key = 'tasks_success{stream="trx.tasks",task="echo"}'
+    assert merged.counters[key] == 4
+    assert merged.gauges["admission_depth"] == 7.0
+    assert list(redis.sorted[f"{prefix}:processes"]) == [api_sink._process]
+    stats = merged.get_stats()["timers"]['task_duration{stream="trx.tasks",task="echo"}']
+    assert stats["count"] == 2
+    assert stats["total"] == pytest.approx(0.6)
+    assert stats["window_count"] == 2
+    assert stats["p50"] == pytest.approx(0.2, rel=0.05)
+    assert stats["max"] == pytest.approx(0.4, rel=0.05)
+    assert 'le="0.25"} 1' in merged.render_prometheus()
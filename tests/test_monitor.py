@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+from redis.exceptions import ResponseError
+
+from taskrunnerx.app.services.monitor import MonitorThresholds, QueueMonitor
+from taskrunnerx.metrics import metrics
+
+
+class StreamRedis:
+    """Canned XLEN / XINFO GROUPS / XPENDING replies; unknown streams behave like Redis."""
+
+    def __init__(self, streams: dict[str, dict[str, Any]]) -> None:
+        self.streams = streams
+
+    def pipeline(self, transaction: bool = True) -> StreamPipeline:
+        return StreamPipeline(self)
+
+
+class StreamPipeline:
+    def __init__(self, redis: StreamRedis) -> None:
+        self._redis = redis
+        self._calls: list[tuple[str, str]] = []
+
+    def xlen(self, stream: str) -> None:
+        self._calls.append(("length", stream))
+
+    def xinfo_groups(self, stream: str) -> None:
+        self._calls.append(("groups", stream))
+
+    def xpending(self, stream: str, group: str) -> None:
+        self._calls.append(("pending", stream))
+
+    async def execute(self, raise_on_error: bool = True) -> list[Any]:
+        results: list[Any] = []
+        for kind, stream in self._calls:
+            info = self._redis.streams.get(stream)
+            if info is None:
+                results.append(0 if kind == "length" else ResponseError("no such key"))
+            else:
+                results.append(info[kind])
+        return results
+
+
+def _stream(length: int, lag: int | None, consumers: dict[str, int]) -> dict[str, Any]:
+    return {
+        "length": length,
+        "groups": [{"name": "other", "lag": 0}, {"name": "trx.workers", "lag": lag}],
+        "pending": {
+            "pending": sum(consumers.values()),
+            "consumers": [{"name": name, "pending": count} for name, count in consumers.items()],
+        },
+    }
+
+
+@pytest.mark.anyio("asyncio")
+async def test_monitor_reports_backlog_gauges_and_warns_once(queue, reset_metrics) -> None:
+    redis = StreamRedis({"trx.tasks": _stream(120, 40, {"worker-1": 3, "worker-2": 9})})
+    queue._redis = redis
+    monitor = QueueMonitor(
+        queue, group="trx.workers", thresholds=MonitorThresholds(lag=30, pending=10)
+    )
+    monitor.role = "worker"
+
+    monitor.observe_loop_lag(0.05)
+    monitor.observe_loop_lag(0.4)
+    backlog = await monitor.sample()
+    assert backlog["trx.tasks.low"].length == 0
+    assert backlog["trx.tasks.low"].lag is None
+
+    gauges = metrics.gauges
+    assert gauges['stream_length{stream="trx.tasks"}'] == 120
+    assert gauges['stream_lag{stream="trx.tasks"}'] == 40
+    assert gauges['stream_pending{stream="trx.tasks"}'] == 12
+    assert gauges['stream_consumer_pending{consumer="worker-2",stream="trx.tasks"}'] == 9
+    assert gauges['event_loop_lag_seconds{role="worker"}'] == 0.4
+    assert metrics.timers['event_loop_lag{role="worker"}'].count == 2
+    assert metrics.counters['monitor_warnings{check="lag"}'] == 1
+    assert metrics.counters['monitor_warnings{check="pending"}'] == 1
+    assert metrics.counters['monitor_warnings{check="event_loop_lag_ms"}'] == 1
+
+    # * Still over: no repeat warning. A consumer that drained drops to zero, not stale.
+    redis.streams["trx.tasks"] = _stream(130, 45, {"worker-1": 11})
+    await monitor.sample()
+    assert metrics.counters['monitor_warnings{check="lag"}'] == 1
+    assert gauges['stream_consumer_pending{consumer="worker-2",stream="trx.tasks"}'] == 0
+    assert gauges['event_loop_lag_seconds{role="worker"}'] == 0.0
+
+    redis.streams["trx.tasks"] = _stream(0, 0, {})
+    await monitor.sample()
+    redis.streams["trx.tasks"] = _stream(50, 35, {})
+    await monitor.sample()
+    assert metrics.counters['monitor_warnings{check="lag"}'] == 2
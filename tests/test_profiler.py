@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import pstats
+
+import pytest
+
+from taskrunnerx.worker.profiler import HandlerProfiler
+
+
+class ControlRedis:
+    def __init__(self, rules: dict[str, str]) -> None:
+        self.rules = rules
+
+    async def hgetall(self, key: str) -> dict[str, str]:
+        return dict(self.rules)
+
+
+async def slow_handler() -> None:
+    await asyncio.sleep(0)
+    sum(range(1000))
+
+
+@pytest.mark.anyio("asyncio")
+async def test_profiles_sampled_runs_per_handler(tmp_path, reset_metrics) -> None:
+    draws = iter([0.05, 0.5, 0.05])
+    profiler = HandlerProfiler(directory=str(tmp_path), rng=lambda: next(draws))
+    assert not profiler.active
+
+    profiler._redis = ControlRedis({"sha256": "0.1", "echo": "0", "bad": "x"})
+    await profiler.poll()
+    assert profiler.active
+    assert profiler.rules == {"sha256": 0.1}
+    assert profiler.rate("echo") == 0.0
+
+    for _ in range(3):
+        await profiler.run("sha256", slow_handler)
+    await profiler.run("echo", slow_handler)
+
+    (path,) = profiler.dump()
+    assert path.name.startswith("sha256.")
+    stats = pstats.Stats(str(path))
+    calls = {func[2]: stat[0] for func, stat in stats.stats.items()}
+    assert "slow_handler" in calls
+    assert calls["<built-in method builtins.sum>"] == 2
+    assert profiler.dump() == []
+
+    # * SIGUSR1 profiles every task on top of the Redis rules until toggled again.
+    profiler._redis.rules = {}
+    await profiler.poll()
+    assert not profiler.active
+    profiler.toggle()
+    assert profiler.rate("echo") == 1.0
+    profiler.toggle()
+    assert not profiler.active
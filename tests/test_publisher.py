@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import pytest
+
+from taskrunnerx.app.services.publisher import OutboxPublisher
+
+
+class RecordingQueue:
+    def __init__(self, fail: bool = False) -> None:
+        self.batches: list[list[int]] = []
+        self.fail = fail
+
+    async def dispatch_tasks(self, task_ids: Sequence[int]) -> dict[int, str]:
+        self.batches.append(list(task_ids))
+        if self.fail:
+            msg = "redis down"
+            raise ConnectionError(msg)
+        return {task_id: f"{task_id}-0" for task_id in task_ids}
+
+
+@pytest.mark.anyio("asyncio")
+async def test_publisher_coalesces_submissions_into_batches() -> None:
+    recorder = RecordingQueue()
+    publisher = OutboxPublisher(recorder, batch_size=4, linger_ms=20)  # type: ignore[arg-type]
+    publisher.start()
+    publisher.submit(range(1, 7))
+    await publisher.stop()
+
+    assert [task_id for batch in recorder.batches for task_id in batch] == [1, 2, 3, 4, 5, 6]
+    assert [len(batch) for batch in recorder.batches] == [4, 2]
+    assert not publisher.running
+
+
+@pytest.mark.anyio("asyncio")
+async def test_publisher_survives_dispatch_failures() -> None:
+    recorder = RecordingQueue(fail=True)
+    publisher = OutboxPublisher(recorder, batch_size=10, linger_ms=0)  # type: ignore[arg-type]
+    publisher.start()
+    publisher.submit([1])
+    await publisher.stop()
+
+    assert recorder.batches == [[1]]
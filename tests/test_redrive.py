@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import pytest
+
+from taskrunnerx.app.models import Task, TaskOutbox
+from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.services import redrive as redrive_module
+from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.redrive import DeadLetterRedriver
+from taskrunnerx.app.services.stats import read_task_stats
+
+
+class RecordingQueue:
+    def __init__(self) -> None:
+        self.batches: list[list[int]] = []
+        self.events: list[tuple[list[int], str]] = []
+
+    async def dispatch_tasks(self, task_ids: Sequence[int]) -> dict[int, str]:
+        self.batches.append(list(task_ids))
+        return {task_id: f"{task_id}-0" for task_id in task_ids}
+
+    async def publish_events(self, task_ids: Sequence[int], status: str) -> None:
+        self.events.append((list(task_ids), status))
+
+
+def _dead_letter(session_factory, payloads: list[dict[str, Any]], error: str) -> list[int]:
+    with session_factory() as session:
+        created = tasks_service.create_tasks(
+            session, [TaskCreate(name="echo", payload=payload) for payload in payloads]
+        )
+        for task, _ in created:
+            tasks_service.move_to_dead_letter(
+                session, task.id, task.execution_key, "echo", task.payload or {}, error
+            )
+        session.commit()
+        return [task.id for task, _ in created]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_redrive_resets_matching_dead_letters_in_chunks(session_factory, monkeypatch) -> None:
+    @contextmanager
+    def session_scope() -> Any:
+        session = session_factory()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    monkeypatch.setattr(redrive_module, "db_session", session_scope)
+    timed_out = _dead_letter(session_factory, [{"n": n} for n in range(3)], "upstream timeout")
+    _dead_letter(session_factory, [{"n": 99}], "bad input")
+    with session_factory() as session:
+        old_keys = {task.id: task.execution_key for task in session.query(Task)}
+
+    recorder = RecordingQueue()
+    redriver = DeadLetterRedriver(recorder, chunk_size=2)  # type: ignore[arg-type]
+    job = redriver.start({"error": "timeout"}, rate_per_s=1000)
+    await redriver.wait(job.id)
+
+    assert job.status == "done"
+    assert (job.reset, job.dispatched) == (3, 3)
+    assert [task_id for batch in recorder.batches for task_id in batch] == timed_out
+    assert [status for _, status in recorder.events] == ["queued", "queued"]
+    with session_factory() as session:
+        for task_id in timed_out:
+            task = session.get(Task, task_id)
+            assert task is not None
+            assert (task.status, task.attempts) == ("queued", 0)
+            assert task.execution_key != old_keys[task_id]
+            outbox = session.query(TaskOutbox).filter_by(task_id=task_id).one()
+            assert outbox.execution_key == task.execution_key
+            assert outbox.sent_at is None
+        assert read_task_stats(session) == {"echo": {"queued": 3, "dead_letter": 1}}
+
+    again = redriver.start({"error": "timeout"}, rate_per_s=1000)
+    await redriver.wait(again.id)
+    assert again.reset == 0
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+import random
+
+import pytest
+
+from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.queue import Queue as QueueService
+from taskrunnerx.app.services.timing_wheel import TimingWheel
+from taskrunnerx.scheduler.relay import DelayedRelay
+
+
+class RecordingQueue(QueueService):
+    def __init__(self, session_factory) -> None:
+        super().__init__(session_factory=session_factory)
+        self.dispatched: list[int] = []
+
+    async def dispatch_tasks(self, task_ids: Sequence[int]) -> dict[int, str]:
+        self.dispatched.extend(task_ids)
+        return {task_id: f"{task_id}-0" for task_id in task_ids}
+
+
+def test_timing_wheel_fires_each_key_on_its_tick() -> None:
+    rng = random.Random(7)
+    wheel: TimingWheel[int] = TimingWheel(1.0, slots=8, levels=2)
+    due_at = {key: rng.randrange(0, 200) for key in range(300)}
+    for key, due in due_at.items():
+        wheel.add(key, float(due))
+
+    fired: dict[int, int] = {}
+    moments: list[int] = []
+    now = 0
+    while now < 210:
+        now += rng.choice((1, 1, 1, 3, 20))
+        moments.append(now)
+        for key in wheel.advance(float(now)):
+            fired[key] = now
+    assert len(wheel) == 0
+    # * Every key fires on the first advance at or after its due time, never earlier or later.
+    for key, due in due_at.items():
+        assert fired[key] == next(moment for moment in moments if moment >= due), key
+
+
+def _scheduled(session_factory, *delays: timedelta) -> list[int]:
+    now = datetime.now(tz=UTC)
+    with session_factory() as session:
+        created = tasks_service.create_tasks(
+            session,
+            [
+                # * Distinct payloads: equal ones in one dedupe window would resolve to one task.
+                TaskCreate(
+                    name="echo", payload={"delay": delay.total_seconds()}, scheduled_at=now + delay
+                )
+                for delay in delays
+            ],
+        )
+        session.commit()
+        return [task.id for task, _ in created]
+
+
+@pytest.mark.anyio("asyncio")
+async def test_relay_loads_the_horizon_and_dispatches_when_due(session_factory) -> None:
+    task_queue = RecordingQueue(session_factory)
+    soon, later, far = _scheduled(
+        session_factory, timedelta(seconds=2), timedelta(seconds=30), timedelta(hours=1)
+    )
+    relay = DelayedRelay(task_queue, horizon_ms=60_000, tick_ms=100, load_ms=1000, chunk_size=1)
+
+    now = datetime.now(tz=UTC)
+    assert await relay.tick(now) == 0
+    assert len(relay) == 2
+
+    # * A task created behind the read position is caught up by id on the next load.
+    (late,) = _scheduled(session_factory, timedelta(seconds=1))
+    assert await relay.tick(now + timedelta(seconds=5)) == 2
+    assert task_queue.dispatched == [late, soon]
+
+    assert await relay.tick(now + timedelta(seconds=31)) == 1
+    assert task_queue.dispatched[-1] == later
+    assert far not in task_queue.dispatched
+    assert len(relay) == 0
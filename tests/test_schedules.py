@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import pytest
+
+from taskrunnerx.app.models import Task, TaskSchedule
+from taskrunnerx.app.schemas import ScheduleCreate
+from taskrunnerx.app.services import schedules as schedules_service
+from taskrunnerx.scheduler import runner as runner_module
+from taskrunnerx.scheduler.lease import RedisLease
+from taskrunnerx.scheduler.runner import ScheduleRunner
+
+
+class RecordingQueue:
+    def __init__(self) -> None:
+        self.dispatched: list[int] = []
+
+    async def dispatch_tasks(self, task_ids: Sequence[int]) -> dict[int, str]:
+        self.dispatched.extend(task_ids)
+        return {task_id: f"{task_id}-0" for task_id in task_ids}
+
+
+class LeaseRedis:
+    """Just enough of SET NX PX and the lease scripts, keyed by token."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+
+    async def set(self, key: str, value: str, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    async def eval(self, script: str, numkeys: int, key: str, token: str, *args: Any) -> int:
+        if self.values.get(key) != token:
+            return 0
+        if "del" in script:
+            del self.values[key]
+        return 1
+
+
+@pytest.fixture()
+def schedule_sessions(session_factory, monkeypatch) -> None:
+    @contextmanager
+    def session_scope() -> Any:
+        session = session_factory()
+        try:
+            yield session
+            session.commit()
+        finally:
+            session.close()
+
+    monkeypatch.setattr(runner_module, "db_session", session_scope)
+
+
+def test_interval_schedule_keeps_its_phase() -> None:
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    spec = schedules_service.ScheduleSpec(
+        id=1,
+        name="tick",
+        task_name="echo",
+        payload={"at": "${fire_time}", "from": "${schedule_name}"},
+        routing_key=None,
+        trigger=None,
+        interval=timedelta(minutes=1),
+        next_run_at=start,
+    )
+
+    assert spec.fire_after(start + timedelta(minutes=3, seconds=10)) == start + timedelta(minutes=4)
+    assert schedules_service.render_payload(spec.payload, spec, start) == {
+        "at": start.isoformat(),
+        "from": "tick",
+    }
+    cron = schedules_service.ScheduleSpec(
+        id=2,
+        name="cron",
+        task_name="echo",
+        payload={},
+        routing_key=None,
+        trigger=schedules_service.parse_cron("*/5 * * * *"),
+        interval=None,
+        next_run_at=start,
+    )
+    assert cron.fire_after(start) == start + timedelta(minutes=5)
+
+
+@pytest.mark.anyio("asyncio")
+async def test_runner_fires_due_schedules_once_across_leaders(
+    session_factory, schedule_sessions
+) -> None:
+    now = datetime.now(tz=UTC).replace(microsecond=0)
+    with session_factory() as session:
+        schedule = schedules_service.create_schedule(
+            session,
+            ScheduleCreate(name="beat", task_name="heartbeat", interval_seconds=60),
+            now=now - timedelta(seconds=90),
+        )
+        session.commit()
+        schedule_id = schedule.id
+
+    redis = LeaseRedis()
+    leader = ScheduleRunner(RedisLease(redis, "leader", 1000), RecordingQueue())  # type: ignore[arg-type]
+    standby_lease = RedisLease(redis, "leader", 1000)
+    assert await leader._lease.acquire()
+    assert not await standby_lease.acquire()
+
+    first = await leader.tick(now)
+    assert len(first) == 1
+
+    # * A new leader that still sees the old next_run_at must not fire the same time again.
+    await leader._lease.release()
+    assert await standby_lease.acquire()
+    with session_factory() as session:
+        stored = session.get(TaskSchedule, schedule_id)
+        assert stored is not None
+        assert stored.next_run_at.replace(tzinfo=UTC) == now + timedelta(seconds=30)
+        stored.next_run_at = now - timedelta(seconds=30)
+        session.commit()
+    takeover = ScheduleRunner(standby_lease, RecordingQueue())  # type: ignore[arg-type]
+    assert await takeover.tick(now) == []
+
+    with session_factory() as session:
+        task = session.get(Task, first[0])
+        assert task is not None
+        assert task.name == "heartbeat"
+        assert task.idempotency_key == schedules_service.schedule_idempotency_key(
+            schedule_id, now - timedelta(seconds=30)
+        )
+
+
+@pytest.mark.anyio("asyncio")
+async def test_misfire_policies_after_downtime(session_factory, schedule_sessions) -> None:
+    now = datetime.now(tz=UTC).replace(microsecond=0)
+    ids: dict[str, int] = {}
+    with session_factory() as session:
+        for policy in ("skip", "coalesce", "catch_up"):
+            schedule = schedules_service.create_schedule(
+                session,
+                ScheduleCreate(
+                    name=policy,
+                    task_name="heartbeat",
+                    interval_seconds=60,
+                    misfire_policy=policy,
+                    catchup_rate_per_s=2,
+                ),
+                now=now - timedelta(minutes=5, seconds=30),
+            )
+            ids[policy] = schedule.id
+        session.commit()
+
+    # * Five fire times were missed; the next one is 30 seconds away.
+    lease = RedisLease(LeaseRedis(), "leader", 1000)
+    runner = ScheduleRunner(lease, RecordingQueue(), misfire_grace_ms=1000)  # type: ignore[arg-type]
+    await runner.tick(now)
+    await runner.tick(now + timedelta(seconds=1))
+
+    with session_factory() as session:
+        fired: dict[int, list[Task]] = {}
+        for task in session.query(Task).order_by(Task.id):
+            schedule_id = int((task.idempotency_key or "").split(":")[1])
+            fired.setdefault(schedule_id, []).append(task)
+        stored = {schedule.id: schedule for schedule in session.query(TaskSchedule)}
+
+        assert ids["skip"] not in fired
+        (coalesced,) = fired[ids["coalesce"]]
+        assert coalesced.idempotency_key == schedules_service.schedule_idempotency_key(
+            ids["coalesce"], now - timedelta(seconds=30)
+        )
+        # * Two per second, on the low-priority lane, oldest first; one missed time remains.
+        caught_up = fired[ids["catch_up"]]
+        assert [task.idempotency_key for task in caught_up] == [
+            schedules_service.schedule_idempotency_key(
+                ids["catch_up"], now - timedelta(seconds=270 - 60 * n)
+            )
+            for n in range(4)
+        ]
+        assert {task.outbox.stream for task in caught_up} == {"trx.tasks.low"}
+        assert stored[ids["catch_up"]].next_run_at.replace(tzinfo=UTC) == now - timedelta(
+            seconds=30
+        )
+        for policy in ("skip", "coalesce"):
+            assert stored[ids[policy]].next_run_at.replace(tzinfo=UTC) == now + timedelta(
+                seconds=30
+            )
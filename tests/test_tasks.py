@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 from datetime import UTC, datetime, timedelta
+from typing import Any
 
-from taskrunnerx.app.models import Task
-from taskrunnerx.app.schemas import TaskCreate
+import pytest
+
+from taskrunnerx.app.models import Task, TaskOutbox, TaskStat
+from taskrunnerx.app.schemas import TaskCreate, TaskFilter
+from taskrunnerx.app.services import stats as stats_service
 from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.streams import stream_for
 
 
 def test_payload_hash_is_order_invariant() -> None:
@@ -103,3 +108,346 @@ def test_mark_task_retry_respects_max_attempts(session_factory) -> None:
         session.commit()
     assert not should_retry_again
     assert attempts_again == 3
+
+
+def test_create_task_routes_outbox_to_stream_shard(session_factory, monkeypatch) -> None:
+    monkeypatch.setattr(tasks_service.SETTINGS, "redis_stream_shards", 4)
+    base = tasks_service.SETTINGS.redis_stream
+    scheduled_at = datetime.now(tz=UTC)
+
+    with session_factory() as session:
+        by_name, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={"n": 1}, scheduled_at=scheduled_at)
+        )
+        same_name, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={"n": 2}, scheduled_at=scheduled_at)
+        )
+        routed, _ = tasks_service.create_task(
+            session,
+            TaskCreate(
+                name="echo", payload={"n": 3}, scheduled_at=scheduled_at, routing_key="tenant-7"
+            ),
+        )
+        session.commit()
+        streams = [task.outbox.stream for task in (by_name, same_name, routed)]
+
+    assert all(stream.startswith(f"{base}:{{") for stream in streams)
+    assert streams[0] == streams[1] == stream_for(base, 4, "echo")
+    assert streams[2] == stream_for(base, 4, "tenant-7")
+
+
+def test_create_tasks_deduplicates_against_db_and_within_batch(session_factory) -> None:
+    scheduled_at = datetime.now(tz=UTC)
+    with session_factory() as session:
+        existing, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={"n": 0}, scheduled_at=scheduled_at)
+        )
+        session.commit()
+        existing_id = existing.id
+
+    items = [
+        TaskCreate(name="echo", payload={"n": 0}, scheduled_at=scheduled_at),
+        TaskCreate(name="echo", payload={"n": 1}, scheduled_at=scheduled_at),
+        TaskCreate(name="sha256", payload={"n": 1}, scheduled_at=scheduled_at),
+        TaskCreate(name="echo", payload={"n": 1}, scheduled_at=scheduled_at),
+    ]
+    with session_factory() as session:
+        results = tasks_service.create_tasks(session, items)
+        session.commit()
+        summary = [(task.id, task.name, created) for task, created in results]
+        outbox_count = session.query(TaskOutbox).count()
+
+    assert summary[0] == (existing_id, "echo", False)
+    assert summary[1][2]
+    assert summary[2][2]
+    assert summary[3] == (summary[1][0], "echo", False)
+    assert len({task_id for task_id, _, _ in summary}) == 3
+    assert outbox_count == 3
+
+
+class DictDedupeCache:
+    def __init__(self) -> None:
+        self.keys: dict[str, int] = {}
+
+    def claim(self, expiries: dict[str, int]) -> set[str]:
+        claimed = {key for key in expiries if key not in self.keys}
+        self.keys.update(expiries)
+        return claimed
+
+
+def mid_window() -> datetime:
+    """A time far enough from both window edges that it has a single dedupe candidate."""
+
+    window_ms = tasks_service.SETTINGS.dedupe_window_ms
+    now_ms = int(datetime.now(tz=UTC).timestamp() * 1000)
+    start_ms = now_ms - now_ms % window_ms + window_ms
+    return datetime.fromtimestamp((start_ms + window_ms // 2) / 1000, tz=UTC)
+
+
+def no_db_lookup(_db: object, *candidates: Any) -> dict[Any, Any]:
+    if any(candidates[0]):
+        pytest.fail("dedupe fell through to the database")
+    return {}
+
+
+def test_new_submissions_skip_the_db_dedupe_lookup(session_factory, monkeypatch) -> None:
+    cache = DictDedupeCache()
+    monkeypatch.setattr(tasks_service, "dedupe_cache", cache)
+    monkeypatch.setattr(tasks_service.SETTINGS, "dedupe_cache_enabled", True)
+    monkeypatch.setattr(tasks_service, "_existing_task", no_db_lookup)
+    monkeypatch.setattr(tasks_service, "_existing_tasks", no_db_lookup)
+    scheduled_at = mid_window()
+    request = TaskCreate(name="echo", payload={"msg": "hi"}, scheduled_at=scheduled_at)
+    batch = [TaskCreate(name="echo", payload={"n": n}, scheduled_at=scheduled_at) for n in range(2)]
+
+    with session_factory() as session:
+        task, created = tasks_service.create_task(session, request)
+        batch_results = tasks_service.create_tasks(session, batch)
+        session.commit()
+        first_id = task.id
+        batch_first_id = batch_results[0][0].id
+
+    assert created
+    assert all(is_new for _, is_new in batch_results)
+    payload_hash = tasks_service.compute_payload_hash({"msg": "hi"})
+    [window] = tasks_service._window_candidates(scheduled_at)
+    assert tasks_service.compute_execution_key("echo", payload_hash, window) in cache.keys
+
+    monkeypatch.undo()
+    monkeypatch.setattr(tasks_service, "dedupe_cache", cache)
+    monkeypatch.setattr(tasks_service.SETTINGS, "dedupe_cache_enabled", True)
+    with session_factory() as session:
+        duplicate, created_again = tasks_service.create_task(session, request)
+        [(batch_duplicate, batch_created_again)] = tasks_service.create_tasks(session, batch[:1])
+        assert not created_again
+        assert duplicate.id == first_id
+        assert not batch_created_again
+        assert batch_duplicate.id == batch_first_id
+
+
+def test_create_task_checks_the_db_behind_stale_claims(session_factory, monkeypatch) -> None:
+    cache = DictDedupeCache()
+    monkeypatch.setattr(tasks_service, "dedupe_cache", cache)
+    monkeypatch.setattr(tasks_service.SETTINGS, "dedupe_cache_enabled", True)
+    scheduled_at = datetime.now(tz=UTC)
+    request = TaskCreate(name="echo", payload={"msg": "hi"}, scheduled_at=scheduled_at)
+    payload_hash = tasks_service.compute_payload_hash({"msg": "hi"})
+    for window in tasks_service._window_candidates(scheduled_at):
+        cache.keys[tasks_service.compute_execution_key("echo", payload_hash, window)] = 1
+
+    lookups: list[str] = []
+    existing_task = tasks_service._existing_task
+
+    def counted_lookup(*args: Any) -> Any:
+        lookups.append(args[1])
+        return existing_task(*args)
+
+    monkeypatch.setattr(tasks_service, "_existing_task", counted_lookup)
+    with session_factory() as session:
+        _, created = tasks_service.create_task(session, request)
+        session.commit()
+
+    assert created
+    assert lookups == ["echo"]
+
+
+def test_claims_near_a_window_edge_still_check_the_db(session_factory, monkeypatch) -> None:
+    # * A neighbouring window's task has another execution key and, inserted while Redis was
+    # * unavailable, no claim; only the database can find it.
+    monkeypatch.setattr(tasks_service.SETTINGS, "dedupe_cache_enabled", False)
+    window_ms = tasks_service.SETTINGS.dedupe_window_ms
+    edge = mid_window() + timedelta(milliseconds=window_ms // 2)
+    before_edge = TaskCreate(
+        name="echo", payload={"msg": "edge"}, scheduled_at=edge - timedelta(milliseconds=1)
+    )
+    after_edge = before_edge.model_copy(update={"scheduled_at": edge})
+    with session_factory() as session:
+        first, _ = tasks_service.create_task(session, before_edge)
+        session.commit()
+        first_id = first.id
+
+    monkeypatch.setattr(tasks_service, "dedupe_cache", DictDedupeCache())
+    monkeypatch.setattr(tasks_service.SETTINGS, "dedupe_cache_enabled", True)
+    with session_factory() as session:
+        duplicate, created = tasks_service.create_task(session, after_edge)
+        [(batch_duplicate, batch_created)] = tasks_service.create_tasks(session, [after_edge])
+        assert (duplicate.id, created) == (first_id, False)
+        assert (batch_duplicate.id, batch_created) == (first_id, False)
+
+
+def test_idempotency_key_dedupes_without_payload_hash(session_factory) -> None:
+    first = TaskCreate(name="echo", payload={"v": 1}, idempotency_key="order-42")
+    changed_payload = TaskCreate(name="echo", payload={"v": 2}, idempotency_key="order-42")
+
+    with session_factory() as session:
+        task, created = tasks_service.create_task(session, first)
+        session.commit()
+        task_id = task.id
+        assert task.payload_hash == ""
+        assert task.execution_key.startswith("echo:idem:order-42:")
+    with session_factory() as session:
+        duplicate, created_again = tasks_service.create_task(session, changed_payload)
+        duplicate_id = duplicate.id
+    with session_factory() as session:
+        results = tasks_service.create_tasks(session, [changed_payload, changed_payload])
+        batch_ids = [(task.id, created) for task, created in results]
+
+    assert created
+    assert not created_again
+    assert duplicate_id == task_id
+    assert batch_ids == [(task_id, False), (task_id, False)]
+
+
+def test_idempotency_key_is_reusable_after_retention(session_factory, monkeypatch) -> None:
+    request = TaskCreate(name="echo", payload={"v": 1}, idempotency_key="order-7")
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(session, request)
+        task.created_at = datetime.now(tz=UTC) - timedelta(days=2)
+        session.commit()
+        first_id = task.id
+
+    monkeypatch.setattr(tasks_service.SETTINGS, "idempotency_retention_s", 3600)
+    with session_factory() as session:
+        task, created = tasks_service.create_task(session, request)
+        session.commit()
+        second_id = task.id
+        expired = session.get(Task, first_id)
+        assert expired is not None
+        assert expired.idempotency_key is None
+
+    assert created
+    assert second_id != first_id
+
+
+def test_list_tasks_keyset_pages_with_filters(session_factory) -> None:
+    scheduled_at = datetime.now(tz=UTC)
+    items = [
+        TaskCreate(name="echo" if n % 2 else "sha256", payload={"n": n}, scheduled_at=scheduled_at)
+        for n in range(7)
+    ]
+    with session_factory() as session:
+        tasks_service.create_tasks(session, items)
+        session.commit()
+
+    echo = TaskFilter(name="echo")
+    seen: list[int] = []
+    cursor = None
+    with session_factory() as session:
+        while True:
+            page = tasks_service.list_tasks(session, limit=2, cursor=cursor, filters=echo)
+            if not page:
+                break
+            seen.extend(task.id for task in page)
+            cursor = tasks_service.decode_cursor(tasks_service.encode_cursor({"id": page[-1].id}))
+        all_echo = [task.id for task in tasks_service.list_tasks(session, limit=50, filters=echo)]
+
+    assert len(seen) == 3
+    assert seen == sorted(seen, reverse=True)
+    assert seen == all_echo
+
+
+@pytest.mark.parametrize(
+    ("filters", "keyset"),
+    [
+        ({"created_after": datetime(2026, 1, 1, tzinfo=UTC)}, "created_at"),
+        ({"min_attempts": 0}, "attempts"),
+    ],
+)
+def test_range_filters_page_along_their_index(session_factory, filters, keyset) -> None:
+    created_at = datetime(2026, 3, 1, tzinfo=UTC)
+    with session_factory() as session:
+        tasks = [
+            task
+            for task, _ in tasks_service.create_tasks(
+                session, [TaskCreate(name="echo", payload={"n": n}) for n in range(5)]
+            )
+        ]
+        # * Ties on the keyset column are broken by id.
+        for n, task in enumerate(tasks):
+            task.created_at = created_at + timedelta(minutes=n // 2)
+            task.attempts = n // 2
+        session.commit()
+        expected = [
+            task.id
+            for task in sorted(
+                tasks, key=lambda task: (getattr(task, keyset), task.id), reverse=True
+            )
+        ]
+
+    columns = ["id", keyset]
+    task_filter = TaskFilter(**filters)
+    assert tasks_service.keyset_column(task_filter) == keyset
+    seen: list[int] = []
+    cursor = None
+    with session_factory() as session:
+        while True:
+            rows = tasks_service.list_task_rows(
+                session, columns, limit=2, cursor=cursor, filters=task_filter
+            )
+            if not rows:
+                break
+            seen.extend(row["id"] for row in rows)
+            cursor = tasks_service.decode_cursor(tasks_service.encode_cursor(rows[-1], keyset))
+        with pytest.raises(ValueError, match="does not match"):
+            tasks_service.list_task_rows(
+                session, columns, cursor={"id": seen[0]}, filters=task_filter
+            )
+
+    assert seen == expected
+
+
+def test_decode_cursor_rejects_garbage() -> None:
+    with pytest.raises(ValueError, match="Malformed cursor"):
+        tasks_service.decode_cursor("not-a-cursor")
+
+
+def test_task_rows_project_requested_fields(session_factory) -> None:
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(session, TaskCreate(name="echo", payload={"n": 1}))
+        session.commit()
+        task_id = task.id
+
+    columns = tasks_service.select_columns(tasks_service.TASK_COLUMNS, "status,id")
+    with session_factory() as session:
+        row = tasks_service.get_task_row(session, task_id, columns)
+        rows = tasks_service.list_task_rows(session, columns, limit=10, offset=0)
+
+    assert row == {"status": "queued", "id": task_id}
+    assert rows == [row]
+    with pytest.raises(ValueError, match="Unknown columns"):
+        tasks_service.select_columns(tasks_service.TASK_COLUMNS, "secret")
+
+
+def test_task_stats_follow_transitions_and_reconcile(session_factory) -> None:
+    items = [TaskCreate(name="echo", payload={"n": n}) for n in range(3)]
+    with session_factory() as session:
+        created = tasks_service.create_tasks(session, items)
+        session.commit()
+        task_ids = [task.id for task, _ in created]
+        keys = [task.execution_key for task, _ in created]
+
+    with session_factory() as session:
+        tasks_service.set_task_started(session, task_ids[0], keys[0])
+        tasks_service.set_task_finished(session, task_ids[0], keys[0])
+        session.commit()
+    with session_factory() as session:
+        tasks_service.set_task_started(session, task_ids[1], keys[1])
+        session.rollback()
+
+    with session_factory() as session:
+        assert stats_service.read_task_stats(session) == {"echo": {"queued": 2, "done": 1}}
+        session.query(Task).filter(Task.id == task_ids[2]).update({"status": "failed"})
+        session.add(TaskStat(name="gone", status="queued", count=4))
+        session.commit()
+
+    with session_factory() as session:
+        assert stats_service.task_stat_names(session) == ["echo", "gone"]
+        assert stats_service.reconcile_task_stats(session, "echo") == 2
+        session.commit()
+        assert stats_service.reconcile_task_stats(session, "gone") == 1
+        assert stats_service.reconcile_task_stats(session, "echo") == 0
+        session.commit()
+    with session_factory() as session:
+        assert stats_service.read_task_stats(session) == {
+            "echo": {"queued": 1, "done": 1, "failed": 1}
+        }
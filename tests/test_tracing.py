@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from taskrunnerx.app.models import Task, TaskOutbox
+from taskrunnerx.app.schemas import TaskCreate
+from taskrunnerx.app.services import tasks as tasks_service
+from taskrunnerx.app.services.queue import Queue as QueueService
+from taskrunnerx.app.services.tracing import (
+    SPAN_KIND_SERVER,
+    Tracer,
+    head_sampled,
+    parse_traceparent,
+)
+from taskrunnerx.logging import TRACE_ID
+
+
+def test_traceparent_round_trip_and_rejects_malformed() -> None:
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    context = parse_traceparent(header)
+    assert context is not None
+    assert context.sampled
+    assert context.traceparent == header
+
+    for bad in (None, "", "00-abc-def-01", f"00-{'0' * 32}-00f067aa0ba902b7-01", "zz-x-y-0g"):
+        assert parse_traceparent(bad) is None
+
+
+def test_sampling_is_decided_at_the_root_and_inherited() -> None:
+    tracer = Tracer(endpoint="http://collector/v1/traces", sample_ratio=0.25, queue_size=2)
+    roots = [tracer.new_context() for _ in range(4000)]
+    sampled = [root for root in roots if root.sampled]
+    assert 800 < len(sampled) < 1200
+    # * Any process deciding from the same trace id reaches the same answer.
+    assert all(head_sampled(root.trace_id, 0.25) == root.sampled for root in roots)
+
+    child = tracer.new_context(sampled[0])
+    assert (child.trace_id, child.sampled) == (sampled[0].trace_id, True)
+    assert not tracer.new_context(next(root for root in roots if not root.sampled)).sampled
+
+
+def test_sampled_spans_export_as_otlp_and_the_queue_is_bounded() -> None:
+    tracer = Tracer(endpoint="http://collector/v1/traces", sample_ratio=1.0, queue_size=2)
+    with tracer.span("submit_task", kind=SPAN_KIND_SERVER, attributes={"task.id": 7}) as span:
+        assert TRACE_ID.get() == span.context.trace_id
+    tracer.record("task.handler", span.context, 1_000, 2_000)
+    tracer.record("task.finish", span.context, 2_000, 3_000)
+
+    assert len(tracer._queue) == 2
+    body = tracer.payload(list(tracer._queue))
+    spans = body["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert spans[0]["name"] == "submit_task"
+    assert spans[0]["kind"] == SPAN_KIND_SERVER
+    assert spans[0]["attributes"] == [{"key": "task.id", "value": {"intValue": "7"}}]
+    assert spans[1]["parentSpanId"] == span.context.span_id
+    assert spans[1]["traceId"] == span.context.trace_id
+
+    with pytest.raises(RuntimeError), tracer.span("boom"):
+        raise RuntimeError("nope")
+    assert len(tracer._queue) == 2
+
+
+def test_traceparent_is_carried_into_every_stream_message(session_factory) -> None:
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    with session_factory() as session:
+        task, _ = tasks_service.create_task(
+            session, TaskCreate(name="echo", payload={}), traceparent=header
+        )
+        plain, _ = tasks_service.create_task(session, TaskCreate(name="echo", payload={"n": 1}))
+        session.commit()
+        outboxes = {row.task_id: row for row in session.scalars(select(TaskOutbox))}
+
+        message = QueueService._build_message(outboxes[task.id], session.get(Task, task.id))
+        assert message["traceparent"] == header
+        plain_message = QueueService._build_message(outboxes[plain.id], session.get(Task, plain.id))
+        assert "traceparent" not in plain_message